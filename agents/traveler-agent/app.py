@@ -1,51 +1,121 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from models import SearchRequest, RecommendRequest, ItineraryRequest, MessageRequest
 from services.llm import OllamaLocal
-from services.vector_client import search_listings_vector, search_events_vector
+from services.vector_client import search_listings_vector, search_events_vector, get_query_embedding, QUERY_CACHE
 from shared.utils.mongo_client import db
-from services.mq import MQConsumer
-from services.reranker import rerank
-import threading
+from services.indexing import search_cache, lexical_index, start_background
+from services.reranker import rerank, RERANK_CACHE
+from services.lexical_index import reciprocal_rank_fusion
+from shared.utils.llm_cache import get_llm_cache
+from shared.utils.llm_scheduler import LLMOverloaded, get_llm_scheduler
+from shared.utils.vector_registry import build_payload_filter, matches_payload_filter, get_document_embedder
+from shared.utils.lazy import warmup, readiness
+from shared.utils.config import settings
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
 
 app = Flask(__name__)
 llm = OllamaLocal()
 
-# Background subscriber to MQ events to update local caches / analytics
-def process_event(routing_key, payload):
-    # Example: update user's recommendations, cache new listing/event in Mongo's search cache
-    print("MQ event", routing_key)
+# Runs the vector retriever while the request thread queries the lexical index
+search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-search")
 
-def start_mq():
-    consumer = MQConsumer()
-    consumer.start(process_event)
+@app.before_request
+def ensure_background_started():
+    # Under a WSGI server (no __main__) the first request, typically the readiness probe, starts the consumers
+    start_background()
 
-threading.Thread(target=start_mq, daemon=True).start()
+def hydrate(payloads: list, collection: str) -> list:
+    """Complete slim Qdrant payloads with their full Mongo documents in one $in query."""
+    ids = [p["id"] for p in payloads if p.get("id")]
+    if not ids:
+        return payloads
+    full = {d["id"]: d for d in db[collection].find({"id": {"$in": ids}}, {"_id": 0})}
+    return [{**p, **full.get(p.get("id"), {})} for p in payloads]
+
+def get_doc(doc_id):
+    """Listing/event by id, from the search cache first, then Mongo."""
+    return search_cache.get(doc_id) or db.listings.find_one({"id": doc_id}) or db.events.find_one({"id": doc_id})
+
+def overloaded_response(e: LLMOverloaded):
+    # The LLM scheduler shed the request; tell the client when to retry instead of failing with 500
+    return jsonify({"error": str(e)}), 503, {"Retry-After": str(max(1, round(e.retry_after)))}
+
+def sse_response(chunks):
+    """
+    Relay generated text chunks as Server-Sent Events, ending with a `done` event.
+    The first chunk is pulled before the 200 goes out, so LLMOverloaded from the
+    scheduler still reaches the route (503 + Retry-After); later errors become `error` events.
+    """
+    chunks = iter(chunks)
+    head, failed = [], None
+    try:
+        head.append(next(chunks))
+    except StopIteration:
+        pass
+    except LLMOverloaded:
+        raise
+    except Exception as e:
+        failed = e
+
+    def events():
+        try:
+            if failed is not None:
+                raise failed
+            for chunk in itertools.chain(head, chunks):
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def vector_candidates(req: SearchRequest, kind: str, payload_filter, top_k: int) -> list:
+    """Qdrant hits (filtered by payload indexes) merged with fresh search-cache hits, best first."""
+    if kind == "listing":
+        results = search_listings_vector(req.query, top_k=top_k, filters=req.filters, with_scores=True)
+    else:
+        results = search_events_vector(req.query, top_k=top_k, filters=req.filters, with_scores=True)
+    # Merge in fresh items the vector DB may not have yet
+    seen = {r["id"] for r in results}
+    for doc_id, score, doc in search_cache.search(kind, get_query_embedding(req.query), top_k=top_k):
+        if doc_id not in seen and matches_payload_filter(doc, payload_filter):
+            results.append({"id": doc_id, "score": score, "payload": doc})
+    return sorted(results, key=lambda r: r["score"], reverse=True)[:top_k]
 
 @app.route("/agent/traveler/search", methods=["POST"])
 def search():
     try:
         req = SearchRequest(**request.json)
-        # step 1: vector search with query string (not embedding)
-        if req.mode == "via_vendor":
-            raw_results = search_listings_vector(req.query, top_k=10)
-        else:
-            raw_results = search_events_vector(req.query, top_k=10)
-        
-        # step 2: parse results
-        raw = raw_results if isinstance(raw_results, dict) else {"points": raw_results}
-        # step 3: parse and filter results
-        results = []
-        points = raw.get("result", raw.get("points", []))[:10]
-        for hit in points:
-            payload = hit.get("payload", {})
-            results.append({
-                "id": hit.get("id"),
-                "score": hit.get("score", 0),
-                "payload": payload
-            })
-        
-        # step 4: rerank
-        reranked = rerank(results, req.query)
+        try:
+            payload_filter = build_payload_filter(req.filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        kind = "listing" if req.mode == "via_vendor" else "event"
+        n = settings.HYBRID_CANDIDATES
+        # step 1: vector and lexical retrieval in parallel
+        vector_future = search_pool.submit(vector_candidates, req, kind, payload_filter, n)
+        lexical = [
+            {"id": doc_id, "score": score, "payload": doc}
+            for doc_id, score, doc in lexical_index.search(kind, req.query, top_k=n, payload_filter=payload_filter)
+        ]
+        vector = vector_future.result()
+
+        # step 2: reciprocal-rank fusion
+        results = reciprocal_rank_fusion(
+            [vector, lexical], k=settings.RRF_K, score_fields=("vector_score", "lexical_score")
+        )[:10]
+        full = hydrate([{"id": r["id"], **r["payload"]} for r in results], "listings" if kind == "listing" else "events")
+        for r, payload in zip(results, full):
+            r["payload"] = payload
+
+        # step 3: rerank
+        reranked = rerank(results, req.query, mode=req.rerank)
         return jsonify({"results": reranked})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -58,8 +128,8 @@ def recommend():
         
         if history:
             last_query = history[0].get("query", "")
-            vendor = search_listings_vector(last_query, top_k=req.limit)
-            agency = search_events_vector(last_query, top_k=req.limit)
+            vendor = hydrate(search_listings_vector(last_query, top_k=req.limit), "listings")
+            agency = hydrate(search_events_vector(last_query, top_k=req.limit), "events")
             out = {"vendor": vendor, "agency": agency}
         else:
             out = {"vendor": [], "agency": []}
@@ -73,7 +143,7 @@ def itinerary():
         req = ItineraryRequest(**request.json)
         items = []
         for id_ in req.items:
-            doc = db.listings.find_one({"id": id_}) or db.events.find_one({"id": id_})
+            doc = get_doc(id_)
             if doc:
                 items.append(f"{doc.get('title')} - {doc.get('description')}")
         
@@ -81,8 +151,12 @@ def itinerary():
             return jsonify({"error": "No items found"}), 404
         
         prompt = f"Create a {req.days}-day itinerary for a traveler using these items:\n" + "\n".join(items)
+        if req.stream:
+            return sse_response(llm.generate_stream(prompt))
         plan = llm.generate(prompt)
         return jsonify({"itinerary": plan})
+    except LLMOverloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -90,16 +164,48 @@ def itinerary():
 def message():
     try:
         req = MessageRequest(**request.json)
-        doc = db.listings.find_one({"id": req.target_id}) or db.events.find_one({"id": req.target_id})
+        doc = get_doc(req.target_id)
         if not doc:
             return jsonify({"error": "Target item not found"}), 404
         
         context = req.context or ""
         prompt = f"Write a polite negotiation message from user {req.user_id} to the owner about {doc.get('title','item')} trying to get a discount. Context: {context}"
+        if req.stream:
+            return sse_response(llm.generate_stream(prompt))
         msg = llm.generate(prompt)
         return jsonify({"message": msg})
+    except LLMOverloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/agent/traveler/stats", methods=["GET"])
+def stats():
+    cache = get_llm_cache()
+    return jsonify({
+        "llm_cache": cache.stats() if cache else None,
+        "embeddings": get_document_embedder().stats(),
+        "query_embedding_cache": QUERY_CACHE.stats(),
+        "search_cache": search_cache.stats(),
+        "lexical_index": lexical_index.stats(),
+        "rerank_cache": RERANK_CACHE.stats(),
+        "llm_scheduler": get_llm_scheduler().stats(),
+    })
+
+@app.route("/agent/traveler/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once every dependency is initialized, else 503 with per-dependency status."""
+    deps = readiness()
+    ok = all(d["ready"] for d in deps.values())
+    return jsonify({"ready": ok, "dependencies": deps}), 200 if ok else 503
+
+@app.route("/agent/traveler/warmup", methods=["POST"])
+def warmup_dependencies():
+    """Initialize all dependencies now (in parallel) and report how long each took."""
+    deps = warmup()
+    ok = all(d["ready"] for d in deps.values())
+    return jsonify({"ready": ok, "dependencies": deps}), 200 if ok else 503
+
 if __name__ == "__main__":
+    start_background()
     app.run(host="0.0.0.0", port=8002)
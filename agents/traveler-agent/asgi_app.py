@@ -0,0 +1,245 @@
+"""
+Asyncio (ASGI) version of the traveler agent: same routes and response
+shapes as app.py, with PyMongo async, AsyncQdrantClient and httpx clients so one
+worker keeps many requests in flight. Independent lookups and searches run
+concurrently; CPU-bound steps (query encoding, BM25, reranking) run in
+worker threads. Serve with: hypercorn asgi_app:app --bind 0.0.0.0:8002
+"""
+import asyncio
+import json
+
+from quart import Quart, Response, request, jsonify
+from models import SearchRequest, RecommendRequest, ItineraryRequest, MessageRequest
+from services.async_llm import AsyncOllamaLocal
+from services.async_vector_client import AsyncVectorSearch
+from services.vector_client import get_query_embedding, QUERY_CACHE
+from services.indexing import search_cache, lexical_index, start_background
+from services.reranker import rerank, RERANK_CACHE
+from services.lexical_index import reciprocal_rank_fusion
+from shared.utils.mongo_client import connect_async
+from shared.utils.llm_cache import get_llm_cache
+from shared.utils.llm_scheduler import LLMOverloaded, get_llm_scheduler
+from shared.utils.vector_registry import build_payload_filter, matches_payload_filter, get_document_embedder
+from shared.utils.lazy import warmup, readiness
+from shared.utils.config import settings
+
+app = Quart(__name__)
+
+# Async clients are bound to the serving event loop, so they are created in startup()
+adb = None
+vectors: AsyncVectorSearch = None
+llm: AsyncOllamaLocal = None
+
+@app.before_serving
+async def startup():
+    global adb, vectors, llm
+    adb = connect_async()
+    vectors = AsyncVectorSearch()
+    llm = AsyncOllamaLocal()
+    # MQ consumer and lexical bootstrap; models and clients too unless they should load on first use
+    start_background()
+
+@app.after_serving
+async def shutdown():
+    await asyncio.gather(vectors.close(), llm.aclose(), adb.client.close(), return_exceptions=True)
+
+async def hydrate(payloads: list, collection: str) -> list:
+    """Complete slim Qdrant payloads with their full Mongo documents in one $in query."""
+    ids = [p["id"] for p in payloads if p.get("id")]
+    if not ids:
+        return payloads
+    full = {d["id"]: d async for d in adb[collection].find({"id": {"$in": ids}}, {"_id": 0})}
+    return [{**p, **full.get(p.get("id"), {})} for p in payloads]
+
+async def get_docs(ids: list) -> dict:
+    """Listings/events by id, from the search cache first, then one $in query per collection (concurrently)."""
+    found = {id_: search_cache.get(id_) for id_ in ids}
+    missing = [id_ for id_, doc in found.items() if doc is None]
+    if missing:
+        listings, events = await asyncio.gather(
+            adb.listings.find({"id": {"$in": missing}}).to_list(None),
+            adb.events.find({"id": {"$in": missing}}).to_list(None),
+        )
+        # A listing wins over an event with the same id, as in app.get_doc
+        for doc in events + listings:
+            found[doc["id"]] = doc
+    return found
+
+def overloaded_response(e: LLMOverloaded):
+    # The LLM scheduler shed the request; tell the client when to retry instead of failing with 500
+    return jsonify({"error": str(e)}), 503, {"Retry-After": str(max(1, round(e.retry_after)))}
+
+async def sse_response(chunks):
+    """
+    Relay generated text chunks as Server-Sent Events, ending with a `done` event.
+    The first chunk is awaited before the 200 goes out, so LLMOverloaded from the
+    scheduler still reaches the route (503 + Retry-After); later errors become `error` events.
+    """
+    head, failed = [], None
+    try:
+        head.append(await chunks.__anext__())
+    except StopAsyncIteration:
+        pass
+    except LLMOverloaded:
+        raise
+    except Exception as e:
+        failed = e
+
+    async def events():
+        try:
+            if failed is not None:
+                raise failed
+            for chunk in head:
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+            async for chunk in chunks:
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+    resp = Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    resp.timeout = None  # generations can outlast Quart's default response timeout
+    return resp
+
+async def vector_candidates(req: SearchRequest, kind: str, payload_filter, top_k: int) -> list:
+    """Qdrant hits (filtered by payload indexes) merged with fresh search-cache hits, best first."""
+    search = vectors.search_listings if kind == "listing" else vectors.search_events
+    results = await search(req.query, top_k=top_k, filters=req.filters, with_scores=True)
+    # Merge in fresh items the vector DB may not have yet (query vector is cached by now)
+    seen = {r["id"] for r in results}
+    for doc_id, score, doc in search_cache.search(kind, get_query_embedding(req.query), top_k=top_k):
+        if doc_id not in seen and matches_payload_filter(doc, payload_filter):
+            results.append({"id": doc_id, "score": score, "payload": doc})
+    return sorted(results, key=lambda r: r["score"], reverse=True)[:top_k]
+
+def lexical_candidates(req: SearchRequest, kind: str, payload_filter, top_k: int) -> list:
+    return [
+        {"id": doc_id, "score": score, "payload": doc}
+        for doc_id, score, doc in lexical_index.search(kind, req.query, top_k=top_k, payload_filter=payload_filter)
+    ]
+
+@app.route("/agent/traveler/search", methods=["POST"])
+async def search():
+    try:
+        req = SearchRequest(**(await request.get_json()))
+        try:
+            payload_filter = build_payload_filter(req.filters)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        kind = "listing" if req.mode == "via_vendor" else "event"
+        n = settings.HYBRID_CANDIDATES
+        # step 1: vector and lexical retrieval concurrently
+        vector, lexical = await asyncio.gather(
+            vector_candidates(req, kind, payload_filter, n),
+            asyncio.to_thread(lexical_candidates, req, kind, payload_filter, n),
+        )
+
+        # step 2: reciprocal-rank fusion
+        results = reciprocal_rank_fusion(
+            [vector, lexical], k=settings.RRF_K, score_fields=("vector_score", "lexical_score")
+        )[:10]
+        full = await hydrate([{"id": r["id"], **r["payload"]} for r in results], "listings" if kind == "listing" else "events")
+        for r, payload in zip(results, full):
+            r["payload"] = payload
+
+        # step 3: rerank (fast scorer, optionally the LLM through the shared scheduler)
+        reranked = await asyncio.to_thread(rerank, results, req.query, mode=req.rerank)
+        return jsonify({"results": reranked})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+async def hydrate_search(search, query: str, top_k: int, collection: str) -> list:
+    return await hydrate(await search(query, top_k=top_k), collection)
+
+@app.route("/agent/traveler/recommend", methods=["POST"])
+async def recommend():
+    try:
+        req = RecommendRequest(**(await request.get_json()))
+        history = await adb.user_history.find({"user_id": req.user_id}).sort("timestamp", -1).limit(10).to_list(10)
+
+        if history:
+            last_query = history[0].get("query", "")
+            # Listings and events searched (and hydrated) concurrently
+            vendor, agency = await asyncio.gather(
+                hydrate_search(vectors.search_listings, last_query, req.limit, "listings"),
+                hydrate_search(vectors.search_events, last_query, req.limit, "events"),
+            )
+            out = {"vendor": vendor, "agency": agency}
+        else:
+            out = {"vendor": [], "agency": []}
+        return jsonify(out)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/agent/traveler/itinerary", methods=["POST"])
+async def itinerary():
+    try:
+        req = ItineraryRequest(**(await request.get_json()))
+        docs = await get_docs(req.items)
+        items = [f"{doc.get('title')} - {doc.get('description')}" for doc in (docs[id_] for id_ in req.items) if doc]
+
+        if not items:
+            return jsonify({"error": "No items found"}), 404
+
+        prompt = f"Create a {req.days}-day itinerary for a traveler using these items:\n" + "\n".join(items)
+        if req.stream:
+            return await sse_response(llm.generate_stream(prompt))
+        plan = await llm.generate(prompt)
+        return jsonify({"itinerary": plan})
+    except LLMOverloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/agent/traveler/message", methods=["POST"])
+async def message():
+    try:
+        req = MessageRequest(**(await request.get_json()))
+        doc = (await get_docs([req.target_id]))[req.target_id]
+        if not doc:
+            return jsonify({"error": "Target item not found"}), 404
+
+        context = req.context or ""
+        prompt = f"Write a polite negotiation message from user {req.user_id} to the owner about {doc.get('title','item')} trying to get a discount. Context: {context}"
+        if req.stream:
+            return await sse_response(llm.generate_stream(prompt))
+        msg = await llm.generate(prompt)
+        return jsonify({"message": msg})
+    except LLMOverloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/agent/traveler/stats", methods=["GET"])
+async def stats():
+    cache = get_llm_cache()
+    return jsonify({
+        "llm_cache": cache.stats() if cache else None,
+        "embeddings": get_document_embedder().stats(),
+        "query_embedding_cache": QUERY_CACHE.stats(),
+        "search_cache": search_cache.stats(),
+        "lexical_index": lexical_index.stats(),
+        "rerank_cache": RERANK_CACHE.stats(),
+        "llm_scheduler": get_llm_scheduler().stats(),
+    })
+
+@app.route("/agent/traveler/ready", methods=["GET"])
+async def ready():
+    """Readiness probe: 200 once every dependency is initialized, else 503 with per-dependency status."""
+    deps = readiness()
+    ok = all(d["ready"] for d in deps.values())
+    return jsonify({"ready": ok, "dependencies": deps}), 200 if ok else 503
+
+@app.route("/agent/traveler/warmup", methods=["POST"])
+async def warmup_dependencies():
+    """Initialize all dependencies now (in parallel) and report how long each took."""
+    deps = await asyncio.to_thread(warmup)
+    ok = all(d["ready"] for d in deps.values())
+    return jsonify({"ready": ok, "dependencies": deps}), 200 if ok else 503
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=8002)
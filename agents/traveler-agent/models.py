@@ -6,6 +6,7 @@ class SearchRequest(BaseModel):
     mode: str  # "via_vendor" | "via_agency"
     filters: Optional[Dict[str, Any]] = {}
     user_id: Optional[str] = None
+    rerank: str = "auto"  # "fast" | "llm" | "auto"
 
 class RecommendRequest(BaseModel):
     user_id: str
@@ -15,9 +16,11 @@ class ItineraryRequest(BaseModel):
     user_id: str
     items: list  # list of listing/event IDs
     days: int = 1
+    stream: bool = False  # stream tokens as Server-Sent Events
 
 class MessageRequest(BaseModel):
     user_id: str
     target_id: str
     message_type: str  # negotiation, booking, etc.
     context: Optional[str] = None
+    stream: bool = False  # stream tokens as Server-Sent Events
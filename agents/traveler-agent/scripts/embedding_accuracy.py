@@ -0,0 +1,96 @@
+"""
+Compare an embedding runtime against the full-precision reference model.
+
+For every text in the corpus it reports the cosine similarity between the
+candidate and reference vectors, and how many of each text's top-k nearest
+neighbours (over the corpus) the candidate runtime keeps.
+
+Usage: python scripts/embedding_accuracy.py [--runtime int8 --runtime onnx ...] [--corpus texts.txt]
+       [--min-cosine 0.99]
+The corpus is one text per line; without it a built-in travel sample is used.
+Exits 1 if any runtime falls below --min-cosine.
+The onnx runtimes need the optional extra: pip install -r requirements-onnx.txt
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from shared.utils.config import settings
+from shared.utils.embeddings import SentenceTransformerBackend
+
+SAMPLE_CORPUS = [
+    "homestay in Velhe village with home-cooked Maharashtrian food",
+    "farm stay near Pune surrounded by rice fields",
+    "beach hut in Goa with a sea view",
+    "trek to Rajgad fort at sunrise",
+    "budget hostel in Mumbai close to the railway station",
+    "monsoon waterfall picnic spot in Lonavala",
+    "heritage walking tour of old Pune wadas",
+    "camping by Pawna lake with bonfire and stargazing",
+    "cheap rooms near Shaniwar Wada",
+    "cooking class for traditional puran poli",
+    "river rafting in Kolad for groups",
+    "quiet cottage in the hills with mountain views",
+    "weekend yoga retreat in Alibaug",
+    "strawberry farm visit in Mahabaleshwar",
+    "wildlife safari at Tadoba tiger reserve",
+    "ganesh festival celebration with local families",
+]
+
+
+def unit(x: np.ndarray) -> np.ndarray:
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def neighbours(vectors: np.ndarray, k: int) -> np.ndarray:
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def compare(reference: np.ndarray, candidate: np.ndarray, k: int) -> dict:
+    cosines = np.sum(reference * candidate, axis=1)
+    ref_nn, cand_nn = neighbours(reference, k), neighbours(candidate, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_nn, cand_nn)])
+    return {
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "min_cosine": round(float(cosines.min()), 5),
+        f"neighbour_overlap@{k}": round(float(overlap), 4),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Embedding runtime accuracy check")
+    parser.add_argument("--model", default=settings.EMBED_MODEL)
+    parser.add_argument("--runtime", action="append", choices=SentenceTransformerBackend.RUNTIMES[1:],
+                        help="runtime to check against torch (repeatable; default: all)")
+    parser.add_argument("--corpus", help="text file, one text per line")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = SAMPLE_CORPUS
+    k = min(args.top_k, len(texts) - 1)
+
+    reference = unit(np.asarray(SentenceTransformerBackend(args.model, "torch").encode(texts), dtype=np.float32))
+    failed = False
+    for runtime in args.runtime or SentenceTransformerBackend.RUNTIMES[1:]:
+        try:
+            candidate = unit(np.asarray(SentenceTransformerBackend(args.model, runtime).encode(texts), dtype=np.float32))
+        except Exception as e:
+            print(f"{runtime:10s} unavailable: {e}")
+            continue
+        result = compare(reference, candidate, k)
+        ok = result["min_cosine"] >= args.min_cosine
+        failed |= not ok
+        print(f"{runtime:10s} {result} {'OK' if ok else 'BELOW THRESHOLD'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Latency/memory benchmark of the embedding runtimes on this CPU.
+
+Each runtime runs in its own subprocess so peak RSS reflects that runtime
+alone. Reported per runtime: model load time, single-query encode latency
+(p50/p95), batch throughput and peak RSS.
+
+Usage: python scripts/embedding_benchmark.py [--runtime torch --runtime onnx ...] [--queries 200]
+       [--batch-size 32]
+The onnx runtimes need the optional extra: pip install -r requirements-onnx.txt
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from shared.utils.config import settings
+from shared.utils.embeddings import SentenceTransformerBackend
+
+QUERIES = [
+    "homestay near Velhe", "farm stay with rice fields", "beach hut Goa", "Rajgad fort trek",
+    "budget rooms Mumbai", "waterfall picnic Lonavala", "heritage walk Pune", "camping Pawna lake",
+]
+
+
+def run_one(model: str, runtime: str, n: int, batch_size: int) -> dict:
+    backend = SentenceTransformerBackend(model, runtime)
+    started = time.perf_counter()
+    backend.encode(["warm up"])
+    load_s = time.perf_counter() - started
+
+    latencies = []
+    for i in range(n):
+        # Distinct strings so nothing is served from a cache
+        text = f"{QUERIES[i % len(QUERIES)]} {i}"
+        t0 = time.perf_counter()
+        backend.encode([text])
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    batch = [f"{QUERIES[i % len(QUERIES)]} batch {i}" for i in range(batch_size)]
+    t0 = time.perf_counter()
+    rounds = max(1, n // batch_size)
+    for _ in range(rounds):
+        backend.encode(batch)
+    throughput = rounds * batch_size / (time.perf_counter() - t0)
+
+    return {
+        "runtime": runtime,
+        "load_s": round(load_s, 2),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "batch_texts_per_s": round(throughput, 1),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Embedding runtime latency benchmark")
+    parser.add_argument("--model", default=settings.EMBED_MODEL)
+    parser.add_argument("--runtime", action="append", choices=SentenceTransformerBackend.RUNTIMES,
+                        help="runtime to benchmark (repeatable; default: all)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_one(args.model, args.runtime[0], args.queries, args.batch_size)))
+        return 0
+
+    for runtime in args.runtime or SentenceTransformerBackend.RUNTIMES:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--runtime", runtime, "--model", args.model,
+               "--queries", str(args.queries), "--batch-size", str(args.batch_size)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{runtime:10s} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        print(proc.stdout.strip().splitlines()[-1])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
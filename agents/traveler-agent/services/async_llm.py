@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import httpx
+
+from shared.utils.config import settings
+from shared.utils.llm_cache import get_llm_cache, make_key
+from shared.utils.llm_scheduler import get_llm_scheduler
+
+
+class AsyncOllamaLocal:
+    """
+    OllamaLocal for the async app: httpx instead of requests, same cache keys
+    and the same scheduler gates, so sync and async callers share one limit.
+    """
+
+    def __init__(self, url: str = None, priority: str = "interactive"):
+        self.url = (url or settings.OLLAMA_URL).rstrip('/')
+        self.cache = get_llm_cache()
+        self.priority = priority
+        self.scheduler = get_llm_scheduler()
+        self.http = httpx.AsyncClient(
+            timeout=120,
+            limits=httpx.Limits(max_connections=settings.HTTP_POOL_SIZE),
+            transport=httpx.AsyncHTTPTransport(retries=settings.HTTP_RETRIES),
+        )
+
+    async def _cache_get(self, key: str):
+        if self.cache is None:
+            return None
+        # The persistent tier (disk/Mongo) blocks; the in-memory LRU doesn't
+        if self.cache.persistent is not None:
+            return await asyncio.to_thread(self.cache.get, key)
+        return self.cache.get(key)
+
+    async def _cache_set(self, key: str, value: str):
+        if self.cache is None:
+            return
+        if self.cache.persistent is not None:
+            await asyncio.to_thread(self.cache.set, key, value)
+        else:
+            self.cache.set(key, value)
+
+    async def generate(self, prompt: str, model: str = "llama3.2", use_cache: bool = True) -> str:
+        key = make_key(model, prompt)
+        if use_cache:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                return cached
+        async with self.scheduler.aslot(model, self.priority):
+            resp = await self.http.post(
+                f"{self.url}/api/generate",
+                json={"model": model, "prompt": prompt, "stream": False},
+            )
+        resp.raise_for_status()
+        # Ollama returns response field with generated text
+        text = resp.json().get("response", "")
+        if use_cache:
+            await self._cache_set(key, text)
+        return text
+
+    async def generate_stream(self, prompt: str, model: str = "llama3.2", use_cache: bool = True):
+        """Yield response text chunks as Ollama produces them (stream=True NDJSON)."""
+        key = make_key(model, prompt)
+        if use_cache:
+            cached = await self._cache_get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        # The slot is held until the stream finishes or the client goes away
+        async with self.scheduler.aslot(model, self.priority), self.http.stream(
+            "POST",
+            f"{self.url}/api/generate",
+            json={"model": model, "prompt": prompt, "stream": True},
+        ) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                chunk = data.get("response", "")
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+                if data.get("done"):
+                    break
+
+        # Only complete generations are cached
+        if use_cache:
+            await self._cache_set(key, "".join(parts))
+
+    async def aclose(self):
+        await self.http.aclose()
@@ -0,0 +1,37 @@
+import asyncio
+from typing import Any, Dict, List
+
+from qdrant_client import AsyncQdrantClient
+
+from services.vector_client import (
+    QDRANT_URL, LISTINGS_COLLECTION, EVENTS_COLLECTION, get_query_embedding, query_kwargs, to_hits,
+)
+
+
+class AsyncVectorSearch:
+    """
+    Qdrant search for the async app. Same collections, filters, search params
+    and result shapes as services/vector_client.py; collection setup stays
+    with the sync `qdrant` dependency, which warmup initializes.
+    """
+
+    def __init__(self, url: str = QDRANT_URL):
+        self.client = AsyncQdrantClient(url=url)
+
+    async def search(self, collection: str, query: str, top_k: int = 5, filters: Dict[str, Any] = None,
+                     with_scores: bool = False) -> List[Dict[str, Any]]:
+        # Encoding is CPU-bound (and micro-batched): keep it off the event loop
+        embedding = (await asyncio.to_thread(get_query_embedding, query)).tolist()
+        response = await self.client.query_points(**query_kwargs(collection, embedding, top_k, filters))
+        return to_hits(response, with_scores)
+
+    async def search_listings(self, query: str, top_k: int = 5, filters: Dict[str, Any] = None,
+                              with_scores: bool = False) -> List[Dict[str, Any]]:
+        return await self.search(LISTINGS_COLLECTION, query, top_k, filters, with_scores)
+
+    async def search_events(self, query: str, top_k: int = 5, filters: Dict[str, Any] = None,
+                            with_scores: bool = False) -> List[Dict[str, Any]]:
+        return await self.search(EVENTS_COLLECTION, query, top_k, filters, with_scores)
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,72 @@
+import threading
+
+from services.mq import MQConsumer
+from services.search_cache import SearchCache, COLLECTION_KINDS, TEXT_FIELDS
+from services.lexical_index import LexicalIndex
+from services.vector_client import EMBED_MODEL
+from shared.utils.mongo_client import db
+from shared.utils.lazy import Lazy, start_warmup
+from shared.utils.vector_registry import document_text
+from shared.utils.config import settings
+
+# In-process search state shared by the WSGI (app.py) and ASGI (asgi_app.py) apps
+
+# Fresh listings/events from the vendor agent, searchable without Qdrant/Mongo round trips
+search_cache = SearchCache(max_items=settings.SEARCH_CACHE_MAX_ITEMS)
+# BM25 index over all listings/events, fused with vector hits in /search
+lexical_index = LexicalIndex()
+
+def index_created(kind: str):
+    def handler(routing_key, payload):
+        lexical_index.add(kind, payload)
+        search_cache.upsert(kind, payload, EMBED_MODEL().embed(document_text(payload)))
+    return handler
+
+def on_metadata_updated(routing_key, payload):
+    kind = COLLECTION_KINDS.get(payload.get("collection"))
+    update = payload.get("update") or {}
+    if not kind or not payload.get("id"):
+        return
+    lexical_index.update(kind, payload["id"], update)
+    doc = search_cache.update(kind, payload["id"], update)
+    # Re-embed only when the searchable text changed
+    if doc is not None and any(f in update for f in TEXT_FIELDS):
+        search_cache.upsert(kind, doc, EMBED_MODEL().embed(document_text(doc)))
+
+# Background subscriber to MQ events to keep the search cache current; it consumes from
+# its own per-process queue, so every worker's cache and lexical index see every event
+def start_mq() -> MQConsumer:
+    consumer = MQConsumer()
+    consumer.register("listing.created", index_created("listing"))
+    consumer.register("event.created", index_created("event"))
+    consumer.register("metadata.updated", on_metadata_updated)
+    threading.Thread(target=consumer.start, name="mq-consumer", daemon=True).start()
+    return consumer
+
+def bootstrap_lexical_index() -> int:
+    if not settings.LEXICAL_BOOTSTRAP:
+        return 0
+    count = lexical_index.bootstrap(db, {"listings": "listing", "events": "event"})
+    print(f"[Lexical] Indexed {count} documents from Mongo")
+    return count
+
+# Started by start_background() (app startup hooks) or /warmup instead of at import, so the app imports offline
+mq_consumer = Lazy("mq_consumer", start_mq)
+lexical_bootstrap = Lazy("lexical_index", bootstrap_lexical_index)
+
+_background = None
+_background_lock = threading.Lock()
+
+def start_background() -> threading.Thread:
+    """
+    Start the MQ consumer and lexical bootstrap (and, with WARMUP_ON_START, all
+    models and clients) once per process. Called from the apps' startup hooks,
+    since WSGI/ASGI servers never run __main__.
+    """
+    global _background
+    if _background is None:
+        with _background_lock:
+            if _background is None:
+                names = None if settings.WARMUP_ON_START else ["mq_consumer", "lexical_index"]
+                _background = start_warmup(names)
+    return _background
@@ -0,0 +1,139 @@
+import math
+import heapq
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from services.text_utils import tokenize, payload_text
+from shared.utils.vector_registry import matches_payload_filter
+
+
+class _KindPostings:
+    """BM25 postings for one item kind: term -> {doc_id: tf}, plus per-doc lengths."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_len: Dict[str, int] = {}
+        self.docs: Dict[str, dict] = {}
+        self.total_len = 0
+
+    def add(self, doc_id: str, doc: dict):
+        self.remove(doc_id)
+        terms = Counter(tokenize(payload_text(doc)))
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.doc_terms[doc_id] = terms
+        self.doc_len[doc_id] = sum(terms.values())
+        self.docs[doc_id] = doc
+        self.total_len += self.doc_len[doc_id]
+
+    def remove(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, None)
+        self.docs.pop(doc_id, None)
+        if terms is None:
+            return
+        self.total_len -= self.doc_len.pop(doc_id)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+
+
+class LexicalIndex:
+    """
+    Incremental in-memory BM25 inverted index over listing/event text
+    (title, description, tags, location), one index per kind.
+    Fed from listing.created / event.created / metadata.updated messages and
+    bootstrapped from Mongo, so exact words such as village, tag or vendor
+    names are found even when the embedding misses them.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._kinds = {"listing": _KindPostings(), "event": _KindPostings()}
+
+    def add(self, kind: str, doc: dict):
+        doc_id = doc.get("id")
+        if not doc_id:
+            return
+        doc = {k: v for k, v in doc.items() if k != "_id"}
+        with self._lock:
+            self._kinds[kind].add(doc_id, doc)
+
+    def update(self, kind: str, doc_id: str, fields: dict) -> Optional[dict]:
+        """Merge `fields` into an indexed doc and re-index it; None if the doc isn't indexed."""
+        with self._lock:
+            index = self._kinds[kind]
+            doc = index.docs.get(doc_id)
+            if doc is None:
+                return None
+            doc = {**doc, **fields}
+            index.add(doc_id, doc)
+            return doc
+
+    def remove(self, kind: str, doc_id: str):
+        with self._lock:
+            self._kinds[kind].remove(doc_id)
+
+    def search(self, kind: str, query: str, top_k: int = 10, payload_filter: dict = None) -> List[Tuple[str, float, dict]]:
+        """BM25 top-k over indexed items of `kind` as (id, score, doc)."""
+        terms = set(tokenize(query))
+        with self._lock:
+            index = self._kinds[kind]
+            n = len(index.docs)
+            if not terms or not n:
+                return []
+            avg_len = max(index.total_len / n, 1.0)
+            scores: Dict[str, float] = {}
+            for term in terms:
+                docs = index.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log1p((n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * index.doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if payload_filter:
+                scores = {d: s for d, s in scores.items() if matches_payload_filter(index.docs[d], payload_filter)}
+            top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [(doc_id, score, index.docs[doc_id]) for doc_id, score in top]
+
+    def bootstrap(self, db, collections: Dict[str, str]) -> int:
+        """Index every document of the given Mongo collections ({collection: kind}); returns the count."""
+        count = 0
+        for collection, kind in collections.items():
+            for doc in db[collection].find({}, {"_id": 0}):
+                self.add(kind, doc)
+                count += 1
+        return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {kind: {"docs": len(index.docs), "terms": len(index.postings)} for kind, index in self._kinds.items()}
+
+
+def reciprocal_rank_fusion(rankings: List[List[dict]], k: int = 60, score_fields: Sequence[str] = ()) -> List[dict]:
+    """
+    Fuse ranked lists of {"id", "score", "payload"} hits: each hit scores sum(1 / (k + rank)).
+    The first non-empty payload seen for an id is kept. With score_fields (one name per ranking),
+    each list's own score is kept under that name, None where the list didn't return the id.
+    """
+    fused: Dict[str, dict] = {}
+    fields = list(score_fields) + [None] * (len(rankings) - len(score_fields))
+    for ranking, field in zip(rankings, fields):
+        for rank, hit in enumerate(ranking, start=1):
+            entry = fused.get(hit["id"])
+            if entry is None:
+                entry = fused[hit["id"]] = {"id": hit["id"], "score": 0.0, "payload": hit.get("payload") or {}}
+                entry.update(dict.fromkeys(score_fields))
+            entry["score"] += 1.0 / (k + rank)
+            if field:
+                entry[field] = hit.get("score")
+            if not entry["payload"]:
+                entry["payload"] = hit.get("payload") or {}
+    return sorted(fused.values(), key=lambda r: r["score"], reverse=True)
@@ -1,29 +1,69 @@
-import requests
+from shared.utils.http import get_http
 import json
 from shared.utils.config import settings
+from shared.utils.llm_cache import get_llm_cache, make_key
+from shared.utils.llm_scheduler import get_llm_scheduler
+from shared.utils.embeddings import get_embedding_service
 
 class OllamaLocal:
-    def __init__(self, url: str = None):
+    def __init__(self, url: str = None, priority: str = "interactive"):
         self.url = (url or settings.OLLAMA_URL).rstrip('/')
+        self.cache = get_llm_cache()
+        self.http = get_http()
+        self.priority = priority
+        self.scheduler = get_llm_scheduler()
 
-    def generate(self, prompt: str, model: str = "llama3.2") -> str:
-        resp = requests.post(
-            f"{self.url}/api/generate",
-            json={"model": model, "prompt": prompt, "stream": False},
-            timeout=120
-        )
+    def generate(self, prompt: str, model: str = "llama3.2", use_cache: bool = True) -> str:
+        if self.cache is None or not use_cache:
+            return self._generate(prompt, model)
+        return self.cache.get_or_generate(make_key(model, prompt), lambda: self._generate(prompt, model))
+
+    def _generate(self, prompt: str, model: str) -> str:
+        with self.scheduler.slot(model, self.priority):
+            resp = self.http.post(
+                f"{self.url}/api/generate",
+                json={"model": model, "prompt": prompt, "stream": False},
+                timeout=120
+            )
         resp.raise_for_status()
         data = resp.json()
         # Ollama returns response field with generated text
         return data.get("response", "")
 
+    def generate_stream(self, prompt: str, model: str = "llama3.2", use_cache: bool = True):
+        """Yield response text chunks as Ollama produces them (stream=True NDJSON)."""
+        key = make_key(model, prompt)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        # The slot is held until the stream finishes or the client goes away
+        with self.scheduler.slot(model, self.priority), self.http.post(
+            f"{self.url}/api/generate",
+            json={"model": model, "prompt": prompt, "stream": True},
+            stream=True,
+            timeout=120
+        ) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                chunk = data.get("response", "")
+                if chunk:
+                    parts.append(chunk)
+                    yield chunk
+                if data.get("done"):
+                    break
+
+        # Only complete generations are cached
+        if self.cache is not None and use_cache:
+            self.cache.set(key, "".join(parts))
+
     def embed(self, texts: list, model: str = "nomic-embed-text") -> list:
-        resp = requests.post(
-            f"{self.url}/api/embed",
-            json={"model": model, "input": texts},
-            timeout=30
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        # Ollama returns embeddings array
-        return data.get("embeddings", [data])
+        return get_embedding_service("ollama", model).embed_many(texts)
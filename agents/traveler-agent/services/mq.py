@@ -1,24 +1,105 @@
-import pika, json
+import pika, json, time, functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
 from shared.utils.config import settings
 
+
+def topic_matches(pattern: str, routing_key: str) -> bool:
+    """AMQP topic matching: `*` is exactly one word, `#` is zero or more words."""
+    def match(p: List[str], k: List[str]) -> bool:
+        if not p:
+            return not k
+        if p[0] == "#":
+            return any(match(p[1:], k[i:]) for i in range(len(k) + 1))
+        if not k:
+            return False
+        return (p[0] == "*" or p[0] == k[0]) and match(p[1:], k[1:])
+    return match(pattern.split("."), routing_key.split("."))
+
+
 class MQConsumer:
-    def __init__(self, queue_name='traveler_events'):
+    """
+    Topic consumer with handler registration and a worker pool.
+    basic_qos caps unacked deliveries at `prefetch`; each delivery runs its
+    matching handlers on the pool and is acked (from the connection thread,
+    as pika requires) only after they finish. A delivery whose handler fails
+    is requeued once, then rejected.
+
+    Without `queue_name` each process (and each reconnect) gets its own
+    exclusive, auto-delete queue bound to the exchange, so every process sees
+    every event: use this for per-process state such as the search cache and
+    lexical index. A named queue is durable and shared, so competing consumers
+    split its messages: use it for work that must be handled once.
+    """
+
+    def __init__(self, queue_name: str = None, prefetch: int = None, workers: int = None):
+        self.queue_name = queue_name
+        self.queue = queue_name
+        self.prefetch = prefetch or settings.MQ_PREFETCH
+        self.workers = workers or settings.MQ_CONSUMER_WORKERS
+        self.handlers: List[Tuple[str, Callable]] = []
+        self.conn = None
+        self.ch = None
+
+    def register(self, pattern: str, handler: Callable[[str, dict], None]):
+        """Run `handler(routing_key, payload)` for messages whose routing key matches `pattern`."""
+        self.handlers.append((pattern, handler))
+
+    def _connect(self):
         params = pika.URLParameters(settings.RABBITMQ_URL)
         self.conn = pika.BlockingConnection(params)
         self.ch = self.conn.channel()
-        self.queue = queue_name
-        self.ch.queue_declare(queue=self.queue, durable=True)
+        if self.queue_name:
+            self.queue = self.queue_name
+            self.ch.queue_declare(queue=self.queue, durable=True)
+        else:
+            # Broker-named queue that lives as long as this connection
+            self.queue = self.ch.queue_declare(queue="", exclusive=True, auto_delete=True).method.queue
         # bind to exchange
         self.ch.exchange_declare(exchange="hyperlocal", exchange_type='topic', durable=True)
         self.ch.queue_bind(queue=self.queue, exchange="hyperlocal", routing_key="#")
+        self.ch.basic_qos(prefetch_count=self.prefetch)
 
-    def start(self, callback):
-        def on_message(ch, method, properties, body):
+    def _handle(self, conn, ch, method, body):
+        ok = True
+        try:
             payload = json.loads(body.decode('utf-8'))
-            callback(method.routing_key, payload)
-            ch.basic_ack(method.delivery_tag)
-        self.ch.basic_consume(self.queue, on_message)
+            for pattern, handler in self.handlers:
+                if topic_matches(pattern, method.routing_key):
+                    handler(method.routing_key, payload)
+        except Exception as e:
+            ok = False
+            print(f"[MQ] Handler failed for {method.routing_key}: {e}")
+        if ok:
+            settle = functools.partial(ch.basic_ack, method.delivery_tag)
+        else:
+            settle = functools.partial(ch.basic_nack, method.delivery_tag, requeue=not method.redelivered)
         try:
-            self.ch.start_consuming()
-        except KeyboardInterrupt:
-            self.ch.stop_consuming()
+            conn.add_callback_threadsafe(settle)
+        except Exception as e:
+            # Connection gone; the broker redelivers unacked messages on reconnect
+            print(f"[MQ] Could not settle delivery: {e}")
+
+    def start(self, callback: Callable[[str, dict], None] = None):
+        """Consume forever, reconnecting on connection loss. `callback` is registered for every key."""
+        if callback:
+            self.register("#", callback)
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mq-consumer")
+        while True:
+            try:
+                self._connect()
+                conn = self.conn
+
+                def on_message(ch, method, properties, body):
+                    pool.submit(self._handle, conn, ch, method, body)
+
+                self.ch.basic_consume(self.queue, on_message)
+                self.ch.start_consuming()
+            except KeyboardInterrupt:
+                if self.ch:
+                    self.ch.stop_consuming()
+                break
+            except pika.exceptions.AMQPError as e:
+                print(f"[MQ] Consumer connection lost: {e}; reconnecting in {settings.MQ_RECONNECT_DELAY}s")
+                time.sleep(settings.MQ_RECONNECT_DELAY)
+        pool.shutdown(wait=True)
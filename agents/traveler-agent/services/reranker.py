@@ -1,14 +1,61 @@
 from services.llm import OllamaLocal
+from services.text_utils import tokenize, payload_text
+from shared.utils.config import settings
+from shared.utils.lru import LRUCache
+import numpy as np
+import hashlib
 import json
 import re
 
 llm = OllamaLocal()
 
-def rerank(results: list, query: str) -> list:
-    """Rerank results using LLM to improve relevance."""
-    if not results:
-        return results
-    
+# Final orders keyed by (query, candidate set, mode)
+RERANK_CACHE = LRUCache(max_entries=settings.RERANK_CACHE_SIZE, ttl=settings.RERANK_CACHE_TTL or None)
+
+def bm25_scores(query: str, docs: list, k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """BM25 of `query` against each doc text, with IDF taken over the candidate set."""
+    q_terms = list(dict.fromkeys(tokenize(query)))
+    if not q_terms or not docs:
+        return np.zeros(len(docs), dtype=np.float32)
+    doc_tokens = [tokenize(d) for d in docs]
+    col = {t: j for j, t in enumerate(q_terms)}
+    tf = np.zeros((len(docs), len(q_terms)), dtype=np.float32)
+    for i, tokens in enumerate(doc_tokens):
+        for t in tokens:
+            j = col.get(t)
+            if j is not None:
+                tf[i, j] += 1
+    lengths = np.array([len(t) for t in doc_tokens], dtype=np.float32)
+    avg_len = max(lengths.mean(), 1.0)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5))
+    norm = k1 * (1 - b + b * lengths / avg_len)
+    return ((tf * (k1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+def _minmax(x: np.ndarray) -> np.ndarray:
+    span = x.max() - x.min() if len(x) else 0
+    return (x - x.min()) / span if span > 0 else np.zeros_like(x)
+
+def fast_scores(results: list, query: str, alpha: float = None) -> np.ndarray:
+    """
+    Fuse min-max normalised BM25 and vector scores: alpha * lexical + (1 - alpha) * vector.
+    Fused (RRF) hits carry the similarity as "vector_score"; their "score" already counts BM25.
+    """
+    alpha = settings.RERANK_ALPHA if alpha is None else alpha
+    lexical = bm25_scores(query, [payload_text(r.get("payload") or {}) for r in results])
+    vector = np.array([float(r.get("vector_score", r.get("score")) or 0) for r in results], dtype=np.float32)
+    return alpha * _minmax(lexical) + (1 - alpha) * _minmax(vector)
+
+def is_ambiguous(scores: np.ndarray, margin: float = None) -> bool:
+    """True when the fast scorer can't separate the top two candidates."""
+    margin = settings.RERANK_AMBIGUITY_MARGIN if margin is None else margin
+    if len(scores) < 2:
+        return False
+    top2 = np.sort(scores)[-2:]
+    return float(top2[1] - top2[0]) < margin
+
+def llm_rerank(results: list, query: str):
+    """Rerank results using LLM to improve relevance; None if the call fails, is shed or can't be parsed."""
     try:
         items_text = "\n".join([f"{i+1}. (id={r['id']}) {r['payload'].get('title','')} - {r['payload'].get('description','')}" for i, r in enumerate(results)])
         prompt = f"Rerank the following search results for the search '{query}'. Output ONLY a JSON array of ids in best-to-worst order, like [\"id1\", \"id2\"]:\n{items_text}"
@@ -33,5 +80,38 @@ def rerank(results: list, query: str) -> list:
     except Exception as e:
         print(f"Reranking failed: {e}")
     
-    # Fallback: return original order if parsing fails
-    return results
+    return None
+
+def _cache_key(query: str, results: list, mode: str) -> str:
+    ids = sorted(str(r.get("id")) for r in results)
+    raw = json.dumps([" ".join(query.lower().split()), ids, mode])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def rerank(results: list, query: str, mode: str = "auto") -> list:
+    """
+    Tiered reranking.
+    mode "fast": BM25 + vector score fusion only.
+    mode "llm":  fast ordering, then the LLM reranks.
+    mode "auto": LLM only when RERANK_LLM_AUTO is on and the fast top two are within the ambiguity margin.
+    """
+    if not results:
+        return results
+
+    key = _cache_key(query, results, mode)
+    cached = RERANK_CACHE.get(key)
+    if cached is not None:
+        by_id = {r.get("id"): r for r in results}
+        return [by_id[i] for i in cached if i in by_id]
+
+    scores = fast_scores(results, query)
+    order = np.argsort(-scores, kind="stable")
+    ranked = [results[i] for i in order]
+    if mode == "llm" or (mode == "auto" and settings.RERANK_LLM_AUTO and is_ambiguous(scores)):
+        llm_ranked = llm_rerank(ranked, query)
+        if llm_ranked is None:
+            # Serve the fast order but don't cache it, so the next request tries the LLM again
+            return ranked
+        ranked = llm_ranked
+
+    RERANK_CACHE.set(key, [r.get("id") for r in ranked])
+    return ranked
@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared.utils.vector_registry import EMBED_DIM
+
+# Mongo collection name -> item kind, as used in metadata.updated messages
+COLLECTION_KINDS = {"listings": "listing", "events": "event"}
+TEXT_FIELDS = ("title", "description", "tags")
+
+
+class _KindIndex:
+    """Fixed-capacity float32 matrix of unit vectors plus the docs they belong to."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.used = np.zeros(capacity, dtype=bool)
+        self.slots: "OrderedDict[str, int]" = OrderedDict()  # id -> row, oldest first
+        self.docs: Dict[str, dict] = {}
+        self.free = list(range(capacity - 1, -1, -1))
+
+    def upsert(self, doc_id: str, doc: dict, vector: Optional[np.ndarray]):
+        if doc_id in self.slots:
+            self.slots.move_to_end(doc_id)
+            slot = self.slots[doc_id]
+        else:
+            if not self.free:
+                # Full: evict the oldest item
+                old_id, slot = self.slots.popitem(last=False)
+                self.docs.pop(old_id, None)
+            else:
+                slot = self.free.pop()
+            self.slots[doc_id] = slot
+            self.used[slot] = False
+        self.docs[doc_id] = doc
+        if vector is not None:
+            self.matrix[slot] = vector
+            self.used[slot] = True
+
+    def remove(self, doc_id: str):
+        slot = self.slots.pop(doc_id, None)
+        if slot is not None:
+            self.used[slot] = False
+            self.free.append(slot)
+        self.docs.pop(doc_id, None)
+
+
+class SearchCache:
+    """
+    Search-side cache of listings/events announced on the MQ.
+    Holds the documents for id lookups and a small in-memory cosine index so
+    freshly created items are searchable before (or without) Qdrant and Mongo
+    round trips. Oldest items are evicted once `max_items` per kind is reached.
+    """
+
+    def __init__(self, dim: int = EMBED_DIM, max_items: int = 5000):
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._kinds = {kind: _KindIndex(dim, max_items) for kind in COLLECTION_KINDS.values()}
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def upsert(self, kind: str, doc: dict, vector=None):
+        doc_id = doc.get("id")
+        if not doc_id:
+            return
+        vec = self._normalize(vector) if vector is not None else None
+        if vec is not None and vec.shape != (self.dim,):
+            raise ValueError(f"expected a {self.dim}-dim vector, got {vec.shape}")
+        with self._lock:
+            self._kinds[kind].upsert(doc_id, dict(doc), vec)
+
+    def update(self, kind: str, doc_id: str, fields: dict) -> Optional[dict]:
+        """Merge `fields` into a cached doc; returns the updated doc, or None if not cached."""
+        with self._lock:
+            index = self._kinds[kind]
+            doc = index.docs.get(doc_id)
+            if doc is None:
+                return None
+            doc = {**doc, **fields}
+            index.docs[doc_id] = doc
+            return doc
+
+    def remove(self, kind: str, doc_id: str):
+        with self._lock:
+            self._kinds[kind].remove(doc_id)
+
+    def get(self, doc_id: str, kind: str = None) -> Optional[dict]:
+        with self._lock:
+            for name, index in self._kinds.items():
+                if kind in (None, name) and doc_id in index.docs:
+                    return index.docs[doc_id]
+        return None
+
+    def search(self, kind: str, query_vector, top_k: int = 10) -> List[Tuple[str, float, dict]]:
+        """Cosine top-k over cached items of `kind` as (id, score, doc)."""
+        q = self._normalize(query_vector)
+        with self._lock:
+            index = self._kinds[kind]
+            if not index.slots:
+                return []
+            scores = index.matrix @ q
+            scores[~index.used] = -np.inf
+            k = min(top_k, int(index.used.sum()))
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            by_slot = {slot: doc_id for doc_id, slot in index.slots.items()}
+            return [(by_slot[s], float(scores[s]), index.docs[by_slot[s]]) for s in top if s in by_slot]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {kind: {"docs": len(index.docs), "vectors": int(index.used.sum())} for kind, index in self._kinds.items()}
@@ -0,0 +1,19 @@
+import re
+from typing import List
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from in is it near of on or the to with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without common English stopwords."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def payload_text(payload: dict) -> str:
+    """Searchable text of a listing/event payload: title, description, tags and location."""
+    tags = payload.get("tags") or []
+    return " ".join([payload.get("title") or "", payload.get("description") or "", " ".join(tags), payload.get("location") or ""])
@@ -1,18 +1,46 @@
 # services/vector_client.py
 
 import os
+import numpy as np
 from typing import List, Dict, Any
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct, Filter
-from sentence_transformers import SentenceTransformer
+from qdrant_client.models import (
+    VectorParams, PointStruct, Filter, PayloadSchemaType, HnswConfigDiff, ScalarQuantization,
+    ProductQuantization, SearchParams,
+)
+from shared.utils.config import settings
+from shared.utils.lru import LRUCache
+from shared.utils.lazy import Lazy
+from shared.utils.vector_registry import (
+    PAYLOAD_INDEXES, VECTOR_COLLECTIONS, build_payload_filter, check_collection_size, collection_config,
+    search_params, slim_payload, verify_embedding_model,
+)
 
 # -----------------------------------------------------
 # 1. Embedding model (local)
 # -----------------------------------------------------
-EMBED_MODEL = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# Same model the vendor agent indexes with; concurrent queries are micro-batched into one encode call.
+# Loaded (and its dimension checked) on first use rather than at import.
+EMBED_MODEL = Lazy("embedding_model", verify_embedding_model)
+
+# Query vectors keyed by whitespace-normalized text, stored as read-only float32 arrays
+QUERY_CACHE = LRUCache(max_entries=settings.QUERY_EMBED_CACHE_SIZE)
+
+def normalize_query(text: str) -> str:
+    # Cache key only: the model still embeds the text as given, case included
+    return " ".join(text.split())
+
+def get_query_embedding(text: str) -> np.ndarray:
+    key = normalize_query(text)
+    vec = QUERY_CACHE.get(key)
+    if vec is None:
+        vec = np.asarray(EMBED_MODEL().embed(text), dtype=np.float32)
+        vec.setflags(write=False)
+        QUERY_CACHE.set(key, vec)
+    return vec
 
 def get_embedding(text: str):
-    return EMBED_MODEL.encode(text).tolist()
+    return get_query_embedding(text).tolist()
 
 
 # -----------------------------------------------------
@@ -20,77 +48,112 @@ def get_embedding(text: str):
 # -----------------------------------------------------
 QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333")
 
-qdrant = QdrantClient(url=QDRANT_URL)
 
 
 # -----------------------------------------------------
 # 3. COLLECTIONS
 # -----------------------------------------------------
-LISTINGS_COLLECTION = "travel_listings"
-EVENTS_COLLECTION = "events"
-
-# Create collections if not exist
-def init_vector_collections():
-    try:
-        qdrant.get_collection(LISTINGS_COLLECTION)
-    except:
-        qdrant.create_collection(
-            LISTINGS_COLLECTION,
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-        )
-
-    try:
-        qdrant.get_collection(EVENTS_COLLECTION)
-    except:
-        qdrant.create_collection(
-            EVENTS_COLLECTION,
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE),
-        )
+LISTINGS_COLLECTION = VECTOR_COLLECTIONS["listings"]
+EVENTS_COLLECTION = VECTOR_COLLECTIONS["events"]
+
+def ensure_payload_indexes(client: QdrantClient, collection: str):
+    # Indexed fields keep filtered search sub-linear; re-creating an existing index is a no-op
+    for field, schema in PAYLOAD_INDEXES.items():
+        try:
+            client.create_payload_index(collection, field_name=field, field_schema=PayloadSchemaType(schema))
+        except Exception as e:
+            print(f"[Warn] Payload index {collection}.{field} not created: {e}")
+
+def create_collection_kwargs(config: dict) -> dict:
+    """qdrant-client arguments for a registry collection_config() (REST JSON) body."""
+    kwargs = {"vectors_config": VectorParams(**config["vectors"])}
+    if "on_disk_payload" in config:
+        kwargs["on_disk_payload"] = config["on_disk_payload"]
+    if "hnsw_config" in config:
+        kwargs["hnsw_config"] = HnswConfigDiff(**config["hnsw_config"])
+    quantization = config.get("quantization_config")
+    if quantization:
+        kind = ScalarQuantization if "scalar" in quantization else ProductQuantization
+        kwargs["quantization_config"] = kind(**quantization)
+    return kwargs
+
+# Create collections if not exist, with the configured profile (quantization, on-disk, HNSW)
+def init_vector_collections(client: QdrantClient):
+    for collection in (LISTINGS_COLLECTION, EVENTS_COLLECTION):
+        try:
+            info = client.get_collection(collection)
+        except:
+            client.create_collection(collection, **create_collection_kwargs(collection_config()))
+        else:
+            check_collection_size(collection, info.config.params.vectors.size)
+        ensure_payload_indexes(client, collection)
+
+def connect_qdrant() -> QdrantClient:
+    client = QdrantClient(url=QDRANT_URL)
+    init_vector_collections(client)
+    return client
+
+# Connected and collections checked on first use; a failed attempt is retried on the next call
+qdrant = Lazy("qdrant", connect_qdrant)
+
+def to_qdrant_filter(filters: Dict[str, Any] = None):
+    payload_filter = build_payload_filter(filters)
+    return Filter(**payload_filter) if payload_filter else None
+
+def to_search_params():
+    params = search_params()
+    return SearchParams(**params) if params else None
 
 
 # -----------------------------------------------------
 # 4. INSERT DATA INTO QDRANT
 # -----------------------------------------------------
 def upsert_listing_vector(id: str, text: str, metadata: dict):
-    embedding = get_embedding(text)
-    qdrant.upsert(
+    # Document text bypasses the query cache
+    embedding = EMBED_MODEL().embed(text)
+    qdrant().upsert(
         collection_name=LISTINGS_COLLECTION,
-        points=[PointStruct(id=id, vector=embedding, payload=metadata)],
+        points=[PointStruct(id=id, vector=embedding, payload=slim_payload(metadata))],
     )
 
 
 def upsert_event_vector(id: str, text: str, metadata: dict):
-    embedding = get_embedding(text)
-    qdrant.upsert(
+    embedding = EMBED_MODEL().embed(text)
+    qdrant().upsert(
         collection_name=EVENTS_COLLECTION,
-        points=[PointStruct(id=id, vector=embedding, payload=metadata)],
+        points=[PointStruct(id=id, vector=embedding, payload=slim_payload(metadata))],
     )
 
 
 # -----------------------------------------------------
 # 5. SEARCH FUNCTIONS
 # -----------------------------------------------------
-def search_listings_vector(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    embedding = get_embedding(query)
-    results = qdrant.search(
-        collection_name=LISTINGS_COLLECTION,
-        query_vector=embedding,
-        limit=top_k,
-    )
-    return [r.payload for r in results]
-
-
-def search_events_vector(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
-    embedding = get_embedding(query)
-    results = qdrant.search(
-        collection_name=EVENTS_COLLECTION,
-        query_vector=embedding,
-        limit=top_k,
-    )
-    return [r.payload for r in results]
-
-
-# -----------------------------------------------------
-# 6. INITIALIZE ON IMPORT
-# -----------------------------------------------------
-init_vector_collections()
+def query_kwargs(collection: str, embedding: List[float], top_k: int, filters: Dict[str, Any] = None) -> dict:
+    """query_points() arguments shared by the sync and async clients (search() was removed in qdrant-client 1.13)."""
+    return {
+        "collection_name": collection,
+        "query": embedding,
+        "query_filter": to_qdrant_filter(filters),
+        "search_params": to_search_params(),
+        "limit": top_k,
+    }
+
+def to_hits(response, with_scores: bool = False) -> List[Dict[str, Any]]:
+    if with_scores:
+        return [{"id": str(r.id), "score": r.score, "payload": r.payload} for r in response.points]
+    return [r.payload for r in response.points]
+
+def search_vectors(collection: str, query: str, top_k: int = 5, filters: Dict[str, Any] = None,
+                   with_scores: bool = False) -> List[Dict[str, Any]]:
+    response = qdrant().query_points(**query_kwargs(collection, get_embedding(query), top_k, filters))
+    return to_hits(response, with_scores)
+
+
+def search_listings_vector(query: str, top_k: int = 5, filters: Dict[str, Any] = None,
+                           with_scores: bool = False) -> List[Dict[str, Any]]:
+    return search_vectors(LISTINGS_COLLECTION, query, top_k, filters, with_scores)
+
+
+def search_events_vector(query: str, top_k: int = 5, filters: Dict[str, Any] = None,
+                         with_scores: bool = False) -> List[Dict[str, Any]]:
+    return search_vectors(EVENTS_COLLECTION, query, top_k, filters, with_scores)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi_app
+from services.lexical_index import LexicalIndex
+from services.search_cache import SearchCache
+from shared.utils.llm_scheduler import LLMOverloaded
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length] if length else list(self.docs)
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """Async PyMongo-style collection over a list: flat equality and {"$in": [...]} queries."""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query, projection=None):
+        def match(doc):
+            for field, cond in query.items():
+                if isinstance(cond, dict) and "$in" in cond:
+                    if doc.get(field) not in cond["$in"]:
+                        return False
+                elif doc.get(field) != cond:
+                    return False
+            return True
+        return FakeCursor(dict(d) for d in self.docs if match(d))
+
+
+class FakeVectors:
+    def __init__(self, hits):
+        self.hits = hits
+        self.calls = []
+
+    async def search_listings(self, query, top_k=5, filters=None, with_scores=False):
+        self.calls.append(("listings", query, filters))
+        return [dict(h) for h in self.hits]
+
+    async def search_events(self, query, top_k=5, filters=None, with_scores=False):
+        self.calls.append(("events", query, filters))
+        return []
+
+
+class FakeLLM:
+    def __init__(self, reply="", chunks=(), error=None):
+        self.reply = reply
+        self.chunks = chunks
+        self.error = error
+        self.prompts = []
+
+    async def generate(self, prompt):
+        self.prompts.append(prompt)
+        if self.error:
+            raise self.error
+        return self.reply
+
+    async def generate_stream(self, prompt):
+        self.prompts.append(prompt)
+        if self.error:
+            raise self.error
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.fixture
+def adb(monkeypatch):
+    db = {
+        "listings": FakeCollection([{"id": "l1", "title": "Farm stay", "description": "Rice fields", "price": 900}]),
+        "events": FakeCollection([{"id": "e1", "title": "Harvest fair", "description": "Village fair"}]),
+        "user_history": FakeCollection([
+            {"user_id": "u1", "query": "old query", "timestamp": 1},
+            {"user_id": "u1", "query": "farm stay", "timestamp": 2},
+        ]),
+    }
+    adb = type("FakeDB", (), {"__getitem__": lambda self, name: db[name]})()
+    for name, col in db.items():
+        setattr(adb, name, col)
+    monkeypatch.setattr(asgi_app, "adb", adb)
+    monkeypatch.setattr(asgi_app, "search_cache", SearchCache(max_items=16))
+    monkeypatch.setattr(asgi_app, "lexical_index", LexicalIndex())
+    monkeypatch.setattr(asgi_app, "get_query_embedding", lambda query: [0.1] * 4)
+    return adb
+
+
+def _request(method, path, **kwargs):
+    async def call():
+        client = asgi_app.app.test_client()
+        resp = await getattr(client, method)(path, **kwargs)
+        return resp.status_code, resp.headers, await resp.get_data(as_text=True)
+    return asyncio.run(call())
+
+
+def test_search_hydrates_vector_hits(adb, monkeypatch):
+    vectors = FakeVectors([{"id": "l1", "score": 0.9, "payload": {"id": "l1", "price": 900}}])
+    monkeypatch.setattr(asgi_app, "vectors", vectors)
+    status, _, body = _request("post", "/agent/traveler/search",
+                               json={"query": "farm", "mode": "via_vendor", "filters": {"price_max": 1000}, "rerank": "fast"})
+    assert status == 200
+    results = json.loads(body)["results"]
+    assert [r["id"] for r in results] == ["l1"]
+    assert results[0]["payload"]["title"] == "Farm stay"
+    assert vectors.calls == [("listings", "farm", {"price_max": 1000})]
+
+    status, _, body = _request("post", "/agent/traveler/search",
+                               json={"query": "farm", "mode": "via_vendor", "filters": {"colour": "red"}})
+    assert status == 400
+
+
+def test_recommend_uses_latest_history(adb, monkeypatch):
+    vectors = FakeVectors([{"id": "l1", "price": 900}])
+    monkeypatch.setattr(asgi_app, "vectors", vectors)
+    status, _, body = _request("post", "/agent/traveler/recommend", json={"user_id": "u1"})
+    assert status == 200
+    out = json.loads(body)
+    assert out["vendor"][0]["title"] == "Farm stay" and out["agency"] == []
+    assert {c[1] for c in vectors.calls} == {"farm stay"}
+
+    status, _, body = _request("post", "/agent/traveler/recommend", json={"user_id": "nobody"})
+    assert json.loads(body) == {"vendor": [], "agency": []}
+
+
+def test_itinerary_and_message(adb, monkeypatch):
+    llm = FakeLLM(reply="Day 1: farm")
+    monkeypatch.setattr(asgi_app, "llm", llm)
+    status, _, body = _request("post", "/agent/traveler/itinerary", json={"user_id": "u1", "items": ["l1", "e1", "zz"]})
+    assert status == 200 and json.loads(body) == {"itinerary": "Day 1: farm"}
+    assert "Farm stay - Rice fields" in llm.prompts[0] and "Harvest fair - Village fair" in llm.prompts[0]
+
+    status, _, _ = _request("post", "/agent/traveler/itinerary", json={"user_id": "u1", "items": ["zz"]})
+    assert status == 404
+
+    status, _, body = _request("post", "/agent/traveler/message",
+                               json={"user_id": "u1", "target_id": "e1", "message_type": "negotiation"})
+    assert status == 200 and json.loads(body) == {"message": "Day 1: farm"}
+    assert "Harvest fair" in llm.prompts[-1]
+
+    monkeypatch.setattr(asgi_app, "llm", FakeLLM(error=LLMOverloaded("queue full", retry_after=2.4)))
+    status, headers, _ = _request("post", "/agent/traveler/message",
+                                  json={"user_id": "u1", "target_id": "e1", "message_type": "negotiation"})
+    assert status == 503 and headers["Retry-After"] == "2"
+
+
+def test_itinerary_streams_sse_events(adb, monkeypatch):
+    monkeypatch.setattr(asgi_app, "llm", FakeLLM(chunks=["Day 1: ", "farm"]))
+    status, headers, body = _request("post", "/agent/traveler/itinerary",
+                                     json={"user_id": "u1", "items": ["l1"], "stream": True})
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/event-stream")
+    assert body.split("\n\n") == [
+        "data: " + json.dumps({"token": "Day 1: "}),
+        "data: " + json.dumps({"token": "farm"}),
+        "event: done\ndata: {}",
+        "",
+    ]
+
+    # A shed stream is refused with 503 before any SSE headers are sent
+    monkeypatch.setattr(asgi_app, "llm", FakeLLM(error=LLMOverloaded("queue full", retry_after=3)))
+    status, headers, _ = _request("post", "/agent/traveler/message",
+                                  json={"user_id": "u1", "target_id": "e1", "message_type": "negotiation", "stream": True})
+    assert status == 503 and headers["Retry-After"] == "3"
+
+
+def test_ready_reports_dependencies(monkeypatch):
+    from shared.utils import lazy
+
+    monkeypatch.setattr(lazy, "_registry", {})
+    lazy.Lazy("mq_consumer", lambda: "consumer")
+    status, _, body = _request("get", "/agent/traveler/ready")
+    assert status == 503
+    assert json.loads(body)["dependencies"]["mq_consumer"]["ready"] is False
+
+    status, _, body = _request("post", "/agent/traveler/warmup")
+    assert status == 200 and json.loads(body)["ready"] is True
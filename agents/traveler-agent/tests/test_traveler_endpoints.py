@@ -0,0 +1,201 @@
+def test_topic_matches():
+    from services.mq import topic_matches
+
+    assert topic_matches("listing.created", "listing.created")
+    assert topic_matches("listing.*", "listing.created")
+    assert topic_matches("#", "metadata.updated")
+    assert topic_matches("#.created", "event.created")
+    assert not topic_matches("listing.*", "event.created")
+    assert not topic_matches("*", "listing.created")
+
+
+def test_consumer_queue_per_process_unless_named(monkeypatch):
+    from types import SimpleNamespace
+    from services import mq
+
+    declared, bound = [], []
+
+    class FakeChannel:
+        def queue_declare(self, queue, **kwargs):
+            declared.append((queue, kwargs))
+            return SimpleNamespace(method=SimpleNamespace(queue=queue or "amq.gen-worker1"))
+
+        def exchange_declare(self, **kwargs):
+            pass
+
+        def queue_bind(self, queue, exchange, routing_key):
+            bound.append(queue)
+
+        def basic_qos(self, prefetch_count):
+            pass
+
+    connection = SimpleNamespace(channel=FakeChannel)
+    monkeypatch.setattr(mq.pika, "BlockingConnection", lambda params: connection)
+
+    # Every process gets its own copy of every event for its in-process caches
+    mq.MQConsumer()._connect()
+    assert declared[-1] == ("", {"exclusive": True, "auto_delete": True})
+    assert bound[-1] == "amq.gen-worker1"
+
+    # A named queue is shared by competing consumers
+    mq.MQConsumer(queue_name="traveler_jobs")._connect()
+    assert declared[-1] == ("traveler_jobs", {"durable": True})
+    assert bound[-1] == "traveler_jobs"
+
+
+def test_search_cache_indexes_and_evicts():
+    from services.search_cache import SearchCache
+
+    cache = SearchCache(dim=2, max_items=2)
+    cache.upsert("listing", {"id": "a", "title": "A"}, [1.0, 0.0])
+    cache.upsert("listing", {"id": "b", "title": "B"}, [0.0, 1.0])
+    assert [hit[0] for hit in cache.search("listing", [0.9, 0.1], top_k=2)] == ["a", "b"]
+
+    cache.update("listing", "a", {"price": 900})
+    assert cache.get("a")["price"] == 900
+
+    cache.upsert("listing", {"id": "c", "title": "C"}, [1.0, 1.0])
+    assert cache.get("a") is None
+    assert {hit[0] for hit in cache.search("listing", [1.0, 0.0], top_k=5)} == {"b", "c"}
+
+
+def test_fast_rerank_prefers_lexical_match_without_llm(monkeypatch):
+    from services import reranker
+
+    monkeypatch.setattr(reranker, "llm_rerank", lambda results, query: (_ for _ in ()).throw(AssertionError("LLM called")))
+    results = [
+        {"id": "1", "score": 0.50, "payload": {"title": "Beach hut", "description": "Sea view"}},
+        {"id": "2", "score": 0.48, "payload": {"title": "Velhe homestay", "description": "Quiet village stay", "tags": ["village"]}},
+        {"id": "3", "score": 0.10, "payload": {"title": "City hotel", "description": "Downtown"}},
+    ]
+    ranked = reranker.rerank(results, "homestay in Velhe village", mode="fast")
+    assert [r["id"] for r in ranked] == ["2", "1", "3"]
+    # Second call is served from the (query, candidate set) cache
+    assert reranker.rerank(list(reversed(results)), "homestay in velhe  village", mode="fast") == ranked
+
+
+def test_lexical_index_and_rrf():
+    from services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+    index = LexicalIndex()
+    index.add("listing", {"id": "a", "title": "Velhe homestay", "tags": ["village"], "price": 900})
+    index.add("listing", {"id": "b", "title": "Beach hut", "description": "Sea view", "price": 3000})
+    assert [hit[0] for hit in index.search("listing", "homestay in velhe")] == ["a"]
+    assert index.search("listing", "velhe", payload_filter={"must": [{"key": "price", "range": {"gte": 1000.0}}]}) == []
+
+    index.update("listing", "b", {"title": "Velhe beach hut"})
+    assert {hit[0] for hit in index.search("listing", "velhe")} == {"a", "b"}
+    index.remove("listing", "a")
+    assert [hit[0] for hit in index.search("listing", "velhe")] == ["b"]
+
+    vector = [{"id": "x", "score": 0.9, "payload": {}}, {"id": "b", "score": 0.8, "payload": {"title": "B"}}]
+    lexical = [{"id": "b", "score": 7.0, "payload": {"title": "B"}}]
+    fused = reciprocal_rank_fusion([vector, lexical], k=60)
+    assert [r["id"] for r in fused] == ["b", "x"]
+    assert fused[0]["score"] == 1 / 62 + 1 / 61
+    # Each list's own score survives fusion for the reranker
+    fused = reciprocal_rank_fusion([vector, lexical], k=60, score_fields=("vector_score", "lexical_score"))
+    assert fused[0]["vector_score"] == 0.8 and fused[0]["lexical_score"] == 7.0
+    assert fused[1] == {"id": "x", "score": 1 / 61, "payload": {}, "vector_score": 0.9, "lexical_score": None}
+
+
+def test_fast_rerank_uses_vector_score_of_fused_hits():
+    from services import reranker
+
+    # "b" leads on RRF score only because BM25 also ranked it; the vector side prefers "a"
+    results = [
+        {"id": "b", "score": 1 / 61 + 1 / 62, "vector_score": 0.2, "lexical_score": 3.0, "payload": {"title": "Hut"}},
+        {"id": "a", "score": 1 / 61, "vector_score": 0.9, "lexical_score": None, "payload": {"title": "Hut"}},
+    ]
+    scores = reranker.fast_scores(results, "beach", alpha=0.5)
+    assert list(scores) == [0.0, 0.5]
+
+
+def test_failed_llm_rerank_is_not_cached(monkeypatch):
+    from services import reranker
+
+    results = [
+        {"id": "x1", "score": 0.5, "payload": {"title": "Fort trek"}},
+        {"id": "x2", "score": 0.5, "payload": {"title": "Lake camp"}},
+    ]
+    monkeypatch.setattr(reranker, "llm_rerank", lambda results, query: None)
+    assert [r["id"] for r in reranker.rerank(results, "weekend outing", mode="llm")] == ["x1", "x2"]
+
+    monkeypatch.setattr(reranker, "llm_rerank", lambda results, query: list(reversed(results)))
+    assert [r["id"] for r in reranker.rerank(results, "weekend outing", mode="llm")] == ["x2", "x1"]
+
+
+def test_first_request_starts_background_consumers(monkeypatch):
+    import app as traveler_app
+    from services import indexing
+
+    started = []
+    monkeypatch.setattr(indexing, "_background", None)
+    monkeypatch.setattr(indexing, "start_warmup", lambda names: started.append(names) or "warmup-thread")
+    client = traveler_app.app.test_client()
+    client.get("/agent/traveler/ready")
+    client.get("/agent/traveler/ready")
+    assert len(started) == 1
+
+
+def test_itinerary_streams_sse_events(monkeypatch):
+    import json
+    import app as traveler_app
+    from services import indexing
+
+    monkeypatch.setattr(indexing, "_background", "started")
+    monkeypatch.setattr(traveler_app, "get_doc", lambda doc_id: {"title": "Fort trek", "description": "Sunrise hike"})
+    prompts = []
+
+    def generate_stream(prompt):
+        prompts.append(prompt)
+        yield "Day 1: "
+        yield "fort\ntrek"
+
+    monkeypatch.setattr(traveler_app.llm, "generate_stream", generate_stream)
+    client = traveler_app.app.test_client()
+    response = client.post("/agent/traveler/itinerary", json={"user_id": "u1", "items": ["l1"], "stream": True})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "Fort trek - Sunrise hike" in prompts[0]
+
+    # Every event is terminated by a blank line; newlines inside tokens stay JSON-escaped
+    frames = response.get_data(as_text=True).split("\n\n")
+    assert frames[-1] == ""
+    assert frames[:-1] == [
+        "data: " + json.dumps({"token": "Day 1: "}),
+        "data: " + json.dumps({"token": "fort\ntrek"}),
+        "event: done\ndata: {}",
+    ]
+
+    def failing_stream(prompt):
+        yield "Day 1"
+        raise RuntimeError("ollama went away")
+
+    monkeypatch.setattr(traveler_app.llm, "generate_stream", failing_stream)
+    response = client.post("/agent/traveler/itinerary", json={"user_id": "u1", "items": ["l1"], "stream": True})
+    frames = response.get_data(as_text=True).split("\n\n")
+    assert frames[-2] == "event: error\ndata: " + json.dumps({"error": "ollama went away"})
+    assert "event: done" not in response.get_data(as_text=True)
+
+
+def test_shed_stream_gets_503_before_headers(monkeypatch):
+    import app as traveler_app
+    from services import indexing
+    from shared.utils.llm_scheduler import LLMOverloaded
+
+    monkeypatch.setattr(indexing, "_background", "started")
+    monkeypatch.setattr(traveler_app, "get_doc", lambda doc_id: {"title": "Fort trek", "description": "Sunrise hike"})
+
+    def shed_stream(prompt):
+        raise LLMOverloaded("llama3.2: queue full", retry_after=3)
+        yield
+
+    monkeypatch.setattr(traveler_app.llm, "generate_stream", shed_stream)
+    client = traveler_app.app.test_client()
+    for path, body in (("/agent/traveler/itinerary", {"user_id": "u1", "items": ["l1"], "stream": True}),
+                       ("/agent/traveler/message", {"user_id": "u1", "target_id": "l1", "message_type": "negotiation", "stream": True})):
+        response = client.post(path, json=body)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
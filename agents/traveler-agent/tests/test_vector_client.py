@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import Distance, PointStruct, VectorParams
+
+from services import async_vector_client, vector_client
+
+POINTS = [
+    PointStruct(id=1, vector=[1.0, 0.0, 0.0, 0.0], payload={"id": "l1", "location": "Pune", "price": 900.0}),
+    PointStruct(id=2, vector=[0.9, 0.1, 0.0, 0.0], payload={"id": "l2", "location": "Goa", "price": 2500.0}),
+    PointStruct(id=3, vector=[0.0, 1.0, 0.0, 0.0], payload={"id": "l3", "location": "Pune", "price": 400.0}),
+]
+
+
+def _fill(client):
+    client.create_collection(vector_client.LISTINGS_COLLECTION, vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    client.upsert(vector_client.LISTINGS_COLLECTION, points=POINTS)
+
+
+@pytest.fixture
+def query_vector(monkeypatch):
+    vec = np.asarray([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+    monkeypatch.setattr(vector_client, "get_embedding", lambda query: vec.tolist())
+    monkeypatch.setattr(async_vector_client, "get_query_embedding", lambda query: vec)
+    return vec
+
+
+# Real (in-memory) qdrant-client instances, so a client method that no longer exists fails here
+def test_sync_search_against_real_client(query_vector, monkeypatch):
+    client = QdrantClient(location=":memory:")
+    _fill(client)
+    monkeypatch.setattr(vector_client, "qdrant", lambda: client)
+
+    hits = vector_client.search_listings_vector("farm", top_k=2, with_scores=True)
+    assert [h["payload"]["id"] for h in hits] == ["l1", "l2"]
+    assert hits[0]["id"] == "1" and hits[0]["score"] == pytest.approx(1.0)
+    payloads = vector_client.search_listings_vector("farm", filters={"location": "Pune", "price_max": 1000})
+    assert [p["id"] for p in payloads] == ["l1", "l3"]
+
+
+def test_async_search_against_real_client(query_vector):
+    async def run():
+        search = async_vector_client.AsyncVectorSearch()
+        search.client = AsyncQdrantClient(location=":memory:")
+        await search.client.create_collection(vector_client.LISTINGS_COLLECTION,
+                                              vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+        await search.client.upsert(vector_client.LISTINGS_COLLECTION, points=POINTS)
+        try:
+            return await search.search_listings("farm", top_k=5, filters={"location": "Goa"}, with_scores=True)
+        finally:
+            await search.close()
+
+    hits = asyncio.run(run())
+    assert [h["payload"]["id"] for h in hits] == ["l2"]
+
+
+def test_query_cache_keys_on_whitespace_but_embeds_original_text(monkeypatch):
+    embedded = []
+
+    class FakeModel:
+        def embed(self, text):
+            embedded.append(text)
+            return [float(len(embedded)), 0.0, 0.0, 0.0]
+
+    monkeypatch.setattr(vector_client, "EMBED_MODEL", lambda: FakeModel())
+    monkeypatch.setattr(vector_client, "QUERY_CACHE", vector_client.LRUCache(max_entries=8))
+
+    first = vector_client.get_query_embedding("  Goa   beach ")
+    assert vector_client.get_query_embedding("Goa beach") is first
+    # Case can change the vector for cased models, so it is not folded into the key
+    assert vector_client.get_query_embedding("goa beach")[0] == 2.0
+    assert embedded == ["  Goa   beach ", "goa beach"]
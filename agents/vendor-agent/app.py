@@ -1,14 +1,25 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from pymongo.errors import BulkWriteError
 from models import CreateListingPayload, CreateEventPayload
 
 from shared.utils.mongo_client import db
 from shared.schemas.listing_schema import ListingBase, EventBase, MediaItem
-from services.stt import get_stt_service
+from services.stt import get_stt_service, transcript_waiters
 from services.llm import OllamaWrapper
 from services.image_service import ImageEnhancer
-from services.vector_client import QdrantClientWrapper
+from services.media_cache import MediaFingerprintStore
+from services.vector_client import QdrantClientWrapper, create_upsert_buffer
 from services.mq import MQProducer
-import uuid, datetime, os, traceback
+from services.jobs import JobStore, LISTING_STAGES, EVENT_STAGES
+from shared.utils.llm_cache import get_llm_cache
+from shared.utils.llm_scheduler import LLMOverloaded, get_llm_scheduler
+from shared.utils.config import settings
+from shared.utils.http import get_http
+from shared.utils.lazy import Lazy, warmup, start_warmup, readiness
+from shared.utils.vector_registry import VECTOR_COLLECTIONS, VECTOR_SOURCES, embed_documents, slim_payload, verify_embedding_model
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import uuid, datetime, os, shutil, traceback, json, signal, sys
+from urllib.parse import urlsplit
 
 app = Flask(__name__)
 
@@ -16,26 +27,508 @@ app = Flask(__name__)
 UPLOAD_FOLDER = "/tmp/uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# Initialize services
-stt = get_stt_service()
+# Initialize services. Heavy or networked ones (STT backend, embedding model,
+# RabbitMQ) are built on first use or by warmup, so importing the app needs none of them.
+stt = Lazy("stt", get_stt_service)
 llm = OllamaWrapper()
 imgsvc = ImageEnhancer()
+# Processed media by content fingerprint, so re-uploads skip STT/enhancement/LLM
+media_cache = MediaFingerprintStore() if settings.MEDIA_CACHE_ENABLED else None
 vec = QdrantClientWrapper()
-mq = MQProducer()
+# Loads the model and checks it matches the registry dimension
+embedder = Lazy("embedding_model", verify_embedding_model)
 
-def persist_and_publish(obj: dict, collection: str, vector_collection: str, embedding: list, routing_key: str):
-    obj["id"] = obj.get("id") or str(uuid.uuid4())
+def mark_vectors_failed(vector_collection: str, points: list):
+    """Flag documents whose vectors could not be written so they can be re-indexed from Mongo."""
+    source = VECTOR_SOURCES.get(vector_collection)
+    if source:
+        db[source].update_many({"id": {"$in": [p["id"] for p in points]}}, {"$set": {"vector_status": "failed"}})
+
+vec_buffer = create_upsert_buffer(vec, on_drop=mark_vectors_failed)
+
+def sync_vector_payload(collection: str, obj_id: str, update: dict):
+    """
+    Copy the search fields of a metadata update onto the object's Qdrant point.
+    If the point can't be updated (not flushed yet, Qdrant down) the document is
+    flagged so the re-embed job rewrites its point from Mongo.
+    """
+    vector_collection = VECTOR_COLLECTIONS.get(collection)
+    payload = {k: v for k, v in slim_payload(update or {}).items() if k != "id"}
+    if not vector_collection or not payload:
+        return
+    try:
+        vec.set_payload(vector_collection, obj_id, payload)
+    except Exception as e:
+        print(f"[Warn] Qdrant payload update for {obj_id} failed, flagging for re-index: {e}")
+        mark_vectors_failed(vector_collection, [{"id": obj_id}])
+# Publishing only appends to the producer's outbox, so call sites never wait on RabbitMQ;
+# the "mq" dependency is ready once the producer has actually connected to the broker
+mq = Lazy("mq_outbox", MQProducer)
+
+def connect_mq() -> MQProducer:
+    producer = mq()
+    if not producer.wait_connected(settings.MQ_CONNECT_TIMEOUT):
+        raise ConnectionError(f"RabbitMQ at {producer.host} not reachable within {settings.MQ_CONNECT_TIMEOUT}s")
+    return producer
+
+mq_broker = Lazy("mq", connect_mq)
+jobs = JobStore()
+# Background pool for async ingestion (?async=1); each job runs one full pipeline
+ingest_pool = ThreadPoolExecutor(max_workers=settings.INGEST_WORKERS, thread_name_prefix="ingest")
+
+def embed_document(doc: dict):
+    """Registry embedding for a listing/event, or None if the model failed (indexed later by the re-embed job)."""
+    try:
+        embedder()
+        return embed_documents([doc])[0]
+    except Exception as e:
+        print(f"[Error] Embedding failed: {e}")
+        traceback.print_exc()
+        return None
+
+def persist_many(objs: list, collection: str, embeddings: list, routing_key: str, events: list = None,
+                 errors: dict = None) -> list:
+    """
+    Persist a batch: one unordered insert_many into Mongo, buffered vector upserts
+    into the registry collection and one batched MQ publish of each object's
+    `events` (a list of per-object event lists) followed by a `routing_key`
+    message per object. Objects without an embedding are stored with
+    vector_status "pending" instead of a placeholder vector.
+    Rows Mongo rejects get no vectors or messages: with an `errors` dict they
+    come back as None and `errors` maps their index to the reason, otherwise
+    the insert error is raised.
+    """
     now = datetime.datetime.utcnow()
-    # Store ISO format string for JSON serialization everywhere
-    obj["created_at"] = now.isoformat()
-    db[collection].insert_one(obj)
-    # Create clean payload without _id for Qdrant (MongoDB adds _id after insert_one)
-    payload_for_vec = {k: v for k, v in obj.items() if k != "_id"}
-    vec.upsert(vector_collection, [{"id": obj["id"], "vector": embedding, "payload": payload_for_vec}])
-    mq.publish("hyperlocal", routing_key, payload_for_vec)
-    # Return clean copy without MongoDB _id for JSON response
-    clean_obj = {k: v for k, v in obj.items() if k != "_id"}
-    return clean_obj
+    for obj, embedding in zip(objs, embeddings):
+        obj["id"] = obj.get("id") or str(uuid.uuid4())
+        # Store ISO format string for JSON serialization everywhere
+        obj["created_at"] = now.isoformat()
+        if embedding is None:
+            obj["vector_status"] = "pending"
+    failed = {}
+    try:
+        # Unordered, so one bad document doesn't stop the rest of the batch
+        db[collection].insert_many(objs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "insert failed") for err in e.details.get("writeErrors", [])}
+        if not failed or errors is None:
+            raise
+        errors.update(failed)
+    # Clean copies without the _id MongoDB adds on insert, for Qdrant, MQ and JSON responses
+    clean_objs = [None if i in failed else {k: v for k, v in obj.items() if k != "_id"} for i, obj in enumerate(objs)]
+    inserted = [(obj, embedding, obj_events)
+                for obj, embedding, obj_events in zip(clean_objs, embeddings, events or [[] for _ in objs])
+                if obj is not None]
+    # Vector writes are buffered and flushed in batches; Mongo above is the source of truth,
+    # so Qdrant only keeps the fields search filters and lists on
+    vec_buffer.add(VECTOR_COLLECTIONS[collection], [
+        {"id": obj["id"], "vector": embedding, "payload": slim_payload(obj)}
+        for obj, embedding, _ in inserted if embedding is not None
+    ])
+    mq().publish_many("hyperlocal", [e for _, _, obj_events in inserted for e in obj_events]
+                      + [(routing_key, obj) for obj, _, _ in inserted])
+    return clean_objs
+
+def persist_and_publish(obj: dict, collection: str, embedding: list, routing_key: str, events: list = None):
+    return persist_many([obj], collection, [embedding], routing_key, [events or []])[0]
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg')
+
+def process_media_file(filename: str, source: str) -> dict:
+    """
+    Run the STT/LLM or image pipeline for one saved upload.
+    Returns the media doc, the text it contributes to the description, its tags
+    and the MQ messages to publish. A failing file falls back to an "unknown"
+    media doc so it doesn't fail the whole listing.
+    Identical (or, for images, near-duplicate) files processed before are served
+    from the media fingerprint store instead. A fresh result carries its
+    "fingerprint" until remember_media stores it, once image tags are final.
+    """
+    kind = "audio" if source.lower().endswith(AUDIO_EXTENSIONS) else "image"
+    fp = None
+    if media_cache is not None:
+        try:
+            fp = media_cache.fingerprint(filename, kind)
+        except Exception as e:
+            print(f"[MediaCache] Could not fingerprint {source}: {e}")
+        cached = media_cache.lookup(fp) if fp else None
+        if cached:
+            print(f"[MediaCache] Reusing processed {kind} for {source}")
+            media = {**cached["media"], "path": filename} if kind == "audio" else cached["media"]
+            events = [(key, {**payload, "source": source}) for key, payload in cached["events"]]
+            return {**cached, "media": media, "events": events}
+    result = _process_media_file(filename, source)
+    if fp:
+        result["fingerprint"] = fp
+    return result
+
+def _process_media_file(filename: str, source: str) -> dict:
+    events = []
+    try:
+        if source.lower().endswith(AUDIO_EXTENSIONS):
+            print(f"[AssemblyAISTT] Transcribing: {source}")
+            txt = stt().transcribe(filename)
+            print(f"[AssemblyAISTT] Raw transcription: {txt}")
+
+            # Translation (Hindi/Marathi: Devanagari script range), summary and tags in one structured call
+            translate = any('\u0900' <= c <= '\u097F' for c in txt)
+            extraction = llm.extract_media_text(txt, translate=translate)
+            if translate and extraction.translation:
+                print(f"[Translation] English translation: {extraction.translation}")
+                txt = extraction.translation
+            print(f"[LLM] Summary: {extraction.summary}")
+            print(f"[Tags] Cleaned tags: {extraction.tags}")
+
+            events.append(("transcription.completed", {"source": source, "text": txt}))
+            tags = extraction.tags
+            return {"media": {"path": filename, "kind": "audio", "tags": tags}, "text": extraction.summary, "tags": tags,
+                    "events": events, "degraded": extraction.degraded}
+
+        res = imgsvc.enhance(filename)
+        events.append(("image.processed", {"source": source, "enhanced": res["enhanced_path"],
+                                           "thumbnails": res["thumbnails"], "tags": res["tags"]}))
+        # Tags are expanded by the LLM later, in one call for all images of the request
+        tags = res["tags"]
+        return {"media": {"path": res["enhanced_path"], "kind": "image", "tags": tags, "thumbnails": res["thumbnails"]},
+                "text": " ".join(res["tags"]), "tags": tags, "events": events, "expand_tags": tags}
+    except LLMOverloaded:
+        # Shed by the LLM scheduler: fail the request (503) rather than store the listing without tags
+        raise
+    except Exception as media_err:
+        print(f"[Error] Processing media {source}: {media_err}")
+        traceback.print_exc()
+        return {"media": {"path": filename, "kind": "unknown", "tags": []}, "text": "", "tags": [], "events": events,
+                "error": str(media_err)}
+
+def process_media_files(files: list, max_workers: int = None) -> list:
+    """
+    Process (saved_path, source_name) pairs on a bounded thread pool.
+    Results come back in input order regardless of completion order.
+    """
+    if not files:
+        return []
+    limit = settings.MEDIA_MAX_CONCURRENCY
+    if max_workers:
+        limit = min(max_workers, limit)
+    workers = max(1, min(limit, len(files)))
+    if workers == 1:
+        results = [process_media_file(path, source) for path, source in files]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media") as pool:
+            results = list(pool.map(lambda item: process_media_file(*item), files))
+    expand_image_tags(results)
+    remember_media(results)
+    return results
+
+def expand_image_tags(results: list):
+    """Replace the detected tags of every image in `results` with LLM-expanded ones, in one call."""
+    pending = [r for r in results if r.get("expand_tags")]
+    if not pending:
+        return
+    expanded, degraded = llm.expand_image_tags([r.pop("expand_tags") for r in pending])
+    for result, tags in zip(pending, expanded):
+        result["tags"] = tags
+        result["media"] = {**result["media"], "tags": tags}
+        result["degraded"] = result.get("degraded") or degraded
+
+def remember_media(results: list):
+    """
+    Store fresh results in the media fingerprint store, after tag expansion so
+    hits reuse the final tags. Failed or degraded results are not stored, so a
+    re-upload processes the file again instead of reusing the fallback.
+    """
+    for result in results:
+        fp = result.pop("fingerprint", None)
+        if fp is None or media_cache is None or result.get("error") or result.get("degraded"):
+            continue
+        media_cache.store(fp, {k: v for k, v in result.items() if k != "degraded"})
+
+def _no_progress(stage: str):
+    pass
+
+def _save_uploads(files, folder: str) -> list:
+    os.makedirs(folder, exist_ok=True)
+    saved = []
+    for f in files:
+        filename = os.path.join(folder, f.filename)
+        f.save(filename)
+        saved.append((filename, f.filename))
+    return saved
+
+def _wants_async() -> bool:
+    flag = request.args.get("async") or request.form.get("async") or (request.is_json and request.json.get("async"))
+    return str(flag).lower() in ("1", "true", "yes")
+
+def _overloaded_response(e: LLMOverloaded):
+    # The LLM scheduler shed the request; tell the client when to retry instead of failing with 500
+    return jsonify({"error": str(e)}), 503, {"Retry-After": str(max(1, round(e.retry_after)))}
+
+def _queued_response(job_id: str):
+    return jsonify({"status": "queued", "job_id": job_id, "status_url": f"/agent/vendor/jobs/{job_id}"}), 202
+
+def prepare_listing(payload: CreateListingPayload, saved: list, progress=_no_progress) -> tuple:
+    """
+    Run the listing pipeline over already-saved uploads without persisting.
+    Returns (listing, embedding, events) where events are the (routing_key,
+    message) pairs produced by media processing, left for the caller to publish.
+    """
+    progress("media")
+    media_docs = []
+    merged_text = []
+    all_tags = []
+    events = []
+    for result in process_media_files(saved, payload.max_concurrency):
+        events.extend(result["events"])
+        media_docs.append(result["media"])
+        merged_text.append(result["text"])
+        all_tags.extend(result["tags"])
+
+    all_tags = list(set(all_tags))  # remove duplicates
+
+    progress("description")
+    # Create a faithful summary instead of creative marketing copy
+    if merged_text and any(t.strip() for t in merged_text):
+        notes = " ".join([t for t in merged_text if t.strip()])
+        description = llm.generate(f"Write a brief, factual description (3-4 sentences) based on these notes: {notes}")
+    else:
+        description = "Cozy homestay in a great location."
+
+    title = payload.title or (all_tags[0] if all_tags else "Cozy stay")
+
+    listing = ListingBase(
+        vendor_id=payload.vendor_id,
+        title=title,
+        description=description,
+        price=payload.price,
+        location=payload.location,
+        tags=all_tags,
+        media=[MediaItem(**m) for m in media_docs]
+    ).dict()
+
+    progress("embedding")
+    embed = embed_document(listing)
+
+    return listing, embed, events
+
+def build_listing(payload: CreateListingPayload, saved: list, progress=_no_progress) -> dict:
+    """Run the listing pipeline over already-saved uploads and persist the result."""
+    listing, embed, events = prepare_listing(payload, saved, progress)
+    progress("persist")
+    return persist_and_publish(listing, "listings", embed, "listing.created", events)
+
+def run_listing_job(job_id: str, payload: CreateListingPayload, saved: list, folder: str):
+    """Background listing job; its upload folder is cleaned up however the job ends."""
+    persisted = None
+    try:
+        persisted = jobs.run(job_id, build_listing, payload, saved)
+        return persisted
+    finally:
+        _cleanup_job_folder(folder, [persisted] if persisted else [])
+
+def _cleanup_job_folder(folder: str, persisted: list = ()):
+    """Delete files in a job's upload folder that none of the persisted documents reference."""
+    keep = set()
+    for doc in persisted:
+        for m in doc.get("media") or []:
+            keep.add(m.get("path"))
+            keep.update(m.get("thumbnails") or [])
+    try:
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if path not in keep:
+                os.remove(path)
+        if not os.listdir(folder):
+            os.rmdir(folder)
+    except OSError as e:
+        print(f"[Jobs] Could not clean up {folder}: {e}")
+
+def _resolve_media(ref: str, folder: str) -> tuple:
+    """
+    Fetch a bulk-import media reference into `folder` (the import's temp
+    folder) and return (saved_path, source_name).
+    http(s) URLs must be on a BULK_IMPORT_ALLOWED_HOSTS host; they are fetched
+    without following redirects and streamed to disk up to
+    BULK_IMPORT_MAX_DOWNLOAD_MB. Local paths must resolve inside
+    BULK_IMPORT_MEDIA_ROOT and are copied, so enhanced images and thumbnails
+    are never written into the media root. Anything else raises ValueError
+    (a per-row error).
+    """
+    if ref.startswith(("http://", "https://")):
+        allowed = {h.strip().lower() for h in settings.BULK_IMPORT_ALLOWED_HOSTS.split(",") if h.strip()}
+        host = (urlsplit(ref).hostname or "").lower()
+        if host not in allowed:
+            raise ValueError(f"media host '{host}' is not in BULK_IMPORT_ALLOWED_HOSTS")
+        name = os.path.basename(ref.split("?", 1)[0]) or "media"
+        path = os.path.join(folder, f"{uuid.uuid4().hex}_{name}")
+        limit = int(settings.BULK_IMPORT_MAX_DOWNLOAD_MB * 1024 * 1024)
+        with get_http().get(ref, timeout=60, stream=True, allow_redirects=False) as resp:
+            if resp.is_redirect:
+                raise ValueError(f"media URL redirects ({resp.status_code}); use the final URL")
+            resp.raise_for_status()
+            if int(resp.headers.get("Content-Length") or 0) > limit:
+                raise ValueError(f"media larger than {settings.BULK_IMPORT_MAX_DOWNLOAD_MB} MB")
+            size = 0
+            try:
+                with open(path, "wb") as out:
+                    for chunk in resp.iter_content(chunk_size=1 << 16):
+                        size += len(chunk)
+                        if size > limit:
+                            raise ValueError(f"media larger than {settings.BULK_IMPORT_MAX_DOWNLOAD_MB} MB")
+                        out.write(chunk)
+            except Exception:
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+        return path, name
+    if not settings.BULK_IMPORT_MEDIA_ROOT:
+        raise ValueError("local media paths are disabled (set BULK_IMPORT_MEDIA_ROOT)")
+    root = os.path.realpath(settings.BULK_IMPORT_MEDIA_ROOT)
+    path = os.path.realpath(os.path.join(root, ref))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"media path '{ref}' is outside BULK_IMPORT_MEDIA_ROOT")
+    if not os.path.isfile(path):
+        raise FileNotFoundError(ref)
+    name = os.path.basename(path)
+    copy = os.path.join(folder, f"{uuid.uuid4().hex}_{name}")
+    shutil.copyfile(path, copy)
+    return copy, name
+
+def _prepare_row(row_no: int, line: str, folder: str) -> tuple:
+    row = json.loads(line)
+    payload = CreateListingPayload(**{"media_files": [], **row})
+    saved = [_resolve_media(ref, folder) for ref in payload.media_files]
+    listing, embed, events = prepare_listing(payload, saved)
+    return row_no, listing, embed, events
+
+def import_listings(lines, concurrency: int = 4, batch_size: int = 50):
+    """
+    Stream a JSONL file of listings through the listing pipeline.
+    Rows run with bounded concurrency; finished rows are persisted in batches
+    (insert_many, buffered Qdrant upserts, one batched MQ publish).
+    Yields one progress dict per row and a final summary.
+    Media is fetched into a per-import temp folder, removed at the end except
+    for the files persisted listings reference.
+    """
+    ok = errors = 0
+    batch = []
+    folder = os.path.join(UPLOAD_FOLDER, "bulk", uuid.uuid4().hex)
+    os.makedirs(folder, exist_ok=True)
+    persisted_docs = []
+
+    def flush_batch():
+        rows = sorted(batch, key=lambda r: r[0])
+        batch.clear()
+        insert_errors = {}
+        try:
+            persisted = persist_many(
+                [r[1] for r in rows], "listings", [r[2] for r in rows],
+                "listing.created", [r[3] for r in rows], errors=insert_errors
+            )
+        except Exception as e:
+            print(f"[Error] Bulk persist of {len(rows)} rows failed: {e}")
+            traceback.print_exc()
+            return [{"row": r[0], "status": "error", "error": f"persist failed: {e}"} for r in rows]
+        persisted_docs.extend(obj for obj in persisted if obj is not None)
+        return [
+            {"row": r[0], "status": "ok", "id": obj["id"]} if obj is not None
+            else {"row": r[0], "status": "error", "error": f"persist failed: {insert_errors[i]}"}
+            for i, (r, obj) in enumerate(zip(rows, persisted))
+        ]
+
+    def report(results):
+        nonlocal ok, errors
+        for result in results:
+            if result["status"] == "ok":
+                ok += 1
+            else:
+                errors += 1
+            yield result
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="bulk") as pool:
+            in_flight = {}
+
+            def drain(return_when):
+                done, _ = wait(in_flight, return_when=return_when)
+                out = []
+                for future in done:
+                    row_no = in_flight.pop(future)
+                    try:
+                        batch.append(future.result())
+                    except Exception as e:
+                        out.append({"row": row_no, "status": "error", "error": str(e)})
+                if len(batch) >= batch_size:
+                    out.extend(flush_batch())
+                return out
+
+            for row_no, raw in enumerate(lines, start=1):
+                line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+                if not line.strip():
+                    continue
+                # Keep at most `concurrency` rows in flight so the file is read as we go
+                if len(in_flight) >= concurrency:
+                    yield from report(drain(FIRST_COMPLETED))
+                in_flight[pool.submit(_prepare_row, row_no, line, folder)] = row_no
+
+            while in_flight:
+                yield from report(drain(FIRST_COMPLETED))
+            if batch:
+                yield from report(flush_batch())
+    finally:
+        # Also runs when the client disconnects and the response generator is closed
+        _cleanup_job_folder(folder, persisted_docs)
+
+    yield {"done": True, "ok": ok, "errors": errors}
+
+def build_event(payload: CreateEventPayload, progress=_no_progress) -> dict:
+    """Run the event pipeline over the payload's media paths and persist the result."""
+    progress("media")
+    media_docs = []
+    merged_text = []
+    all_tags = []
+
+    for path in payload.media_files:
+        if path.lower().endswith(AUDIO_EXTENSIONS):
+            txt = stt().transcribe(path)
+            mq().publish("hyperlocal", "transcription.completed", {"source": path, "text": txt})
+            extraction = llm.extract_media_text(txt, translate=True)
+            merged_text.append(extraction.translation or extraction.summary)
+            all_tags.extend(extraction.tags)
+            media_docs.append({"path": path, "kind": "audio", "tags": extraction.tags})
+        else:
+            res = imgsvc.enhance(path)
+            mq().publish("hyperlocal", "image.processed", {"source": path, "enhanced": res["enhanced_path"],
+                                                           "thumbnails": res["thumbnails"], "tags": res["tags"]})
+            media_docs.append({"path": res["enhanced_path"], "kind": "image", "tags": res["tags"], "thumbnails": res["thumbnails"]})
+            merged_text.append(" ".join(res["tags"]))
+
+    # One LLM call expands the tags of all images
+    images = [m for m in media_docs if m["kind"] == "image"]
+    expanded = llm.expand_image_tags([m["tags"] for m in images])[0] if images else []
+    for media, tags in zip(images, expanded):
+        media["tags"] = tags
+        all_tags.extend(tags)
+
+    all_tags = list(set(all_tags))  # remove duplicates
+
+    progress("description")
+    description = llm.generate(f"Create marketing blurb for event '{payload.title}' using these notes: {merged_text}")
+    event = EventBase(
+        agency_id=payload.agency_id,
+        title=payload.title,
+        description=description,
+        datetime=payload.datetime,
+        location=payload.location,
+        price=payload.price,
+        tags=all_tags,
+        media=[MediaItem(**m) for m in media_docs]
+    ).dict()
+
+    progress("embedding")
+    embed = embed_document(event)
+
+    progress("persist")
+    return persist_and_publish(event, "events", embed, "event.created")
 
 @app.route("/agent/vendor/create-listing", methods=["POST"])
 def create_listing():
@@ -44,116 +537,21 @@ def create_listing():
         if not metadata:
             return jsonify({"error": "metadata form field required"}), 400
         payload = CreateListingPayload(**eval(metadata))  # convert string to dict
-
-        media_docs = []
-        merged_text = []
-        all_tags = []
-
-        # Handle uploaded files
         files = request.files.getlist("media_files")
-        for f in files:
-            filename = os.path.join(UPLOAD_FOLDER, f.filename)
-            f.save(filename)
 
-            try:
-                if f.filename.lower().endswith(('.wav', '.mp3', '.ogg')):
-                    print(f"[AssemblyAISTT] Transcribing: {f.filename}")
-                    txt = stt.transcribe(filename)
-                    print(f"[AssemblyAISTT] Raw transcription: {txt}")
-                    
-                    # Translate Hindi/Marathi to English using LLM
-                    # Check if text is in non-Latin script (Hindi/Marathi)
-                    if any('\u0900' <= c <= '\u097F' for c in txt):  # Devanagari script range
-                        print(f"[Translation] Detected non-English text, translating to English...")
-                        translate_prompt = f"Translate the following text to English, keeping the meaning exact. Do not add any extra details:\n\n{txt}"
-                        english_txt = llm.generate(translate_prompt)
-                        print(f"[Translation] English translation: {english_txt}")
-                        txt = english_txt
-                    
-                    mq.publish("hyperlocal", "transcription.completed", {"source": f.filename, "text": txt})
-                    # Expand text and generate tags
-                    expand = llm.generate(f"Summarize in 2-3 sentences: {txt}")
-                    print(f"[LLM] Summary: {expand}")
-                    merged_text.append(expand)
-                    # Use JSON mode for structured tag extraction
-                    tags_prompt = f'Extract 5-10 key topics from this text. Return ONLY a JSON array of strings, no other text. Example: ["topic1", "topic2"]. Text: {txt}'
-                    tags_txt = llm.generate(tags_prompt, json_mode=True)
-                    print(f"[LLM] Raw tags response: {tags_txt}")
-                    # Parse JSON tags
-                    try:
-                        import json as json_module
-                        tags = json_module.loads(tags_txt)
-                        if not isinstance(tags, list):
-                            tags = [t.strip() for t in tags_txt.split(",") if t.strip() and len(t.strip()) > 1]
-                    except:
-                        # Fallback to comma-separated parsing
-                        tags = [t.strip() for t in tags_txt.split(",") if t.strip() and len(t.strip()) > 1]
-                    # Filter out very long tags that are likely prompt artifacts
-                    tags = [t for t in tags if len(t) < 50 and len(t) > 1]
-                    print(f"[Tags] Cleaned tags: {tags}")
-                    all_tags.extend(tags)
-                    media_docs.append({"path": filename, "kind": "audio", "tags": tags})
-                else:
-                    res = imgsvc.enhance(filename)
-                    mq.publish("hyperlocal", "image.processed", {"source": f.filename, "enhanced": res["enhanced_path"], "tags": res["tags"]})
-                    # Generate additional tags via LLM with JSON mode
-                    tags_prompt = f'Extract 5-10 key topics from these image tags. Return ONLY a JSON array of strings. Tags: {" ".join(res["tags"])}'
-                    tags_txt = llm.generate(tags_prompt, json_mode=True)
-                    try:
-                        import json as json_module
-                        tags = json_module.loads(tags_txt)
-                        if not isinstance(tags, list):
-                            tags = [t.strip() for t in tags_txt.split(",") if t.strip() and len(t.strip()) > 1]
-                    except:
-                        tags = [t.strip() for t in tags_txt.split(",") if t.strip() and len(t.strip()) > 1]
-                    tags = [t for t in tags if len(t) < 50 and len(t) > 1]
-                    all_tags.extend(tags)
-                    media_docs.append({"path": res["enhanced_path"], "kind": "image", "tags": tags})
-                    merged_text.append(" ".join(res["tags"]))
-            except Exception as media_err:
-                print(f"[Error] Processing media {f.filename}: {media_err}")
-                traceback.print_exc()
-                media_docs.append({"path": filename, "kind": "unknown", "tags": []})
-                merged_text.append("")
-
-        all_tags = list(set(all_tags))  # remove duplicates
-
-        # Create a faithful summary instead of creative marketing copy
-        if merged_text and any(t.strip() for t in merged_text):
-            notes = " ".join([t for t in merged_text if t.strip()])
-            description = llm.generate(f"Write a brief, factual description (3-4 sentences) based on these notes: {notes}")
-        else:
-            description = "Cozy homestay in a great location."
-        
-        title = payload.title or (all_tags[0] if all_tags else "Cozy stay")
-
-        listing = ListingBase(
-            vendor_id=payload.vendor_id,
-            title=title,
-            description=description,
-            price=payload.price,
-            location=payload.location,
-            tags=all_tags,
-            media=[MediaItem(**m) for m in media_docs]
-        ).dict()
-
-        txt_for_embed = f"{listing['title']} {listing['description']} {' '.join(listing['tags'])}"
-        embed_response = llm.embed([txt_for_embed])
-
-        # Parse embedding safely
-        try:
-            if isinstance(embed_response, list) and len(embed_response) > 0:
-                embed = embed_response[0] if isinstance(embed_response[0], list) else embed_response
-            else:
-                embed = embed_response.get("embeddings", [embed_response])[0] if isinstance(embed_response, dict) else embed_response[0]
-        except Exception as embed_err:
-            print(f"[Error] Embedding parse failed: {embed_err}")
-            traceback.print_exc()
-            embed = [0.0] * 1536  # fallback
+        if _wants_async():
+            # Save uploads into a per-job folder and hand the pipeline to the ingest pool
+            job_id = jobs.create("listing", LISTING_STAGES)
+            folder = os.path.join(UPLOAD_FOLDER, job_id)
+            saved = _save_uploads(files, folder)
+            ingest_pool.submit(run_listing_job, job_id, payload, saved, folder)
+            return _queued_response(job_id)
 
-        persisted = persist_and_publish(listing, "listings", "vendor_listings_vectors", embed, "listing.created")
+        persisted = build_listing(payload, _save_uploads(files, UPLOAD_FOLDER))
         return jsonify({"status": "ok", "listing": persisted}), 201
 
+    except LLMOverloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
         print("[Error] create_listing failed:", e)
         traceback.print_exc()
@@ -163,59 +561,58 @@ def create_listing():
 def create_event():
     try:
         payload = CreateEventPayload(**request.json)
-        media_docs = []
-        merged_text = []
-        all_tags = []
-
-        for path in payload.media_files:
-            if path.lower().endswith(('.wav', '.mp3', '.ogg')):
-                txt = stt.transcribe(path)
-                mq.publish("hyperlocal", "transcription.completed", {"source": path, "text": txt})
-                expanded = llm.generate(f"Expand and translate to English: {txt}")
-                merged_text.append(expanded)
-                tags_txt = llm.generate(f"Generate 5–10 tags (comma-separated) from this text: {txt}")
-                tags = [t.strip() for t in tags_txt.split(",") if t.strip()]
-                all_tags.extend(tags)
-                media_docs.append({"path": path, "kind": "audio", "tags": tags})
-            else:
-                res = imgsvc.enhance(path)
-                mq.publish("hyperlocal", "image.processed", {"source": path, "enhanced": res["enhanced_path"], "tags": res["tags"]})
-                tags_txt = llm.generate(f"Generate 5–10 tags (comma-separated) from these image tags: {' '.join(res['tags'])}")
-                tags = [t.strip() for t in tags_txt.split(",") if t.strip()]
-                all_tags.extend(tags)
-                media_docs.append({"path": res["enhanced_path"], "kind": "image", "tags": tags})
-                merged_text.append(" ".join(res["tags"]))
-
-        all_tags = list(set(all_tags))  # remove duplicates
-
-        description = llm.generate(f"Create marketing blurb for event '{payload.title}' using these notes: {merged_text}")
-        event = EventBase(
-            agency_id=payload.agency_id,
-            title=payload.title,
-            description=description,
-            datetime=payload.datetime,
-            location=payload.location,
-            price=payload.price,
-            tags=all_tags,
-            media=[MediaItem(**m) for m in media_docs]
-        ).dict()
-
-        txt_for_embed = f"{event['title']} {event['description']} {' '.join(event['tags'])}"
-        embed_response = llm.embed([txt_for_embed])
-        
-        if isinstance(embed_response, list) and len(embed_response) > 0:
-            embed = embed_response[0] if isinstance(embed_response[0], list) else embed_response
-        else:
-            embed = embed_response.get("embeddings", [embed_response])[0] if isinstance(embed_response, dict) else embed_response[0]
 
-        persisted = persist_and_publish(event, "events", "agency_events_vectors", embed, "event.created")
+        if _wants_async():
+            job_id = jobs.create("event", EVENT_STAGES)
+            ingest_pool.submit(jobs.run, job_id, build_event, payload)
+            return _queued_response(job_id)
+
+        persisted = build_event(payload)
         return jsonify({"status": "ok", "event": persisted}), 201
 
+    except LLMOverloaded as e:
+        return _overloaded_response(e)
     except Exception as e:
         print("[Error] create_event failed:", e)
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route("/agent/vendor/bulk-import", methods=["POST"])
+def bulk_import():
+    """
+    Import listings from JSONL (raw request body or a multipart "file" field).
+    Streams NDJSON progress: one line per row, then a summary line.
+    """
+    try:
+        upload = request.files.get("file")
+        stream = upload.stream if upload else request.stream
+        concurrency = request.args.get("concurrency", settings.BULK_IMPORT_CONCURRENCY, type=int)
+        batch_size = request.args.get("batch_size", settings.BULK_IMPORT_BATCH_SIZE, type=int)
+
+        def lines():
+            for progress in import_listings(stream, concurrency, batch_size):
+                yield json.dumps(progress) + "\n"
+
+        return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+
+    except Exception as e:
+        print("[Error] bulk_import failed:", e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/agent/vendor/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    try:
+        job = jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job), 200
+
+    except Exception as e:
+        print("[Error] get_job failed:", e)
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/agent/vendor/update-metadata", methods=["POST"])
 def update_metadata():
     try:
@@ -231,7 +628,8 @@ def update_metadata():
         if result.matched_count == 0:
             return jsonify({"error": "Object not found"}), 404
         
-        mq.publish("hyperlocal", "metadata.updated", {"collection": col, "id": obj_id, "update": update})
+        sync_vector_payload(col, obj_id, update)
+        mq().publish("hyperlocal", "metadata.updated", {"collection": col, "id": obj_id, "update": update})
         return jsonify({"status": "ok"}), 200
 
     except Exception as e:
@@ -239,5 +637,51 @@ def update_metadata():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+@app.route("/agent/vendor/stt-callback", methods=["POST"])
+def stt_callback():
+    """AssemblyAI webhook: wake the thread waiting on this transcript."""
+    if settings.STT_WEBHOOK_SECRET and request.headers.get("X-STT-Webhook-Secret") != settings.STT_WEBHOOK_SECRET:
+        return jsonify({"error": "invalid webhook secret"}), 401
+    transcript_id = (request.get_json(silent=True) or {}).get("transcript_id")
+    if not transcript_id:
+        return jsonify({"error": "transcript_id required"}), 400
+    waiting = transcript_waiters.notify(transcript_id)
+    return jsonify({"status": "ok", "waiting": waiting}), 200
+
+@app.route("/agent/vendor/stats", methods=["GET"])
+def stats():
+    cache = get_llm_cache()
+    return jsonify({
+        "llm_cache": cache.stats() if cache else None,
+        "vector_upserts": vec_buffer.stats(),
+        "mq": mq().stats() if mq.ready else None,
+        "media_cache": media_cache.stats() if media_cache else None,
+        "llm_scheduler": get_llm_scheduler().stats(),
+    }), 200
+
+@app.route("/agent/vendor/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once every dependency is initialized, else 503 with per-dependency status."""
+    deps = readiness()
+    ok = all(d["ready"] for d in deps.values())
+    return jsonify({"ready": ok, "dependencies": deps}), 200 if ok else 503
+
+@app.route("/agent/vendor/warmup", methods=["POST"])
+def warmup_dependencies():
+    """Initialize all dependencies now (in parallel) and report how long each took."""
+    deps = warmup()
+    ok = all(d["ready"] for d in deps.values())
+    return jsonify({"ready": ok, "dependencies": deps}), 200 if ok else 503
+
 if __name__ == "__main__":
+    # Turn SIGTERM (docker stop) into a normal exit so atexit flushes buffered upserts
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        interrupted = jobs.fail_interrupted()
+        if interrupted:
+            print(f"[Jobs] Marked {interrupted} interrupted job(s) as failed")
+    except Exception as e:
+        print(f"[Warn] Could not check for interrupted jobs: {e}")
+    if settings.WARMUP_ON_START:
+        start_warmup()
     app.run(host="0.0.0.0", port=8001, debug=False)
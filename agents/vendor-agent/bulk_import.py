@@ -0,0 +1,46 @@
+"""
+Bulk-load listings from a JSONL file through the vendor listing pipeline.
+
+Each line is a listing, e.g.
+  {"vendor_id": "v1", "price": 1500, "location": "Pune", "title": "Farm stay",
+   "media_files": ["/data/photos/farm1.jpg", "https://example.com/note.mp3"]}
+
+Local paths must resolve inside BULK_IMPORT_MEDIA_ROOT and URLs must be on a
+BULK_IMPORT_ALLOWED_HOSTS host (here: BULK_IMPORT_MEDIA_ROOT=/data,
+BULK_IMPORT_ALLOWED_HOSTS=example.com); other references fail their row.
+
+Usage: python bulk_import.py listings.jsonl [--concurrency 4] [--batch-size 50]
+Progress is printed as one JSON line per row followed by a summary line.
+"""
+import argparse
+import json
+import sys
+
+from shared.utils.config import settings
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import listings from JSONL")
+    parser.add_argument("path", help="JSONL file, or - for stdin")
+    parser.add_argument("--concurrency", type=int, default=settings.BULK_IMPORT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    # Imported here so --help works without connecting to the backing services
+    from app import import_listings, vec_buffer
+
+    source = sys.stdin if args.path == "-" else open(args.path, "r", encoding="utf-8")
+    summary = {}
+    try:
+        for progress in import_listings(source, args.concurrency, args.batch_size):
+            print(json.dumps(progress), flush=True)
+            summary = progress
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        vec_buffer.flush()
+    return 1 if summary.get("errors") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@ class CreateListingPayload(BaseModel):
     raw_tags: List[str] = []
     title: str | None = None
     description: str | None = None
+    # Per-request cap on concurrent media processing (clamped to settings.MEDIA_MAX_CONCURRENCY)
+    max_concurrency: int | None = None
 
 class CreateEventPayload(BaseModel):
     agency_id: str
@@ -0,0 +1,97 @@
+"""
+Benchmark the image pipeline against the previous full-resolution method.
+
+"legacy" is the old ImageEnhancer.enhance: full decode, full-size LAB
+histogram equalization, img.mean over every pixel and a full-size _enh copy,
+one image at a time. "pipeline" is enhance_image (reduced decode, CLAHE,
+enhanced copy + thumbnails, colour stats on a small copy), run inline and
+through the ImageEnhancer process pool.
+
+Usage: python scripts/image_benchmark.py [photo.jpg ...] [--copies 16] [--workers 4]
+Without photos a synthetic 4000x3000 JPEG (a typical phone photo) is generated.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from services.image_service import ImageEnhancer, enhance_image
+
+
+def legacy_enhance(image_path: str) -> dict:
+    img = cv2.imread(image_path)
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    lab = cv2.merge((cv2.equalizeHist(l), a, b))
+    enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+    out_path = image_path.replace(".", "_enh.")
+    cv2.imwrite(out_path, enhanced)
+    avg = enhanced.mean(axis=(0, 1))
+    return {"enhanced_path": out_path, "mean": avg}
+
+
+def synthetic_photo(path: str, width: int = 4000, height: int = 3000):
+    rng = np.random.default_rng(0)
+    # Smooth gradient plus noise compresses like a real photo rather than pure noise
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                    (np.broadcast_to(x, (height, width)) + y) / 2], axis=2)
+    img = np.clip(img + rng.normal(0, 12, img.shape), 0, 255).astype(np.uint8)
+    cv2.imwrite(path, img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def timed(label: str, fn, paths: list, threads: int = 1):
+    started = time.perf_counter()
+    if threads == 1:
+        for p in paths:
+            fn(p)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(fn, paths))
+    elapsed = time.perf_counter() - started
+    print(f"{label:28s} {len(paths)} images  {elapsed * 1000 / len(paths):8.1f} ms/image  {len(paths) / elapsed:6.2f} images/s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Image pipeline benchmark")
+    parser.add_argument("photos", nargs="*")
+    parser.add_argument("--copies", type=int, default=16, help="images per run (photos are cycled)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="imgbench_")
+    try:
+        sources = args.photos
+        if not sources:
+            sources = [os.path.join(workdir, "synthetic.jpg")]
+            synthetic_photo(sources[0])
+
+        def copies(tag: str) -> list:
+            paths = []
+            for i in range(args.copies):
+                src = sources[i % len(sources)]
+                dst = os.path.join(workdir, f"{tag}{i}{os.path.splitext(src)[1] or '.jpg'}")
+                shutil.copyfile(src, dst)
+                paths.append(dst)
+            return paths
+
+        timed("legacy (sequential)", legacy_enhance, copies("legacy"))
+        timed("pipeline (inline)", enhance_image, copies("inline"))
+        enhancer = ImageEnhancer(workers=args.workers)
+        enhancer.enhance(copies("warm")[0])  # start the pool outside the timing
+        timed(f"pipeline (pool x{args.workers})", enhancer.enhance, copies("pool"), threads=args.workers)
+        enhancer.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,152 @@
 import cv2
 import numpy as np
 from typing import List, Tuple
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from shared.utils.config import settings
+
+# cv2.imread flags that decode at 1/2, 1/4 or 1/8 size straight from the JPEG DCT
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def decode_reduced(image_path: str, max_side: int) -> np.ndarray:
+    """
+    Decode an image with its long side at most `max_side`.
+    The size comes from the PIL header (no pixel decode); the largest
+    reduction that still leaves >= max_side pixels is done by the decoder,
+    and only the remainder by an INTER_AREA resize.
+    """
+    try:
+        with Image.open(image_path) as header:
+            width, height = header.size
+        long_side = max(width, height)
+    except Exception:
+        long_side = 0  # format PIL can't read: full decode, then resize
+    flag = cv2.IMREAD_COLOR
+    for factor, reduced in _REDUCED_FLAGS:
+        if long_side // factor >= max_side:
+            flag = reduced
+            break
+    img = cv2.imread(image_path, flag)
+    if img is None:
+        raise FileNotFoundError(image_path)
+    h, w = img.shape[:2]
+    if max(h, w) > max_side:
+        scale = max_side / max(h, w)
+        img = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    return img
+
+
+def _write(path: str, img: np.ndarray, params: list):
+    # cv2.imwrite reports failure (missing dir, full disk, unsupported extension) by returning False
+    if not cv2.imwrite(path, img, params):
+        raise OSError(f"cv2.imwrite failed for {path}")
+
+
+def enhance_lab(img: np.ndarray, clip_limit: float = 2.0, tiles: int = 8) -> np.ndarray:
+    """Tiled contrast enhancement (CLAHE) of the L channel; colour channels untouched."""
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tiles, tiles))
+    lab[:, :, 0] = clahe.apply(lab[:, :, 0])
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+
+
+def colour_stats(img: np.ndarray, size: int = 64) -> dict:
+    """Mean colour and brightness of a small INTER_AREA copy (same means, a fraction of the work)."""
+    h, w = img.shape[:2]
+    scale = min(1.0, size / max(h, w))
+    small = cv2.resize(img, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+    b, g, r = small.reshape(-1, 3).mean(axis=0)
+    return {"mean_bgr": [round(float(b), 1), round(float(g), 1), round(float(r), 1)],
+            "brightness": round(float(0.114 * b + 0.587 * g + 0.299 * r), 1)}
+
+
+def colour_tags(stats: dict) -> List[str]:
+    # very basic color detection
+    b, g, r = stats["mean_bgr"]
+    if r > g and r > b:
+        return ["warm"]
+    if b > r and b > g:
+        return ["cool"]
+    return ["neutral"]
+
+
+def enhance_image(image_path: str, out_path: str = None, max_side: int = 2048, thumb_sizes: Tuple[int, ...] = (640, 320),
+                  quality: int = 85, stats_size: int = 64) -> dict:
+    """
+    One pass over an image: reduced decode, CLAHE enhancement, the enhanced
+    copy, web thumbnails (each resized from the previous, larger one) and
+    colour stats/tags from a downsampled copy. Runs in the process pool.
+    """
+    img = decode_reduced(image_path, max_side)
+    enhanced = enhance_lab(img)
+    root, ext = os.path.splitext(image_path)
+    out_path = out_path or f"{root}_enh{ext or '.jpg'}"
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if out_path.lower().endswith((".jpg", ".jpeg")) else []
+    _write(out_path, enhanced, params)
+
+    thumbnails = []
+    current = enhanced
+    for width in sorted(thumb_sizes, reverse=True):
+        h, w = current.shape[:2]
+        if w > width:
+            current = cv2.resize(current, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+        thumb_path = f"{root}_thumb{width}.jpg"
+        _write(thumb_path, current, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        thumbnails.append(thumb_path)
+
+    # Smallest copy made so far; colour_stats shrinks it further
+    stats = colour_stats(current, stats_size)
+    height, width = enhanced.shape[:2]
+    return {"enhanced_path": out_path, "thumbnails": thumbnails, "tags": colour_tags(stats), "stats": stats,
+            "width": width, "height": height}
+
+
+def _init_worker():
+    # One OpenCV thread per worker process; the pool provides the parallelism
+    cv2.setNumThreads(1)
+
 
 class ImageEnhancer:
+    """
+    Image pipeline front end. enhance() runs enhance_image in a process pool
+    so CPU-bound work from concurrent media threads spreads across cores
+    instead of contending for the GIL. workers=0 runs inline.
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = settings.IMAGE_WORKERS if workers is None else workers
+        if self.workers < 0:
+            self.workers = os.cpu_count() or 1
+        self.options = {
+            "max_side": settings.IMAGE_MAX_SIDE,
+            "thumb_sizes": tuple(int(s) for s in settings.IMAGE_THUMB_SIZES.split(",") if s.strip()),
+            "quality": settings.IMAGE_JPEG_QUALITY,
+            "stats_size": settings.IMAGE_STATS_SIZE,
+        }
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # forkserver: workers fork from a clean single-threaded server, not from this threaded app.
+                    # The server preloads only this module; the default ("__main__") would re-import app.py.
+                    ctx = multiprocessing.get_context("forkserver")
+                    ctx.set_forkserver_preload([__name__])
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_init_worker)
+        return self._pool
+
     def enhance(self, image_path: str, out_path: str = None) -> dict:
-        img = cv2.imread(image_path)
-        if img is None:
-            raise FileNotFoundError(image_path)
-        # Simple enhancement: histogram equalization for color images
-        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        l2 = cv2.equalizeHist(l)
-        lab = cv2.merge((l2, a, b))
-        enhanced = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
-        out_path = out_path or image_path.replace(".", "_enh.")
-        cv2.imwrite(out_path, enhanced)
-        # placeholder tags (could add CLIP/ViT-CLIP)
-        tags = self._simple_color_tags(enhanced)
-        return {"enhanced_path": out_path, "tags": tags}
-
-    def _simple_color_tags(self, img) -> List[str]:
-        # very basic color detection
-        avg = img.mean(axis=(0,1))
-        tags = []
-        b,g,r = avg
-        if r > g and r > b:
-            tags.append("warm")
-        elif b > r and b > g:
-            tags.append("cool")
-        else:
-            tags.append("neutral")
-        return tags
+        if not self.workers:
+            return enhance_image(image_path, out_path, **self.options)
+        return self.pool.submit(enhance_image, image_path, out_path, **self.options).result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
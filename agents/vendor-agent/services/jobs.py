@@ -0,0 +1,99 @@
+import datetime
+import traceback
+import uuid
+from typing import Callable, List, Optional
+
+from shared.utils.mongo_client import db
+
+LISTING_STAGES = ["media", "description", "embedding", "persist"]
+EVENT_STAGES = ["media", "description", "embedding", "persist"]
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+
+class JobStore:
+    """
+    Status records for background ingestion jobs, stored in Mongo.
+    Each job tracks an overall status (queued/running/completed/failed),
+    the stage currently running and per-stage timestamps.
+    """
+
+    def __init__(self, collection=None):
+        self.col = collection if collection is not None else db["vendor_jobs"]
+
+    def create(self, kind: str, stages: List[str]) -> str:
+        job_id = str(uuid.uuid4())
+        now = _now()
+        self.col.insert_one({
+            "id": job_id,
+            "kind": kind,
+            "status": "queued",
+            "stage": None,
+            "stages": {name: {"status": "pending"} for name in stages},
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.col.find_one({"id": job_id}, {"_id": 0})
+
+    def fail_interrupted(self, before: Optional[str] = None) -> int:
+        """
+        Mark jobs still queued/running from before `before` (default: now) as failed.
+        Jobs run on an in-process pool, so after a restart nothing will ever pick them up.
+        """
+        now = _now()
+        result = self.col.update_many(
+            {"status": {"$in": ["queued", "running"]}, "created_at": {"$lt": before or now}},
+            {"$set": {"status": "failed", "error": "interrupted by restart", "updated_at": now}},
+        )
+        return result.modified_count
+
+    def progress(self, job_id: str) -> Callable[[str], None]:
+        """Return a callback that marks `stage` running and the previous stage done."""
+        current = {"stage": None}
+
+        def report(stage: str):
+            now = _now()
+            update = {
+                "status": "running",
+                "stage": stage,
+                f"stages.{stage}.status": "running",
+                f"stages.{stage}.started_at": now,
+                "updated_at": now,
+            }
+            if current["stage"]:
+                update[f"stages.{current['stage']}.status"] = "done"
+                update[f"stages.{current['stage']}.finished_at"] = now
+            self.col.update_one({"id": job_id}, {"$set": update})
+            current["stage"] = stage
+
+        report.current = current
+        return report
+
+    def run(self, job_id: str, fn: Callable, *args, **kwargs):
+        """Run `fn(*args, progress=..., **kwargs)` and record its result or error."""
+        progress = self.progress(job_id)
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+        except Exception as e:
+            print(f"[Jobs] Job {job_id} failed: {e}")
+            traceback.print_exc()
+            update = {"status": "failed", "error": str(e), "updated_at": _now()}
+            if progress.current["stage"]:
+                update[f"stages.{progress.current['stage']}.status"] = "failed"
+            self.col.update_one({"id": job_id}, {"$set": update})
+            return None
+
+        now = _now()
+        update = {"status": "completed", "stage": None, "result": result, "updated_at": now}
+        if progress.current["stage"]:
+            update[f"stages.{progress.current['stage']}.status"] = "done"
+            update[f"stages.{progress.current['stage']}.finished_at"] = now
+        self.col.update_one({"id": job_id}, {"$set": update})
+        return result
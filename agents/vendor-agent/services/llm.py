@@ -1,13 +1,63 @@
-import requests
+from shared.utils.http import get_http
 import json
 from shared.utils.config import settings
-from typing import Dict, Any
+from shared.utils.llm_cache import get_llm_cache, make_key
+from shared.utils.llm_scheduler import get_llm_scheduler
+from shared.utils.embeddings import get_embedding_service
+from typing import Dict, Any, List, Tuple
+from pydantic import BaseModel, ValidationError, field_validator
+from pydantic.json_schema import SkipJsonSchema
+
+
+def _clean_tags(tags: List[str]) -> List[str]:
+    # Strip, drop duplicates and very short/long tags that are likely prompt artifacts
+    seen = []
+    for tag in tags:
+        tag = tag.strip() if isinstance(tag, str) else ""
+        if 1 < len(tag) < 50 and tag not in seen:
+            seen.append(tag)
+    return seen
+
+
+class MediaExtraction(BaseModel):
+    """Structured result for one transcript: translation, summary and tags in one call."""
+    translation: str = ""
+    summary: str
+    tags: List[str] = []
+    # Set (never by the model) when the reply couldn't be parsed and the raw text stands in
+    degraded: SkipJsonSchema[bool] = False
+
+    @field_validator("tags")
+    @classmethod
+    def _clean(cls, v):
+        return _clean_tags(v)
+
+
+class ImageTags(BaseModel):
+    index: int
+    tags: List[str] = []
+
+    @field_validator("tags")
+    @classmethod
+    def _clean(cls, v):
+        return _clean_tags(v)
+
+
+class ImageTagExpansion(BaseModel):
+    images: List[ImageTags]
+
 
 class OllamaWrapper:
-    def __init__(self):
+    def __init__(self, priority: str = "ingestion"):
         self.url = settings.OLLAMA_URL
+        self.cache = get_llm_cache()
+        self.http = get_http()
+        # Media/listing ingestion yields to the traveler's interactive requests
+        self.priority = priority
+        self.scheduler = get_llm_scheduler()
 
-    def generate(self, prompt: str, model: str = "llama3.2", json_mode: bool = False) -> str:
+    def generate(self, prompt: str, model: str = "llama3.2", json_mode: bool = False, use_cache: bool = True,
+                 schema: dict = None, refresh: bool = False) -> str:
         # Ollama HTTP API: POST /api/generate with stream=False for single response
         payload = {
             "model": model,
@@ -15,28 +65,96 @@ class OllamaWrapper:
             "stream": False,
             "timeout": 120
         }
-        # Use format="json" for structured outputs (tag extraction, etc.)
-        if json_mode:
+        # Use format="json" for structured outputs (tag extraction, etc.); a JSON schema constrains it further
+        if schema is not None:
+            payload["format"] = schema
+        elif json_mode:
             payload["format"] = "json"
-        
-        resp = requests.post(
-            f"{self.url}/api/generate",
-            json=payload,
-            timeout=120
-        )
+
+        if self.cache is None or not use_cache:
+            return self._generate(payload)
+        key = make_key(model, prompt, payload.get("format"), payload.get("options"))
+        if refresh:
+            # Skip the lookup but overwrite the entry, e.g. to replace a cached reply that failed validation
+            value = self._generate(payload)
+            self.cache.set(key, value)
+            return value
+        return self.cache.get_or_generate(key, lambda: self._generate(payload))
+
+    def _generate(self, payload: dict) -> str:
+        # Cache hits never reach here, so only real generations take a scheduler slot
+        with self.scheduler.slot(payload["model"], self.priority):
+            resp = self.http.post(
+                f"{self.url}/api/generate",
+                json=payload,
+                timeout=120
+            )
         resp.raise_for_status()
         data = resp.json()
         # Ollama returns response field with generated text
         return data.get("response") or data.get("text") or str(data)
 
-    def embed(self, texts: list, model: str = "nomic-embed-text") -> list:
-        # Ollama embedding endpoint
-        resp = requests.post(
-            f"{self.url}/api/embed",
-            json={"model": model, "input": texts},
-            timeout=30
+    def generate_structured(self, prompt: str, output_model, model: str = "llama3.2"):
+        """
+        One JSON-mode call parsed into `output_model`. An invalid reply is
+        regenerated once, bypassing the cache, and a valid retry replaces the
+        bad cache entry. Raises ValueError if both replies are invalid.
+        """
+        schema = output_model.model_json_schema() if settings.LLM_JSON_SCHEMA else None
+        error = None
+        for refresh in (False, True):
+            out = self.generate(prompt, model=model, json_mode=True, schema=schema, refresh=refresh)
+            try:
+                return output_model.model_validate(json.loads(out))
+            except (ValueError, ValidationError) as e:
+                error = e
+        raise ValueError(f"LLM reply did not match {output_model.__name__}: {error}")
+
+    def extract_media_text(self, text: str, translate: bool = False) -> MediaExtraction:
+        """
+        Translation (when asked), a 2-3 sentence summary and 5-10 topic tags for a transcript.
+        If the model's reply can't be parsed, the transcript stands in as the summary and
+        the result is marked degraded. Transport errors and LLMOverloaded propagate.
+        """
+        translation = (
+            'Set "translation" to an exact English translation of the text, adding no extra details. '
+            if translate else 'Set "translation" to "". '
         )
-        resp.raise_for_status()
-        data = resp.json()
-        # Ollama returns embeddings array
-        return data.get("embeddings", [data])
+        prompt = (
+            'Return ONLY a JSON object {"translation": string, "summary": string, "tags": [string]}. '
+            f"{translation}"
+            'Set "summary" to a 2-3 sentence English summary and "tags" to 5-10 key topics in English.\n\n'
+            f"Text: {text}"
+        )
+        try:
+            return self.generate_structured(prompt, MediaExtraction)
+        except ValueError as e:
+            # Keep the transcript usable even if the model won't produce valid JSON
+            print(f"[LLM] Structured extraction failed: {e}")
+            return MediaExtraction(translation="", summary=text, tags=[], degraded=True)
+
+    def expand_image_tags(self, tag_lists: List[List[str]]) -> Tuple[List[List[str]], bool]:
+        """
+        Expand the detected tags of several images into 5-10 topics each, in one call.
+        Returns (tags per image, degraded); degraded means the reply couldn't be parsed
+        and the detected tags were kept. Transport errors and LLMOverloaded propagate.
+        """
+        unique = list(dict.fromkeys(tuple(tags) for tags in tag_lists))
+        lines = "\n".join(f"{i}. {' '.join(tags)}" for i, tags in enumerate(unique))
+        prompt = (
+            'Return ONLY a JSON object {"images": [{"index": int, "tags": [string]}]} with one entry per image below, '
+            "each with 5-10 key topics expanded from that image's detected tags.\n\n"
+            f"Images:\n{lines}"
+        )
+        try:
+            by_index = {item.index: item.tags for item in self.generate_structured(prompt, ImageTagExpansion).images}
+            degraded = False
+        except ValueError as e:
+            print(f"[LLM] Image tag expansion failed: {e}")
+            by_index, degraded = {}, True
+        expanded = {tags: by_index.get(i) or list(tags) for i, tags in enumerate(unique)}
+        return [expanded[tuple(tags)] for tags in tag_lists], degraded
+
+    def embed(self, texts: list, model: str = "nomic-embed-text") -> list:
+        # Micro-batched with concurrent callers into one /api/embed request
+        return get_embedding_service("ollama", model).embed_many(texts)
@@ -0,0 +1,169 @@
+import datetime
+import hashlib
+import os
+import threading
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from shared.utils.config import settings
+
+PHASH_BANDS = 8  # 8-bit bands: any two hashes within 7 bits share at least one band
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def image_phash(path: str) -> int:
+    """64-bit DCT perceptual hash: robust to re-encoding, resizing and small edits."""
+    img = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if img is None:
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise FileNotFoundError(path)
+    small = cv2.resize(img, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # DC term excluded from the threshold
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def phash_bands(phash: int) -> List[str]:
+    """Band keys for the near-duplicate lookup: 'band:value' per 8-bit slice."""
+    return [f"{i}:{(phash >> (8 * i)) & 0xFF:02x}" for i in range(PHASH_BANDS)]
+
+
+class MediaFingerprintStore:
+    """
+    Mongo store of processed media keyed by content fingerprint, so re-uploaded
+    photos and voice notes reuse their transcript, tags and enhanced file.
+
+    Audio matches on sha256 only. Images match on sha256, then on a perceptual
+    hash within max_distance bits; candidates come from a multikey index on
+    the hash's 8-bit bands, so a lookup never scans the collection.
+    Entries expire ttl_days after their last hit and writes trim the
+    collection to max_entries, least recently used first.
+    """
+
+    TRIM_EVERY = 100
+
+    def __init__(self, collection=None, max_entries: int = None, ttl_days: int = None, max_distance: int = None):
+        if collection is None:
+            from shared.utils.mongo_client import db
+            collection = db["media_fingerprints"]
+        self.col = collection
+        self.max_entries = max_entries or settings.MEDIA_CACHE_MAX_ENTRIES
+        self.ttl_days = settings.MEDIA_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        self.max_distance = settings.MEDIA_DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+        self._lock = threading.Lock()
+        self._indexed = False
+        self._writes = 0
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _ensure_indexes(self):
+        # Created on first use rather than at import (no Mongo round trip to start the app)
+        if self._indexed:
+            return
+        self.col.create_index("sha256", unique=True)
+        self.col.create_index("bands")
+        self.col.create_index("last_used_at", expireAfterSeconds=self.ttl_days * 86400)
+        self._indexed = True
+
+    def fingerprint(self, path: str, kind: str) -> dict:
+        fp = {"kind": kind, "sha256": file_sha256(path)}
+        if kind == "image":
+            fp["phash"] = image_phash(path)
+        return fp
+
+    def _usable(self, doc: dict) -> bool:
+        # The reused enhanced file must still be on disk
+        media_path = (doc.get("result") or {}).get("media", {}).get("path")
+        return doc.get("kind") != "image" or bool(media_path and os.path.exists(media_path))
+
+    def lookup(self, fp: dict) -> Optional[dict]:
+        """Stored result for an identical or near-duplicate file, or None."""
+        try:
+            self._ensure_indexes()
+            doc = self.col.find_one({"sha256": fp["sha256"], "kind": fp["kind"]})
+            hit = "exact" if doc and self._usable(doc) else None
+            if not hit and "phash" in fp:
+                best = None
+                for cand in self.col.find({"kind": "image", "bands": {"$in": phash_bands(fp["phash"])}}):
+                    distance = hamming(fp["phash"], int(cand["phash"], 16))
+                    if distance <= self.max_distance and self._usable(cand) and (best is None or distance < best[0]):
+                        best = (distance, cand)
+                if best:
+                    doc, hit = best[1], "near"
+            if not hit:
+                with self._lock:
+                    self.misses += 1
+                return None
+            self.col.update_one({"_id": doc["_id"]}, {"$set": {"last_used_at": datetime.datetime.utcnow()}, "$inc": {"hits": 1}})
+            with self._lock:
+                if hit == "exact":
+                    self.exact_hits += 1
+                else:
+                    self.near_hits += 1
+            return doc["result"]
+        except Exception as e:
+            # A broken cache must never fail the upload; process the file normally
+            print(f"[MediaCache] Lookup failed: {e}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+    def store(self, fp: dict, result: dict):
+        try:
+            self._ensure_indexes()
+            now = datetime.datetime.utcnow()
+            doc = {"sha256": fp["sha256"], "kind": fp["kind"], "result": result, "created_at": now, "last_used_at": now}
+            if "phash" in fp:
+                doc["phash"] = f"{fp['phash']:016x}"
+                doc["bands"] = phash_bands(fp["phash"])
+            self.col.update_one({"sha256": fp["sha256"]}, {"$set": doc, "$setOnInsert": {"hits": 0}}, upsert=True)
+            with self._lock:
+                self.stores += 1
+                self._writes += 1
+                should_trim = self._writes % self.TRIM_EVERY == 0
+            if should_trim:
+                self.trim()
+        except Exception as e:
+            print(f"[MediaCache] Store failed: {e}")
+            with self._lock:
+                self.errors += 1
+
+    def trim(self):
+        excess = self.col.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = self.col.find({}, {"_id": 1}).sort("last_used_at", 1).limit(excess)
+        deleted = self.col.delete_many({"_id": {"$in": [d["_id"] for d in oldest]}}).deleted_count
+        with self._lock:
+            self.evictions += deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.near_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "errors": self.errors,
+            }
@@ -3,38 +3,210 @@
 import pika
 import os
 import json
+import time
+import atexit
+import threading
+from collections import deque
+from shared.utils.config import settings
 
 class MQProducer:
-    def __init__(self):
-        RABBIT_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
-        RABBIT_USER = os.getenv("RABBITMQ_USER", "guest")
-        RABBIT_PASS = os.getenv("RABBITMQ_PASS", "guest")
+    """
+    RabbitMQ producer with a local outbox.
 
-        credentials = pika.PlainCredentials(RABBIT_USER, RABBIT_PASS)
+    publish() only appends to an in-memory outbox, so a slow or unavailable
+    broker never blocks or fails the caller. A single publisher thread owns
+    the pika connection and channel (BlockingConnection is not thread-safe),
+    drains the outbox in batches, reconnects with backoff on failure and puts
+    unsent batches back at the head of the outbox.
 
+    confirm_mode:
+      "none"  - fire-and-forget basic_publish
+      "each"  - publisher confirms: basic_publish returns once the broker has
+                acked the message, so a failure mid-batch requeues only the
+                messages it has not confirmed
+    """
+
+    CONFIRM_MODES = ("none", "each")
+
+    def __init__(self, confirm_mode: str = None, batch_size: int = None, outbox_max: int = None):
+        self.host = os.getenv("RABBITMQ_HOST", "rabbitmq")
+        self.user = os.getenv("RABBITMQ_USER", "guest")
+        self.password = os.getenv("RABBITMQ_PASS", "guest")
+        self.confirm_mode = (confirm_mode or settings.MQ_CONFIRM_MODE).lower()
+        if self.confirm_mode not in self.CONFIRM_MODES:
+            raise ValueError(f"Unknown MQ confirm mode '{self.confirm_mode}', expected one of {self.CONFIRM_MODES}")
+        self.batch_size = batch_size or settings.MQ_BATCH_SIZE
+        self.outbox_max = outbox_max or settings.MQ_OUTBOX_MAX
+
+        self.conn = None
+        self.channel = None
+        self._outbox = deque()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._inflight = 0
+        self.published = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.connections = 0
+        self._sent = 0
+        self._connected = threading.Event()
+
+        self._worker = threading.Thread(target=self._run, name="mq-publisher", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def publish(self, exchange: str, routing_key: str, payload: dict):
+        """Queue a message for the exchange with routing key."""
+        self.publish_many(exchange, [(routing_key, payload)])
+
+    def publish_many(self, exchange: str, messages: list):
+        """Queue a batch of (routing_key, payload) pairs."""
+        encoded = [
+            (exchange, routing_key, json.dumps(payload) if isinstance(payload, dict) else str(payload))
+            for routing_key, payload in messages
+        ]
+        with self._cond:
+            self._outbox.extend(encoded)
+            # Bounded outbox: shed the oldest messages rather than grow without limit
+            while len(self._outbox) > self.outbox_max:
+                self._outbox.popleft()
+                self.dropped += 1
+            self._cond.notify()
+
+    def _connect(self):
+        credentials = pika.PlainCredentials(self.user, self.password)
         params = pika.ConnectionParameters(
-            host=RABBIT_HOST,
+            host=self.host,
             port=5672,
             credentials=credentials,
             heartbeat=600,
             blocked_connection_timeout=300
         )
-
         self.conn = pika.BlockingConnection(params)
         self.channel = self.conn.channel()
         # Declare topic exchange
         self.channel.exchange_declare(exchange="hyperlocal", exchange_type="topic", durable=True)
+        if self.confirm_mode == "each":
+            self.channel.confirm_delivery()
+        self._connected.set()
 
-    def publish(self, exchange: str, routing_key: str, payload: dict):
-        """Publish message to exchange with routing key."""
+    def _disconnect(self):
+        self._connected.clear()
         try:
-            message = json.dumps(payload) if isinstance(payload, dict) else str(payload)
+            if self.conn and self.conn.is_open:
+                self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+        self.channel = None
+
+    def _take_batch(self, timeout: float) -> list:
+        with self._cond:
+            if not self._outbox and not self._stopped:
+                self._cond.wait(timeout)
+            batch = []
+            while self._outbox and len(batch) < self.batch_size:
+                batch.append(self._outbox.popleft())
+            self._inflight = len(batch)
+            return batch
+
+    def _requeue(self, batch: list):
+        with self._cond:
+            self._outbox.extendleft(reversed(batch))
+            self._inflight = 0
+
+    def _send(self, batch: list):
+        # _sent counts messages the broker already has (acked, with confirms),
+        # so a failure mid-batch only requeues the rest
+        self._sent = 0
+        for exchange, routing_key, body in batch:
             self.channel.basic_publish(
                 exchange=exchange,
                 routing_key=routing_key,
-                body=message,
+                body=body,
                 properties=pika.BasicProperties(delivery_mode=2)  # Persistent
             )
-        except Exception as e:
-            print(f"Failed to publish message: {e}")
-            raise
+            self._sent += 1
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            batch = self._take_batch(timeout=1.0)
+            if not batch:
+                if self._stopped:
+                    return
+                try:
+                    if self.conn is None:
+                        # Connect while idle too, so wait_connected() reflects the broker before anything is published
+                        self._connect()
+                        with self._cond:
+                            self.connections += 1
+                        backoff = 0.5
+                    else:
+                        # Keep heartbeats flowing while idle
+                        self.conn.process_data_events(time_limit=0)
+                except Exception as e:
+                    print(f"[MQ] Broker unavailable while idle: {e} (retrying in {backoff:.1f}s)")
+                    self._disconnect()
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, settings.MQ_MAX_BACKOFF)
+                continue
+            try:
+                if self.conn is None or not self.conn.is_open:
+                    self._connect()
+                    with self._cond:
+                        self.connections += 1
+                self._send(batch)
+                with self._cond:
+                    self.published += len(batch)
+                    self._inflight = 0
+                    self._cond.notify_all()
+                backoff = 0.5
+            except Exception as e:
+                remaining = batch[self._sent:]
+                with self._cond:
+                    self.failed_batches += 1
+                    self.published += self._sent
+                print(f"Failed to publish message: {e} (retrying {len(remaining)} messages in {backoff:.1f}s)")
+                self._requeue(remaining)
+                self._disconnect()
+                if self._stopped:
+                    return
+                time.sleep(backoff)
+                backoff = min(backoff * 2, settings.MQ_MAX_BACKOFF)
+
+    def wait_connected(self, timeout: float) -> bool:
+        """True once the publisher holds an open broker connection (waits up to `timeout`)."""
+        return self._connected.wait(timeout)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until the outbox is drained; False if messages are still pending at timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._outbox or self._inflight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.1))
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Flush what the broker will take within `timeout`, then stop the publisher."""
+        if not self.flush(timeout):
+            print(f"[MQ] Shutting down with {len(self._outbox)} unpublished messages")
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._worker.join(timeout)
+        self._disconnect()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "confirm_mode": self.confirm_mode,
+                "queued": len(self._outbox) + self._inflight,
+                "published": self.published,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches,
+                "connections": self.connections,
+            }
@@ -1,9 +1,92 @@
 import os
+import re
+import shutil
+import subprocess
+import tempfile
 import time
-import requests
-from typing import Optional
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from shared.utils.config import settings
+from shared.utils.http import get_http
+from typing import Dict, Iterator, List, Optional, Tuple
 
-class AssemblyAISTT:
+
+def audio_duration(audio_path: str) -> Optional[float]:
+    """Duration in seconds via ffprobe, or None if it can't be determined."""
+    try:
+        import ffmpeg
+        return float(ffmpeg.probe(audio_path)["format"]["duration"])
+    except Exception as e:
+        print(f"[STT] Could not probe duration of {audio_path}: {e}")
+        return None
+
+
+def poll_delays(duration: Optional[float] = None) -> Iterator[float]:
+    """
+    Wait times before each transcript status poll.
+    The first wait is scaled to the audio length (transcription takes a
+    fraction of real time); after that polls back off exponentially from
+    STT_POLL_MIN_INTERVAL up to STT_POLL_MAX_INTERVAL.
+    """
+    min_interval = settings.STT_POLL_MIN_INTERVAL
+    max_interval = settings.STT_POLL_MAX_INTERVAL
+    if duration:
+        yield min(max(duration * settings.STT_POLL_FIRST_FRACTION, min_interval), max_interval)
+    delay = min_interval
+    while True:
+        yield delay
+        delay = min(delay * settings.STT_POLL_BACKOFF, max_interval)
+
+
+class TranscriptWaiters:
+    """Lets a webhook callback wake the thread waiting on a transcript id."""
+
+    def __init__(self):
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def expect(self, transcript_id: str):
+        with self._lock:
+            self._events.setdefault(transcript_id, threading.Event())
+
+    def wait(self, transcript_id: str, timeout: float) -> bool:
+        """Block up to `timeout` seconds; True if a callback arrived."""
+        with self._lock:
+            event = self._events.get(transcript_id)
+        if event is None:
+            time.sleep(timeout)
+            return False
+        woke = event.wait(timeout)
+        event.clear()
+        return woke
+
+    def notify(self, transcript_id: str) -> bool:
+        """Wake the waiter for `transcript_id`; False if nobody is waiting on it."""
+        with self._lock:
+            event = self._events.get(transcript_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def discard(self, transcript_id: str):
+        with self._lock:
+            self._events.pop(transcript_id, None)
+
+
+transcript_waiters = TranscriptWaiters()
+
+
+class STTBackend(ABC):
+    """Interface every speech-to-text backend implements."""
+
+    @abstractmethod
+    def transcribe(self, audio_path: str, language: Optional[str] = None) -> str:
+        """Return the transcript of `audio_path` in its source language."""
+
+
+class AssemblyAISTT(STTBackend):
     """
     Speech-to-Text using AssemblyAI API
     Much more accurate than Whisper for Hindi/Marathi
@@ -11,11 +94,13 @@ class AssemblyAISTT:
     Requires: ASSEMBLYAI_API_KEY environment variable
     """
     
-    def __init__(self, language: str = "hi"):
+    def __init__(self, language: str = "hi", base_url: str = None, webhook_url: str = None):
         """
         Initialize AssemblyAI STT
         Args:
             language: Language code (e.g., "hi" for Hindi, "mr" for Marathi, "en" for English)
+            base_url: API root, defaults to settings.ASSEMBLYAI_BASE_URL (point at services/stt_stub.py offline)
+            webhook_url: Public URL of /agent/vendor/stt-callback; enables webhook completion
         """
         api_key = os.getenv("ASSEMBLYAI_API_KEY")
         if not api_key:
@@ -23,7 +108,9 @@ class AssemblyAISTT:
         
         self.api_key = api_key
         self.language = language
-        self.base_url = "https://api.assemblyai.com/v2"
+        self.base_url = (base_url or settings.ASSEMBLYAI_BASE_URL).rstrip('/')
+        self.webhook_url = webhook_url if webhook_url is not None else settings.STT_WEBHOOK_URL
+        self.http = get_http()
         print(f"[AssemblyAISTT] Initialized with language: {language}")
     
     def transcribe(self, audio_path: str, language: Optional[str] = None) -> str:
@@ -39,6 +126,8 @@ class AssemblyAISTT:
         """
         lang = language or self.language
         print(f"[AssemblyAISTT] Transcribing: {audio_path} (Language: {lang})")
+        duration = audio_duration(audio_path)
+        transcript_id = None
         
         try:
             # Upload file
@@ -46,11 +135,13 @@ class AssemblyAISTT:
             headers = {"Authorization": self.api_key}
             
             with open(audio_path, "rb") as f:
-                response = requests.post(
+                # A streamed file body can't be replayed, so no retries here
+                response = self.http.post(
                     f"{self.base_url}/upload",
                     headers=headers,
                     data=f,
-                    timeout=60
+                    timeout=60,
+                    retries=0
                 )
             
             response.raise_for_status()
@@ -64,25 +155,44 @@ class AssemblyAISTT:
                 "language_code": lang,
                 "language_detection": False,  # Use specified language
             }
+            if self.webhook_url:
+                transcript_request["webhook_url"] = self.webhook_url
+                if settings.STT_WEBHOOK_SECRET:
+                    transcript_request["webhook_auth_header_name"] = "X-STT-Webhook-Secret"
+                    transcript_request["webhook_auth_header_value"] = settings.STT_WEBHOOK_SECRET
             
-            response = requests.post(
+            # Not retried: a duplicate request would start (and bill) a second transcript
+            response = self.http.post(
                 f"{self.base_url}/transcript",
                 headers=headers,
                 json=transcript_request,
-                timeout=30
+                timeout=30,
+                retries=0
             )
             
             response.raise_for_status()
             transcript_id = response.json()["id"]
             print(f"[AssemblyAISTT] Transcript ID: {transcript_id}")
-            
-            # Poll for completion
+            if self.webhook_url:
+                transcript_waiters.expect(transcript_id)
+
+            # Wait for completion: webhook wake-up if configured, adaptive polling otherwise
             print("[AssemblyAISTT] Processing...")
-            max_retries = 120  # 10 minutes max wait
-            retry_count = 0
-            
-            while retry_count < max_retries:
-                response = requests.get(
+            deadline = time.monotonic() + settings.STT_TIMEOUT
+            delays = poll_delays(duration)
+            polls = 0
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if self.webhook_url:
+                    # Polling is only a safety net for lost callbacks
+                    transcript_waiters.wait(transcript_id, min(settings.STT_WEBHOOK_FALLBACK_INTERVAL, remaining))
+                else:
+                    time.sleep(min(next(delays), remaining))
+                polls += 1
+                response = self.http.get(
                     f"{self.base_url}/transcript/{transcript_id}",
                     headers=headers,
                     timeout=30
@@ -92,29 +202,142 @@ class AssemblyAISTT:
                 result = response.json()
                 
                 if result["status"] == "completed":
-                    text = result.get("text", "")
-                    print(f"[AssemblyAISTT] Transcribed ({lang}): {text[:100]}...")
+                    text = result.get("text") or ""
+                    print(f"[AssemblyAISTT] Transcribed ({lang}) after {polls} polls: {text[:100]}...")
                     return text
                 elif result["status"] == "error":
                     error_msg = result.get("error", "Unknown error")
                     raise Exception(f"[AssemblyAISTT] Transcription error: {error_msg}")
                 
-                print(f"[AssemblyAISTT] Status: {result['status']}... waiting ({retry_count+1}s)")
-                time.sleep(1)
-                retry_count += 1
-            
-            raise TimeoutError("[AssemblyAISTT] Transcription timed out after 10 minutes")
-        
+                print(f"[AssemblyAISTT] Status: {result['status']}... (poll {polls})")
+
+            raise TimeoutError(f"[AssemblyAISTT] Transcription timed out after {settings.STT_TIMEOUT}s")
+
         except Exception as e:
             print(f"[AssemblyAISTT] Error: {e}")
             raise RuntimeError(f"AssemblyAI transcription failed: {e}")
+        finally:
+            if transcript_id:
+                transcript_waiters.discard(transcript_id)
+
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+def detect_silences(audio_path: str, noise_db: float, min_silence: float) -> List[Tuple[float, float]]:
+    """(start, end) of each silent stretch, from ffmpeg's silencedetect filter."""
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True, text=True, check=True
+    )
+    silences, start = [], None
+    for kind, value in _SILENCE_RE.findall(proc.stderr):
+        if kind == "start":
+            start = max(float(value), 0.0)
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    return silences
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]], target: float) -> List[Tuple[float, float]]:
+    """
+    Split [0, duration] into chunks of roughly `target` seconds.
+    Each cut goes in the middle of the first silence at least `target` seconds
+    after the previous cut; with no silence before 1.5 * target, it is a hard cut.
+    """
+    midpoints = [(s + e) / 2 for s, e in silences]
+    chunks, start = [], 0.0
+    while duration - start > target * 1.5:
+        cut = next((m for m in midpoints if start + target <= m <= start + target * 1.5), start + target)
+        chunks.append((start, cut))
+        start = cut
+    chunks.append((start, duration))
+    return chunks
+
+
+class WhisperLocalSTT(STTBackend):
+    """
+    Speech-to-Text with the local whisper CLI (settings.WHISPER_BIN).
+    Long audio is split on silence into ~WHISPER_CHUNK_SECONDS chunks, which
+    are transcribed by parallel whisper processes and joined in order.
+    Requires ffmpeg on PATH.
+    """
+
+    def __init__(self, language: str = "hi", whisper_bin: str = None, model: str = None, workers: int = None):
+        self.whisper_bin = whisper_bin or settings.WHISPER_BIN
+        if not (os.path.exists(self.whisper_bin) or shutil.which(self.whisper_bin)):
+            raise ValueError(f"[WhisperLocalSTT] ERROR: whisper binary not found at {self.whisper_bin}")
+        self.language = language
+        self.model = model or settings.WHISPER_MODEL
+        cpus = os.cpu_count() or 1
+        self.workers = max(1, workers or settings.WHISPER_WORKERS or cpus)
+        # Split the cores between concurrent whisper processes
+        self.threads = max(1, cpus // self.workers)
+        print(f"[WhisperLocalSTT] Initialized with language: {language}, model: {self.model}, workers: {self.workers}")
+
+    def _run_whisper(self, audio_path: str, language: str, out_dir: str, threads: int) -> str:
+        subprocess.run(
+            [self.whisper_bin, audio_path, "--model", self.model, "--language", language,
+             "--task", "transcribe", "--output_format", "txt", "--output_dir", out_dir,
+             "--threads", str(threads), "--fp16", "False", "--verbose", "False"],
+            capture_output=True, text=True, check=True
+        )
+        base = os.path.splitext(os.path.basename(audio_path))[0]
+        with open(os.path.join(out_dir, f"{base}.txt"), "r", encoding="utf-8") as f:
+            return f.read().strip()
+
+    def _extract_chunk(self, audio_path: str, start: float, end: float, out_path: str):
+        subprocess.run(
+            ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", audio_path,
+             "-ss", f"{start:.3f}", "-to", f"{end:.3f}", "-ac", "1", "-ar", "16000", out_path],
+            check=True
+        )
+
+    def transcribe(self, audio_path: str, language: Optional[str] = None) -> str:
+        lang = language or self.language
+        print(f"[WhisperLocalSTT] Transcribing: {audio_path} (Language: {lang})")
+        try:
+            with tempfile.TemporaryDirectory(prefix="whisper_") as tmp:
+                duration = audio_duration(audio_path)
+                if not duration or duration <= settings.WHISPER_CHUNK_SECONDS * 1.5 or self.workers == 1:
+                    return self._run_whisper(audio_path, lang, tmp, self.threads * self.workers)
+
+                silences = detect_silences(audio_path, settings.WHISPER_SILENCE_DB, settings.WHISPER_SILENCE_MIN)
+                chunks = plan_chunks(duration, silences, settings.WHISPER_CHUNK_SECONDS)
+                print(f"[WhisperLocalSTT] {duration:.1f}s audio split into {len(chunks)} chunks")
+
+                def run_chunk(item):
+                    i, (start, end) = item
+                    chunk_path = os.path.join(tmp, f"chunk_{i:04d}.wav")
+                    self._extract_chunk(audio_path, start, end, chunk_path)
+                    return self._run_whisper(chunk_path, lang, tmp, self.threads)
+
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks)), thread_name_prefix="whisper") as pool:
+                    texts = list(pool.map(run_chunk, enumerate(chunks)))
+                text = " ".join(t for t in texts if t)
+                print(f"[WhisperLocalSTT] Transcribed ({lang}): {text[:100]}...")
+                return text
+        except subprocess.CalledProcessError as e:
+            print(f"[WhisperLocalSTT] Error: {e.stderr}")
+            raise RuntimeError(f"Whisper transcription failed: {e}")
+
+
+STT_BACKENDS = {
+    "assemblyai": AssemblyAISTT,
+    "whisper": WhisperLocalSTT,
+}
 
 
 # Factory function to create STT service with default language (Hindi)
-def get_stt_service(language: str = "hi") -> AssemblyAISTT:
+def get_stt_service(language: str = "hi", backend: str = None) -> STTBackend:
     """
-    Create and return an AssemblyAISTT instance with specified language.
-    Default is Hindi ("hi").
-    Requires ASSEMBLYAI_API_KEY environment variable to be set.
+    Create and return the STT backend named by `backend` (or settings.STT_BACKEND).
+    "assemblyai" requires ASSEMBLYAI_API_KEY; "whisper" requires settings.WHISPER_BIN and ffmpeg.
+    Default language is Hindi ("hi").
     """
-    return AssemblyAISTT(language=language)
+    name = (backend or settings.STT_BACKEND).lower()
+    if name not in STT_BACKENDS:
+        raise ValueError(f"Unknown STT backend '{name}', expected one of {sorted(STT_BACKENDS)}")
+    return STT_BACKENDS[name](language=language)
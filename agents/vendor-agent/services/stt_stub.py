@@ -0,0 +1,105 @@
+"""
+Local stand-in for the AssemblyAI v2 API, for offline development and tests.
+
+Implements POST /v2/upload, POST /v2/transcript and GET /v2/transcript/<id>.
+Transcripts complete `delay` seconds after creation; if the request carried a
+webhook_url the stub POSTs {"transcript_id", "status"} to it on completion,
+with the requested auth header. GET /stub/stats returns request counts.
+
+Run: python -m services.stt_stub --port 8099 --delay 3
+then set ASSEMBLYAI_BASE_URL=http://localhost:8099/v2 and any ASSEMBLYAI_API_KEY.
+"""
+import argparse
+import threading
+import time
+import uuid
+from collections import Counter
+
+import requests
+from flask import Flask, jsonify, request
+
+
+def create_stub_app(delay: float = 2.0, text: str = "stub transcript", fail: bool = False) -> Flask:
+    app = Flask(__name__)
+    transcripts = {}
+    counts = Counter()
+    lock = threading.Lock()
+
+    def fire_webhook(transcript: dict):
+        headers = {}
+        if transcript.get("webhook_auth_header_name"):
+            headers[transcript["webhook_auth_header_name"]] = transcript.get("webhook_auth_header_value", "")
+        try:
+            requests.post(
+                transcript["webhook_url"],
+                json={"transcript_id": transcript["id"], "status": transcript_status(transcript)},
+                headers=headers,
+                timeout=5,
+            )
+        except Exception as e:
+            print(f"[STTStub] Webhook to {transcript['webhook_url']} failed: {e}")
+
+    def transcript_status(transcript: dict) -> str:
+        if time.monotonic() < transcript["ready_at"]:
+            return "processing"
+        return "error" if fail else "completed"
+
+    @app.route("/v2/upload", methods=["POST"])
+    def upload():
+        with lock:
+            counts["upload"] += 1
+        request.get_data()  # drain the body like the real API
+        return jsonify({"upload_url": f"stub://uploads/{uuid.uuid4()}"})
+
+    @app.route("/v2/transcript", methods=["POST"])
+    def create_transcript():
+        body = request.get_json(force=True) or {}
+        transcript = {
+            "id": str(uuid.uuid4()),
+            "audio_url": body.get("audio_url"),
+            "language_code": body.get("language_code"),
+            "webhook_url": body.get("webhook_url"),
+            "webhook_auth_header_name": body.get("webhook_auth_header_name"),
+            "webhook_auth_header_value": body.get("webhook_auth_header_value"),
+            "ready_at": time.monotonic() + delay,
+        }
+        with lock:
+            counts["create"] += 1
+            transcripts[transcript["id"]] = transcript
+        if transcript["webhook_url"]:
+            timer = threading.Timer(delay, fire_webhook, args=(transcript,))
+            timer.daemon = True
+            timer.start()
+        return jsonify({"id": transcript["id"], "status": "queued"})
+
+    @app.route("/v2/transcript/<transcript_id>", methods=["GET"])
+    def get_transcript(transcript_id):
+        with lock:
+            counts["poll"] += 1
+            transcript = transcripts.get(transcript_id)
+        if transcript is None:
+            return jsonify({"error": "Transcript not found"}), 404
+        status = transcript_status(transcript)
+        out = {"id": transcript_id, "status": status, "text": None}
+        if status == "completed":
+            out["text"] = text
+        elif status == "error":
+            out["error"] = "stub failure"
+        return jsonify(out)
+
+    @app.route("/stub/stats", methods=["GET"])
+    def stats():
+        with lock:
+            return jsonify(dict(counts))
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local AssemblyAI API stub")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds until a transcript completes")
+    parser.add_argument("--text", default="stub transcript")
+    parser.add_argument("--fail", action="store_true", help="finish transcripts with status=error")
+    args = parser.parse_args()
+    create_stub_app(args.delay, args.text, args.fail).run(host="0.0.0.0", port=args.port)
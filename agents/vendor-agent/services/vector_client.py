@@ -1,47 +1,75 @@
 from shared.utils.config import settings
-from typing import List, Dict, Any
-import requests
+from shared.utils.http import get_http
+from shared.utils.vector_registry import PAYLOAD_INDEXES, EMBED_DIM, check_collection_size, collection_config, search_params
+from typing import Callable, List, Dict, Any, Optional
+from collections import defaultdict, deque
+import atexit
+import threading
+import time
 import json
 
 class QdrantClientWrapper:
     def __init__(self, url: str = None):
         self.url = (url or settings.QDRANT_URL).rstrip('/')
         self.created_collections = set()
+        self.http = get_http()
 
-    def _ensure_collection(self, collection_name: str, vector_size: int = 384):
-        """Create collection if it doesn't exist"""
+    def _ensure_collection(self, collection_name: str, vector_size: int = EMBED_DIM):
+        """Create collection if it doesn't exist; refuse to write into one built for another model"""
         if collection_name in self.created_collections:
             return
         try:
             # Try to get collection info first
-            resp = requests.get(f"{self.url}/collections/{collection_name}", timeout=10)
-            if resp.status_code == 200:
-                self.created_collections.add(collection_name)
-                return
+            resp = self.http.get(f"{self.url}/collections/{collection_name}", timeout=10)
         except:
-            pass
+            resp = None
+        if resp is not None and resp.status_code == 200:
+            vectors = resp.json().get("result", {}).get("config", {}).get("params", {}).get("vectors", {})
+            if "size" in vectors:
+                check_collection_size(collection_name, vectors["size"])
+            self.created_collections.add(collection_name)
+            return
         
-        # Create collection if it doesn't exist
+        # Create collection if it doesn't exist, with the configured profile (quantization, on-disk, HNSW)
         create_url = f"{self.url}/collections/{collection_name}"
-        create_payload = {
-            "vectors": {
-                "size": vector_size,
-                "distance": "Cosine"
-            }
-        }
+        create_payload = collection_config()
+        create_payload["vectors"]["size"] = vector_size
         try:
-            resp = requests.put(create_url, json=create_payload, timeout=20)
+            resp = self.http.put(create_url, json=create_payload, timeout=20)
             resp.raise_for_status()
             self.created_collections.add(collection_name)
         except Exception as e:
             print(f"[Warn] Failed to create collection {collection_name}: {e}")
+            return
+        self._ensure_payload_indexes(collection_name)
+
+    def _ensure_payload_indexes(self, collection_name: str):
+        """Index the payload fields traveler search filters on"""
+        for field, schema in PAYLOAD_INDEXES.items():
+            try:
+                resp = self.http.put(
+                    f"{self.url}/collections/{collection_name}/index",
+                    json={"field_name": field, "field_schema": schema},
+                    timeout=20,
+                )
+                resp.raise_for_status()
+            except Exception as e:
+                print(f"[Warn] Failed to index {collection_name}.{field}: {e}")
 
-    def upsert(self, collection_name: str, vectors: List[Dict[str, Any]]):
+    def upsert(self, collection_name: str, vectors: List[Dict[str, Any]], wait: bool = True):
         # vectors: list of {"id": str, "vector": [...], "payload": {...}}
-        self._ensure_collection(collection_name, vector_size=len(vectors[0]["vector"]) if vectors else 384)
-        url = f"{self.url}/collections/{collection_name}/points?wait=true"
+        self._ensure_collection(collection_name, vector_size=len(vectors[0]["vector"]) if vectors else EMBED_DIM)
+        url = f"{self.url}/collections/{collection_name}/points?wait={'true' if wait else 'false'}"
         data = {"points": vectors}
-        resp = requests.put(url, json=data, timeout=20)
+        resp = self.http.put(url, json=data, timeout=20)
+        resp.raise_for_status()
+        return resp.json()
+
+    def set_payload(self, collection_name: str, point_id: str, payload: Dict[str, Any], wait: bool = True):
+        """Overwrite the given payload keys of one point, leaving its vector and other keys alone"""
+        url = f"{self.url}/collections/{collection_name}/points/payload?wait={'true' if wait else 'false'}"
+        # Overwrites the same keys with the same values, so resending is safe
+        resp = self.http.post(url, json={"payload": payload, "points": [point_id]}, timeout=20, idempotent=True)
         resp.raise_for_status()
         return resp.json()
 
@@ -51,6 +79,138 @@ class QdrantClientWrapper:
         payload = {"vector": vector, "limit": top}
         if filter:
             payload["filter"] = filter
-        resp = requests.post(url, json=payload, timeout=20)
+        params = search_params()
+        if params:
+            payload["params"] = params
+        resp = self.http.post(url, json=payload, timeout=20, idempotent=True)  # read-only
         resp.raise_for_status()
         return resp.json()
+
+
+class UpsertBuffer:
+    """
+    Write-behind buffer for Qdrant upserts.
+    Points are queued per collection and flushed as batched `points` requests
+    once batch_size points are pending or every flush_interval seconds.
+    Failed batches go to a retry queue and are retried on later flushes once
+    their backoff (retry_backoff * 2^(attempts-1), capped at max_backoff) has
+    passed; after max_attempts they are handed to on_drop (Mongo stays the
+    source of truth, so dropped points can be re-indexed from there).
+    """
+
+    def __init__(self, client: QdrantClientWrapper, batch_size: int = 64, flush_interval: float = 1.0,
+                 wait: bool = False, max_attempts: int = 5, retry_backoff: float = 1.0, max_backoff: float = 60.0,
+                 on_drop: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None):
+        self.client = client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.wait = wait
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.on_drop = on_drop
+        self._pending: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._failed = deque()  # (collection, points, attempts, next attempt at)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._worker = None
+        self.flushed_points = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped_points = 0
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="qdrant-write-behind", daemon=True)
+                    self._worker.start()
+
+    def add(self, collection_name: str, points: List[Dict[str, Any]]):
+        self._ensure_worker()
+        with self._lock:
+            pending = self._pending[collection_name]
+            pending.extend(points)
+            full = len(pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def _upsert(self, collection_name: str, points: List[Dict[str, Any]], attempts: int):
+        try:
+            self.client.upsert(collection_name, points, wait=self.wait)
+            self.flushed_points += len(points)
+            self.batches += 1
+        except Exception as e:
+            self.failures += 1
+            attempts += 1
+            if attempts >= self.max_attempts:
+                self.dropped_points += len(points)
+                print(f"[Warn] Dropping {len(points)} points for {collection_name} after {attempts} attempts: {e}")
+                if self.on_drop:
+                    try:
+                        self.on_drop(collection_name, points)
+                    except Exception as drop_err:
+                        print(f"[Warn] on_drop failed: {drop_err}")
+            else:
+                delay = min(self.max_backoff, self.retry_backoff * 2 ** (attempts - 1))
+                print(f"[Warn] Upsert of {len(points)} points to {collection_name} failed (attempt {attempts}), "
+                      f"retrying in {delay:.0f}s: {e}")
+                with self._lock:
+                    self._failed.append((collection_name, points, attempts, time.monotonic() + delay))
+
+    def flush(self, force: bool = False):
+        """Send everything pending, retrying failed batches whose backoff has passed (all of them if force) first."""
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(list)
+                retries = [f for f in self._failed if force or f[3] <= now]
+                self._failed = deque(f for f in self._failed if not (force or f[3] <= now))
+            for collection_name, points, attempts, _ in retries:
+                self._upsert(collection_name, points, attempts)
+            for collection_name, points in pending.items():
+                for i in range(0, len(points), self.batch_size):
+                    self._upsert(collection_name, points[i:i + self.batch_size], 0)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background flusher and flush what is left (registered with atexit)."""
+        self._stopped.set()
+        self._wake.set()
+        self.flush(force=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(len(p) for p in self._pending.values())
+            failed = sum(len(f[1]) for f in self._failed)
+        return {
+            "pending_points": pending,
+            "retry_queue_points": failed,
+            "flushed_points": self.flushed_points,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped_points": self.dropped_points,
+        }
+
+
+def create_upsert_buffer(client: QdrantClientWrapper, on_drop=None) -> UpsertBuffer:
+    """UpsertBuffer configured from settings, flushed automatically at interpreter exit."""
+    buffer = UpsertBuffer(
+        client,
+        batch_size=settings.QDRANT_UPSERT_BATCH_SIZE,
+        flush_interval=settings.QDRANT_FLUSH_INTERVAL,
+        wait=settings.QDRANT_UPSERT_WAIT,
+        max_attempts=settings.QDRANT_UPSERT_MAX_ATTEMPTS,
+        retry_backoff=settings.QDRANT_RETRY_BACKOFF,
+        max_backoff=settings.QDRANT_RETRY_MAX_BACKOFF,
+        on_drop=on_drop,
+    )
+    atexit.register(buffer.close)
+    return buffer
@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+import pytest
+
+from services.image_service import ImageEnhancer, enhance_image
+
+
+def _photo(path, width=1600, height=1200, bgr=(40, 60, 200)):
+    img = np.full((height, width, 3), bgr, dtype=np.uint8)
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def test_enhance_image_reduces_and_writes_thumbnails(tmp_path):
+    src = _photo(tmp_path / "stay.jpg")
+    res = enhance_image(src, max_side=800, thumb_sizes=(320, 160))
+
+    enhanced = cv2.imread(res["enhanced_path"])
+    assert res["enhanced_path"].endswith("stay_enh.jpg")
+    assert max(enhanced.shape[:2]) == 800 and (res["width"], res["height"]) == (800, 600)
+    assert [cv2.imread(p).shape[1] for p in res["thumbnails"]] == [320, 160]
+    assert res["tags"] == ["warm"]
+
+
+def test_image_enhancer_inline_matches_pipeline(tmp_path):
+    src = _photo(tmp_path / "lake.jpg", bgr=(200, 80, 40))
+    res = ImageEnhancer(workers=0).enhance(src)
+    assert res["tags"] == ["cool"]
+    assert len(res["thumbnails"]) == 2
+
+
+def test_failed_write_raises(tmp_path):
+    src = _photo(tmp_path / "stay.jpg")
+    with pytest.raises(OSError, match="imwrite failed"):
+        enhance_image(src, out_path=str(tmp_path / "missing" / "stay_enh.jpg"))
+
+
+def test_pool_workers_run_the_pipeline(tmp_path):
+    src = _photo(tmp_path / "lake.jpg", bgr=(200, 80, 40))
+    enhancer = ImageEnhancer(workers=1)
+    try:
+        assert enhancer.enhance(src)["tags"] == ["cool"]
+    finally:
+        enhancer.close()
+
+
+def test_phash_matches_resized_copy_and_bands_overlap(tmp_path):
+    from services.media_cache import image_phash, hamming, phash_bands
+
+    rng = np.random.default_rng(1)
+    img = cv2.resize(rng.integers(0, 255, (24, 32, 3), dtype=np.uint8), (1280, 960), interpolation=cv2.INTER_CUBIC)
+    cv2.imwrite(str(tmp_path / "a.jpg"), img)
+    cv2.imwrite(str(tmp_path / "a_small.jpg"), cv2.resize(img, (640, 480)), [cv2.IMWRITE_JPEG_QUALITY, 60])
+    cv2.imwrite(str(tmp_path / "b.jpg"), cv2.flip(img, 0))
+
+    a, a_small, b = (image_phash(str(tmp_path / n)) for n in ("a.jpg", "a_small.jpg", "b.jpg"))
+    assert hamming(a, a_small) <= 6
+    assert hamming(a, b) > 6
+    assert set(phash_bands(a)) & set(phash_bands(a_small))
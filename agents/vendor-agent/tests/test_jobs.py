@@ -0,0 +1,129 @@
+import pytest
+
+from services.jobs import JobStore, LISTING_STAGES
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for JobStore: flat `id` lookups and dotted $set paths."""
+
+    def __init__(self):
+        self.docs = []
+
+    def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if d["id"] == query["id"]), None)
+
+    def _apply(self, doc, update):
+        for path, value in update["$set"].items():
+            target = doc
+            *parents, leaf = path.split(".")
+            for key in parents:
+                target = target.setdefault(key, {})
+            target[leaf] = value
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if doc["id"] == query["id"]:
+                self._apply(doc, update)
+
+    def update_many(self, query, update):
+        matched = [d for d in self.docs
+                   if d["status"] in query["status"]["$in"] and d["created_at"] < query["created_at"]["$lt"]]
+        for doc in matched:
+            self._apply(doc, update)
+        return type("UpdateResult", (), {"modified_count": len(matched)})()
+
+
+@pytest.fixture
+def store():
+    return JobStore(FakeCollection())
+
+
+def test_run_records_stages_and_result(store):
+    job_id = store.create("listing", LISTING_STAGES)
+    assert store.get(job_id)["status"] == "queued"
+    seen = []
+
+    def pipeline(x, progress):
+        for stage in ("media", "description"):
+            progress(stage)
+            seen.append(dict(store.get(job_id)["stages"][stage]))
+        return {"id": "l1", "x": x}
+
+    assert store.run(job_id, pipeline, 1) == {"id": "l1", "x": 1}
+    assert [s["status"] for s in seen] == ["running", "running"]
+    job = store.get(job_id)
+    assert job["status"] == "completed" and job["stage"] is None
+    assert job["result"] == {"id": "l1", "x": 1}
+    assert job["stages"]["media"]["status"] == "done" and "finished_at" in job["stages"]["media"]
+    assert job["stages"]["description"]["status"] == "done"
+    assert job["stages"]["embedding"] == {"status": "pending"}
+
+
+def test_run_records_failure_at_current_stage(store):
+    job_id = store.create("listing", LISTING_STAGES)
+
+    def pipeline(progress):
+        progress("media")
+        progress("embedding")
+        raise RuntimeError("model missing")
+
+    assert store.run(job_id, pipeline) is None
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["error"] == "model missing"
+    assert job["stages"]["media"]["status"] == "done"
+    assert job["stages"]["embedding"]["status"] == "failed"
+
+
+def test_fail_interrupted_only_touches_unfinished_jobs(store):
+    queued, running, done = (store.create("event", ["persist"]) for _ in range(3))
+    store.progress(running)("persist")
+    store.run(done, lambda progress: {"id": "e1"})
+
+    assert store.fail_interrupted(before="9999") == 2
+    assert store.get(queued)["status"] == "failed"
+    assert store.get(running)["error"] == "interrupted by restart"
+    assert store.get(done)["status"] == "completed"
+    assert store.fail_interrupted(before="9999") == 0
+
+
+def test_job_endpoint(store, monkeypatch):
+    import app as vendor_app
+
+    monkeypatch.setattr(vendor_app, "jobs", store)
+    client = vendor_app.app.test_client()
+    job_id = store.create("listing", LISTING_STAGES)
+    store.progress(job_id)("media")
+
+    response = client.get(f"/agent/vendor/jobs/{job_id}")
+    assert response.status_code == 200
+    assert response.json["status"] == "running" and response.json["stage"] == "media"
+    assert client.get("/agent/vendor/jobs/missing").status_code == 404
+
+
+def test_listing_job_cleans_up_its_upload_folder(store, monkeypatch, tmp_path):
+    import app as vendor_app
+
+    monkeypatch.setattr(vendor_app, "jobs", store)
+    folder = tmp_path / "job"
+    folder.mkdir()
+    (folder / "clip.wav").write_bytes(b"RIFF")
+    (folder / "photo.jpg").write_bytes(b"raw")
+    (folder / "photo_enh.jpg").write_bytes(b"enhanced")
+
+    # Uploads the listing doesn't reference are removed; enhanced copies it points at stay
+    persisted = {"media": [{"path": str(folder / "photo_enh.jpg"), "thumbnails": []}]}
+    monkeypatch.setattr(vendor_app, "build_listing", lambda payload, saved, progress: persisted)
+    assert vendor_app.run_listing_job(store.create("listing", LISTING_STAGES), None, [], str(folder)) == persisted
+    assert sorted(p.name for p in folder.iterdir()) == ["photo_enh.jpg"]
+
+    def broken(payload, saved, progress):
+        raise RuntimeError("stt down")
+
+    monkeypatch.setattr(vendor_app, "build_listing", broken)
+    job_id = store.create("listing", LISTING_STAGES)
+    assert vendor_app.run_listing_job(job_id, None, [], str(folder)) is None
+    assert store.get(job_id)["status"] == "failed"
+    assert not folder.exists()
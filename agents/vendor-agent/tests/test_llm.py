@@ -0,0 +1,56 @@
+import json
+
+import pytest
+import requests
+
+from services.llm import OllamaWrapper
+from shared.utils.llm_cache import LLMCache
+
+
+def _wrapper(replies):
+    llm = OllamaWrapper()
+    llm.cache = LLMCache(max_entries=16)
+    calls = []
+
+    def fake_generate(payload):
+        calls.append(payload)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    llm._generate = fake_generate
+    return llm, calls
+
+
+def test_invalid_cached_reply_is_replaced_by_valid_retry():
+    valid = json.dumps({"translation": "", "summary": "Quiet farm stay", "tags": ["farm", "quiet"]})
+    llm, calls = _wrapper(["not json", valid])
+
+    first = llm.extract_media_text("shant shet")
+    assert first.summary == "Quiet farm stay"
+    assert not first.degraded
+    assert len(calls) == 2
+
+    # The valid retry overwrote the bad entry: no more generations for the same prompt
+    assert llm.extract_media_text("shant shet").tags == ["farm", "quiet"]
+    assert len(calls) == 2
+
+
+def test_unparseable_reply_is_degraded_but_transport_errors_propagate():
+    llm, _ = _wrapper(["nope", "still nope"])
+    result = llm.extract_media_text("raw transcript")
+    assert result.degraded
+    assert result.summary == "raw transcript"
+    assert "degraded" not in json.dumps(result.model_json_schema())
+
+    llm, _ = _wrapper([requests.ConnectionError("ollama down")])
+    with pytest.raises(requests.ConnectionError):
+        llm.extract_media_text("raw transcript")
+
+
+def test_expand_image_tags_reports_degraded_fallback():
+    llm, _ = _wrapper(["[]", "[]"])
+    tags, degraded = llm.expand_image_tags([["warm"], ["cool"], ["warm"]])
+    assert degraded
+    assert tags == [["warm"], ["cool"], ["warm"]]
@@ -0,0 +1,80 @@
+import json
+
+import pika
+import pytest
+
+from services import mq
+
+
+class FakeBroker:
+    """Stands in for pika.BlockingConnection; fails connects and one publish as scripted."""
+
+    def __init__(self, fail_connects=0):
+        self.fail_connects = fail_connects
+        self.fail_at = None  # drop the connection when this many messages have arrived
+        self.received = []
+        self.confirms = False
+
+    def __call__(self, params):
+        if self.fail_connects:
+            self.fail_connects -= 1
+            raise pika.exceptions.AMQPConnectionError("broker down")
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return FakeChannel(self.broker)
+
+    def process_data_events(self, time_limit=None):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeChannel:
+    def __init__(self, broker):
+        self.broker = broker
+
+    def exchange_declare(self, **kwargs):
+        pass
+
+    def confirm_delivery(self):
+        self.broker.confirms = True
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        if self.broker.fail_at == len(self.broker.received):
+            self.broker.fail_at = None
+            raise pika.exceptions.StreamLostError("connection reset")
+        self.broker.received.append((routing_key, json.loads(body)["n"]))
+
+
+def test_unsent_messages_are_requeued_in_order(monkeypatch):
+    # The broker takes the first message, drops the connection on the second,
+    # then comes back: only the unconfirmed tail is resent
+    broker = FakeBroker(fail_connects=1)
+    monkeypatch.setattr(mq.pika, "BlockingConnection", broker)
+    producer = mq.MQProducer(confirm_mode="each", batch_size=10, outbox_max=100)
+    try:
+        assert producer.wait_connected(5)
+        broker.fail_at = 1
+        producer.publish_many("hyperlocal", [("listing.created", {"n": n}) for n in range(3)])
+        assert producer.flush(timeout=5)
+    finally:
+        producer.close()
+
+    assert broker.confirms
+    assert broker.received == [("listing.created", 0), ("listing.created", 1), ("listing.created", 2)]
+    stats = producer.stats()
+    assert stats["published"] == 3 and stats["queued"] == 0
+    assert stats["failed_batches"] == 1 and stats["connections"] == 2
+
+
+def test_unknown_confirm_mode_is_rejected():
+    with pytest.raises(ValueError):
+        mq.MQProducer(confirm_mode="batch")
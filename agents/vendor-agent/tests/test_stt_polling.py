@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from services import stt as stt_module
+from services.stt import AssemblyAISTT, plan_chunks, poll_delays, transcript_waiters
+from services.stt_stub import create_stub_app
+from shared.utils.config import settings
+
+
+def _serve(app):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+@pytest.fixture
+def audio_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("ASSEMBLYAI_API_KEY", "test-key")
+    monkeypatch.setattr(stt_module, "audio_duration", lambda path: 4.0)
+    path = tmp_path / "note.wav"
+    path.write_bytes(b"RIFF0000WAVE")
+    return str(path)
+
+
+def test_poll_delays_scale_with_duration_and_back_off(monkeypatch):
+    monkeypatch.setattr(settings, "STT_POLL_FIRST_FRACTION", 0.25)
+    monkeypatch.setattr(settings, "STT_POLL_MIN_INTERVAL", 1.0)
+    monkeypatch.setattr(settings, "STT_POLL_MAX_INTERVAL", 4.0)
+    monkeypatch.setattr(settings, "STT_POLL_BACKOFF", 2.0)
+    delays = poll_delays(60.0)
+    assert [next(delays) for _ in range(5)] == [4.0, 1.0, 2.0, 4.0, 4.0]
+
+
+def test_adaptive_polling_against_stub(audio_file, monkeypatch):
+    monkeypatch.setattr(settings, "STT_POLL_MIN_INTERVAL", 0.05)
+    monkeypatch.setattr(settings, "STT_POLL_MAX_INTERVAL", 0.2)
+    server, url = _serve(create_stub_app(delay=0.5, text="namaste"))
+    try:
+        stt = AssemblyAISTT(base_url=f"{url}/v2", webhook_url="")
+        assert stt.transcribe(audio_file) == "namaste"
+        stats = stt.http.get(f"{url}/stub/stats", timeout=5).json()
+        # 1s polling would need ~1 poll per second; backoff keeps it to a handful
+        assert stats["poll"] <= 6
+    finally:
+        server.shutdown()
+
+
+def test_webhook_wakes_waiting_transcription(audio_file, monkeypatch):
+    monkeypatch.setattr(settings, "STT_WEBHOOK_FALLBACK_INTERVAL", 30.0)
+    callback = Flask("callback")
+
+    @callback.route("/cb", methods=["POST"])
+    def cb():
+        return jsonify({"waiting": transcript_waiters.notify(request.json["transcript_id"])})
+
+    stub_server, stub_url = _serve(create_stub_app(delay=0.3, text="webhook text"))
+    cb_server, cb_url = _serve(callback)
+    try:
+        stt = AssemblyAISTT(base_url=f"{stub_url}/v2", webhook_url=f"{cb_url}/cb")
+        assert stt.transcribe(audio_file) == "webhook text"
+        # Woken by the callback long before the 30s fallback poll
+        assert stt.http.get(f"{stub_url}/stub/stats", timeout=5).json()["poll"] == 1
+    finally:
+        stub_server.shutdown()
+        cb_server.shutdown()
+
+
+def test_plan_chunks_cuts_in_silences():
+    silences = [(9.0, 9.4), (31.0, 32.0), (50.0, 50.5), (70.0, 71.0)]
+    chunks = plan_chunks(100.0, silences, target=30.0)
+    assert chunks == [(0.0, 31.5), (31.5, 70.5), (70.5, 100.0)]
+
+
+def test_plan_chunks_hard_cuts_without_silence():
+    assert plan_chunks(70.0, [], target=30.0) == [(0.0, 30.0), (30.0, 70.0)]
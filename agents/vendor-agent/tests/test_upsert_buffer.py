@@ -0,0 +1,74 @@
+import time
+
+from services.vector_client import UpsertBuffer
+
+
+class FakeQdrant:
+    def __init__(self, fail_times=0):
+        self.fail_times = fail_times
+        self.calls = []
+
+    def upsert(self, collection_name, vectors, wait=True):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("qdrant down")
+        self.calls.append((collection_name, [p["id"] for p in vectors], wait))
+
+
+def _points(ids):
+    return [{"id": i, "vector": [0.1], "payload": {}} for i in ids]
+
+
+def test_flush_batches_points_per_collection():
+    client = FakeQdrant()
+    buffer = UpsertBuffer(client, batch_size=2, flush_interval=60)
+    buffer.add("listings", _points(["a", "b", "c"]))
+    buffer.add("events", _points(["e"]))
+    buffer.flush()
+    assert client.calls == [
+        ("listings", ["a", "b"], False),
+        ("listings", ["c"], False),
+        ("events", ["e"], False),
+    ]
+
+
+def test_failed_batches_are_retried_then_dropped():
+    dropped = []
+    client = FakeQdrant(fail_times=1)
+    buffer = UpsertBuffer(client, batch_size=10, flush_interval=60, max_attempts=2, retry_backoff=0,
+                          on_drop=lambda col, pts: dropped.append((col, [p["id"] for p in pts])))
+    buffer.add("listings", _points(["a"]))
+    buffer.flush()
+    assert buffer.stats()["retry_queue_points"] == 1
+    buffer.flush()
+    assert client.calls == [("listings", ["a"], False)]
+
+    client.fail_times = 2
+    buffer.add("listings", _points(["b"]))
+    buffer.flush()
+    buffer.flush()
+    assert dropped == [("listings", ["b"])]
+
+
+def test_failed_batches_wait_for_their_backoff():
+    client = FakeQdrant(fail_times=2)
+    buffer = UpsertBuffer(client, batch_size=10, flush_interval=60, max_attempts=5, retry_backoff=60, max_backoff=300)
+    buffer.add("listings", _points(["a"]))
+    buffer.flush()
+    # Still backing off: later flushes leave the batch alone
+    buffer.flush()
+    buffer.flush()
+    assert client.fail_times == 1
+    assert buffer.stats()["retry_queue_points"] == 1
+
+    # Backoff doubles per attempt
+    buffer._failed[0] = buffer._failed[0][:3] + (0,)
+    buffer.flush()
+    assert client.fail_times == 0
+    delay = buffer._failed[0][3] - time.monotonic()
+    assert 100 < delay <= 120
+
+    # close() retries regardless of backoff
+    buffer.close()
+    assert client.calls == [("listings", ["a"], False)]
+    assert buffer.stats()["retry_queue_points"] == 0
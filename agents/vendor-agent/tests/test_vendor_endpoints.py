@@ -7,17 +7,310 @@ def client():
     return app.test_client()
 
 def test_create_listing_basic(client, monkeypatch):
-    # monkeypatch services to avoid calling real whisper/ollama
-    monkeypatch.setattr("services.stt.WhisperCppWrapper.transcribe", lambda self, p: "sample audio transcript")
-    monkeypatch.setattr("services.llm.OllamaWrapper.generate", lambda self, p, model=None: "expanded text")
-    monkeypatch.setattr("services.llm.OllamaWrapper.embed", lambda self, texts: [[0.1]*384])
-    response = client.post("/agent/vendor/create-listing", json={
-        "vendor_id": "v1",
-        "price": 1000,
-        "location": "Pune",
-        "media_files": ["tests/sample.wav"],
-        "raw_tags": ["rice fields"]
-    })
+    import io
+    import json
+    import app as vendor_app
+
+    class FakeSTT:
+        def transcribe(self, path, language=None):
+            return "sample audio transcript"
+
+    # swap in offline stand-ins for the STT backend, Ollama, the embedding model and Mongo/Qdrant/MQ
+    monkeypatch.setattr(vendor_app, "stt", lambda: FakeSTT())
+    monkeypatch.setattr("services.llm.OllamaWrapper.generate", lambda self, p, model=None, **kwargs: "expanded text")
+    monkeypatch.setattr(vendor_app, "embed_document", lambda doc: [0.1]*384)
+    monkeypatch.setattr(vendor_app, "media_cache", None)
+    persisted = []
+    monkeypatch.setattr(vendor_app, "persist_many", lambda objs, collection, embeddings, routing_key, events=None:
+                        persisted.extend(objs) or [{**o, "id": "l1"} for o in objs])
+    response = client.post("/agent/vendor/create-listing", data={
+        "metadata": json.dumps({
+            "vendor_id": "v1",
+            "price": 1000,
+            "location": "Pune",
+            "media_files": [],
+            "raw_tags": ["rice fields"]
+        }),
+        "media_files": (io.BytesIO(b"RIFF0000WAVE"), "sample.wav"),
+    }, content_type="multipart/form-data")
     assert response.status_code == 201
     data = response.json
     assert data["status"] == "ok"
+    assert persisted[0]["vendor_id"] == "v1"
+    assert persisted[0]["media"][0]["kind"] == "audio"
+
+
+def test_app_registers_its_dependencies():
+    from shared.utils import lazy
+    import app as vendor_app
+
+    assert {"stt", "embedding_model", "mq_outbox", "mq"} <= set(lazy._registry)
+    assert lazy._registry["mq"] is vendor_app.mq_broker
+
+
+def test_readiness_and_warmup_report_exact_status(client, monkeypatch):
+    from shared.utils import lazy
+
+    def broker_down():
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(lazy, "_registry", {})
+    lazy.Lazy("stt", lambda: "stt")
+    lazy.Lazy("mq", broker_down)
+    pending = {"ready": False, "init_seconds": None, "error": None}
+
+    response = client.get("/agent/vendor/ready")
+    assert response.status_code == 503
+    assert response.json == {"ready": False, "dependencies": {"stt": pending, "mq": pending}}
+
+    response = client.post("/agent/vendor/warmup")
+    assert response.status_code == 503
+    deps = response.json["dependencies"]
+    assert response.json["ready"] is False
+    assert deps["stt"]["ready"] is True and deps["stt"]["error"] is None
+    assert deps["mq"] == {"ready": False, "init_seconds": None, "error": "ConnectionError: broker down"}
+
+    lazy._registry["mq"]._factory = lambda: "connected"
+    response = client.post("/agent/vendor/warmup")
+    assert response.status_code == 200
+    assert response.json["ready"] is True
+    assert client.get("/agent/vendor/ready").status_code == 200
+
+
+def test_process_media_files_keeps_input_order(monkeypatch):
+    import time
+    import app as vendor_app
+
+    def fake_process(path, source):
+        # Later files finish first to exercise ordering
+        time.sleep(0.01 * (5 - int(path)))
+        return {"media": {"path": path, "kind": "image", "tags": []}, "text": path, "tags": [], "events": []}
+
+    monkeypatch.setattr(vendor_app, "process_media_file", fake_process)
+    files = [(str(i), f"{i}.jpg") for i in range(5)]
+    results = vendor_app.process_media_files(files, max_workers=3)
+    assert [r["text"] for r in results] == ["0", "1", "2", "3", "4"]
+
+
+def test_media_cache_stores_final_tags_and_skips_degraded(monkeypatch):
+    import app as vendor_app
+
+    stored = []
+
+    class FakeStore:
+        def fingerprint(self, path, kind):
+            return {"kind": kind, "sha256": path}
+
+        def lookup(self, fp):
+            return None
+
+        def store(self, fp, result):
+            stored.append((fp["sha256"], result))
+
+    def fake_process(path, source):
+        if path == "broken":
+            return {"media": {"path": path, "kind": "unknown", "tags": []}, "text": "", "tags": [], "events": [],
+                    "error": "decode failed"}
+        return {"media": {"path": path, "kind": "image", "tags": ["warm"]}, "text": "warm", "tags": ["warm"],
+                "events": [], "expand_tags": ["warm"]}
+
+    monkeypatch.setattr(vendor_app, "media_cache", FakeStore())
+    monkeypatch.setattr(vendor_app, "_process_media_file", fake_process)
+    monkeypatch.setattr(vendor_app.llm, "expand_image_tags", lambda tag_lists: ([["sunset", "beach"]] * len(tag_lists), False))
+    vendor_app.process_media_files([("a.jpg", "a.jpg"), ("broken", "b.jpg")], max_workers=1)
+    assert [path for path, _ in stored] == ["a.jpg"]
+    assert stored[0][1]["tags"] == ["sunset", "beach"]
+    assert "expand_tags" not in stored[0][1] and "fingerprint" not in stored[0][1]
+
+    # A degraded expansion (unparseable LLM reply) is not remembered
+    stored.clear()
+    monkeypatch.setattr(vendor_app.llm, "expand_image_tags", lambda tag_lists: (tag_lists, True))
+    vendor_app.process_media_files([("c.jpg", "c.jpg")], max_workers=1)
+    assert stored == []
+
+
+def test_shed_llm_call_on_media_path_returns_503(client, monkeypatch):
+    import io
+    import json
+    import app as vendor_app
+    from shared.utils.llm_scheduler import LLMOverloaded
+
+    class FakeSTT:
+        def transcribe(self, path, language=None):
+            return "sample audio transcript"
+
+    def shed(self, text, translate=False):
+        raise LLMOverloaded("llama3.2: ingestion queue full (256)", retry_after=12)
+
+    monkeypatch.setattr(vendor_app, "stt", lambda: FakeSTT())
+    monkeypatch.setattr(vendor_app, "media_cache", None)
+    monkeypatch.setattr("services.llm.OllamaWrapper.extract_media_text", shed)
+    monkeypatch.setattr(vendor_app, "persist_many", lambda *args, **kwargs: pytest.fail("listing persisted"))
+    response = client.post("/agent/vendor/create-listing", data={
+        "metadata": json.dumps({"vendor_id": "v1", "price": 1000, "location": "Pune", "media_files": []}),
+        "media_files": (io.BytesIO(b"RIFF0000WAVE"), "sample.wav"),
+    }, content_type="multipart/form-data")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "12"
+
+
+def test_bulk_import_media_refs_are_confined(monkeypatch, tmp_path):
+    import app as vendor_app
+
+    root = tmp_path / "import"
+    root.mkdir()
+    (root / "farm.jpg").write_bytes(b"jpg")
+    (tmp_path / "secret.txt").write_text("x")
+    monkeypatch.setattr(vendor_app.settings, "BULK_IMPORT_MEDIA_ROOT", str(root))
+    monkeypatch.setattr(vendor_app.settings, "BULK_IMPORT_ALLOWED_HOSTS", "cdn.example.com")
+    monkeypatch.setattr(vendor_app, "get_http", lambda: pytest.fail("disallowed host fetched"))
+
+    work = tmp_path / "work"
+    work.mkdir()
+    # Local refs are copied into the import's folder; the media root is never written to
+    copy, name = vendor_app._resolve_media("farm.jpg", str(work))
+    assert name == "farm.jpg" and copy.startswith(str(work)) and copy.endswith("_farm.jpg")
+    assert open(copy, "rb").read() == b"jpg"
+    assert [p.name for p in root.iterdir()] == ["farm.jpg"]
+    for ref in ("../secret.txt", str(tmp_path / "secret.txt"), "/etc/passwd"):
+        with pytest.raises(ValueError):
+            vendor_app._resolve_media(ref, str(work))
+    for ref in ("http://169.254.169.254/latest/meta-data", "https://cdn.example.com.evil.io/a.jpg"):
+        with pytest.raises(ValueError):
+            vendor_app._resolve_media(ref, str(work))
+
+    monkeypatch.setattr(vendor_app.settings, "BULK_IMPORT_MEDIA_ROOT", "")
+    with pytest.raises(ValueError):
+        vendor_app._resolve_media("farm.jpg", str(work))
+
+
+def test_bulk_import_reports_rejected_rows_per_row(monkeypatch):
+    import json
+    from pymongo.errors import BulkWriteError
+    import app as vendor_app
+
+    class FakeCollection:
+        def __init__(self):
+            self.inserted = []
+
+        def insert_many(self, docs, ordered=True):
+            assert ordered is False
+            # Unordered insert: the duplicate is rejected, the rows around it still land
+            self.inserted.extend(d["vendor_id"] for d in docs if d["vendor_id"] != "dup")
+            rejected = [{"index": i, "errmsg": "E11000 duplicate key"} for i, d in enumerate(docs) if d["vendor_id"] == "dup"]
+            if rejected:
+                raise BulkWriteError({"writeErrors": rejected})
+
+    class FakeBuffer:
+        def __init__(self):
+            self.ids = []
+
+        def add(self, collection, points):
+            self.ids.extend(p["id"] for p in points)
+
+    class FakeMQ:
+        def __init__(self):
+            self.messages = []
+
+        def publish_many(self, exchange, messages):
+            self.messages.extend(messages)
+
+    listings = FakeCollection()
+    buffer, producer = FakeBuffer(), FakeMQ()
+    monkeypatch.setattr(vendor_app, "db", {"listings": listings})
+    monkeypatch.setattr(vendor_app, "vec_buffer", buffer)
+    monkeypatch.setattr(vendor_app, "mq", lambda: producer)
+
+    def prepare_row(row_no, line, folder):
+        row = json.loads(line)
+        listing = {"id": f"l{row_no}", "vendor_id": row["vendor_id"], "price": 100}
+        return row_no, listing, [0.1], [("image.processed", {"row": row_no})]
+
+    monkeypatch.setattr(vendor_app, "_prepare_row", prepare_row)
+    lines = [json.dumps({"vendor_id": v}) for v in ("v1", "dup", "v3", "v4")]
+    results = list(vendor_app.import_listings(lines, concurrency=2, batch_size=3))
+
+    by_row = {r["row"]: r for r in results if "row" in r}
+    assert [by_row[n]["status"] for n in (1, 2, 3, 4)] == ["ok", "error", "ok", "ok"]
+    assert "duplicate key" in by_row[2]["error"]
+    assert results[-1] == {"done": True, "ok": 3, "errors": 1}
+    assert sorted(listings.inserted) == ["v1", "v3", "v4"]
+    # The rejected row gets neither a vector nor any MQ message
+    assert sorted(buffer.ids) == ["l1", "l3", "l4"]
+    created = [m[1]["id"] for m in producer.messages if m[0] == "listing.created"]
+    processed = [m[1]["row"] for m in producer.messages if m[0] == "image.processed"]
+    assert sorted(created) == ["l1", "l3", "l4"] and sorted(processed) == [1, 3, 4]
+
+
+def test_bulk_import_removes_its_temp_folder(monkeypatch, tmp_path):
+    import json
+    import os
+    import app as vendor_app
+
+    monkeypatch.setattr(vendor_app, "UPLOAD_FOLDER", str(tmp_path))
+    monkeypatch.setattr(vendor_app, "persist_many", lambda objs, *args, **kwargs: list(objs))
+
+    def prepare_row(row_no, line, folder):
+        raw = os.path.join(folder, f"{row_no}_raw.jpg")
+        enhanced = os.path.join(folder, f"{row_no}_enh.jpg")
+        for path in (raw, enhanced):
+            with open(path, "wb") as f:
+                f.write(b"jpg")
+        if json.loads(line)["vendor_id"] == "bad":
+            raise ValueError("media unreadable")
+        return row_no, {"id": f"l{row_no}", "media": [{"path": enhanced, "thumbnails": []}]}, [0.1], []
+
+    monkeypatch.setattr(vendor_app, "_prepare_row", prepare_row)
+    lines = [json.dumps({"vendor_id": v}) for v in ("v1", "bad")]
+    assert list(vendor_app.import_listings(lines, concurrency=1))[-1] == {"done": True, "ok": 1, "errors": 1}
+    # Only the file the persisted listing points at survives
+    assert [p.name for p in (tmp_path / "bulk").rglob("*.jpg")] == ["1_enh.jpg"]
+
+    monkeypatch.setattr(vendor_app, "_prepare_row", lambda *args: pytest.fail("row prepared"))
+    assert list(vendor_app.import_listings([""])) == [{"done": True, "ok": 0, "errors": 0}]
+    assert len(list((tmp_path / "bulk").iterdir())) == 1
+
+def test_update_metadata_syncs_qdrant_payload(client, monkeypatch):
+    import app as vendor_app
+
+    class FakeCollection:
+        def __init__(self):
+            self.flagged = []
+
+        def update_one(self, query, update):
+            return type("UpdateResult", (), {"matched_count": 1})()
+
+        def update_many(self, query, update):
+            self.flagged.extend(query["id"]["$in"])
+
+    class FakeQdrant:
+        def __init__(self, fail=False):
+            self.fail = fail
+            self.calls = []
+
+        def set_payload(self, collection_name, point_id, payload, wait=True):
+            if self.fail:
+                raise ConnectionError("qdrant down")
+            self.calls.append((collection_name, point_id, payload))
+
+    listings = FakeCollection()
+    qdrant = FakeQdrant()
+    published = []
+    monkeypatch.setattr(vendor_app, "db", {"listings": listings})
+    monkeypatch.setattr(vendor_app, "vec", qdrant)
+    monkeypatch.setattr(vendor_app, "mq", lambda: type("MQ", (), {"publish": lambda self, *args: published.append(args)})())
+
+    update = {"price": 1200, "tags": ["farm"], "description": "Now with breakfast"}
+    response = client.post("/agent/vendor/update-metadata", json={"collection": "listings", "id": "l1", "update": update})
+    assert response.status_code == 200
+    # Only the fields Qdrant keeps for filtering are copied to the point
+    assert qdrant.calls == [(vendor_app.VECTOR_COLLECTIONS["listings"], "l1", {"price": 1200, "tags": ["farm"]})]
+    assert published[0][1] == "metadata.updated"
+
+    client.post("/agent/vendor/update-metadata", json={"collection": "listings", "id": "l1", "update": {"description": "x"}})
+    assert len(qdrant.calls) == 1
+
+    monkeypatch.setattr(vendor_app, "vec", FakeQdrant(fail=True))
+    response = client.post("/agent/vendor/update-metadata", json={"collection": "listings", "id": "l1", "update": {"price": 900}})
+    assert response.status_code == 200
+    assert listings.flagged == ["l1"]
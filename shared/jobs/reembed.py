@@ -0,0 +1,109 @@
+"""
+Re-embed listings/events from Mongo into the registry vector collections.
+
+Streams each Mongo collection in batches, embeds them with the registry model
+(shared/utils/vector_registry.py) and upserts the vectors into the matching
+Qdrant collection. Use it after changing the embedding model, to migrate data
+written to the old vendor_listings_vectors/agency_events_vectors collections,
+or to index documents left with vector_status "pending"/"failed".
+
+Vectors are stored with the slim search payload and, for new collections,
+the QDRANT_PROFILE settings (quantization, on-disk storage, HNSW params);
+--apply-profile pushes the profile onto existing collections instead.
+
+Usage: python -m shared.jobs.reembed [--source listings] [--batch-size 64] [--only-missing] [--recreate]
+       [--apply-profile]
+"""
+import argparse
+import sys
+import time
+
+from shared.utils.config import settings
+from shared.utils.http import get_http
+from shared.utils.mongo_client import db
+from shared.utils.vector_registry import (
+    EMBED_DIM, EMBED_MODEL, PAYLOAD_INDEXES, VECTOR_COLLECTIONS, check_collection_size, collection_config,
+    embed_documents, slim_payload, verify_embedding_model,
+)
+
+
+def ensure_collection(name: str, recreate: bool = False, apply_profile: bool = False):
+    """Create the Qdrant collection (profile + payload indexes) for the registry dimension."""
+    http = get_http()
+    url = f"{settings.QDRANT_URL.rstrip('/')}/collections/{name}"
+    config = collection_config()
+    resp = http.get(url, timeout=10)
+    if resp.status_code == 200:
+        if not recreate:
+            size = resp.json()["result"]["config"]["params"]["vectors"]["size"]
+            check_collection_size(name, size)
+            if apply_profile:
+                # Qdrant rebuilds indexes/quantization in the background after the update
+                update = {k: config[k] for k in ("hnsw_config", "quantization_config") if k in config}
+                update["vectors"] = {"": {"on_disk": config["vectors"].get("on_disk", False)}}
+                update["params"] = {"on_disk_payload": config.get("on_disk_payload", False)}
+                http.patch(url, json=update, timeout=60).raise_for_status()
+                print(f"[Reembed] Applied profile {settings.QDRANT_PROFILE} to {name}")
+            return
+        http.delete(url, timeout=30).raise_for_status()
+        print(f"[Reembed] Dropped collection {name}")
+    http.put(url, json=config, timeout=30).raise_for_status()
+    for field, schema in PAYLOAD_INDEXES.items():
+        http.put(f"{url}/index", json={"field_name": field, "field_schema": schema}, timeout=30).raise_for_status()
+    print(f"[Reembed] Created collection {name} ({EMBED_DIM} dims, profile {settings.QDRANT_PROFILE})")
+
+
+def upsert_points(name: str, points: list):
+    url = f"{settings.QDRANT_URL.rstrip('/')}/collections/{name}/points?wait=true"
+    get_http().put(url, json={"points": points}, timeout=60).raise_for_status()
+
+
+def reembed(source: str, batch_size: int, only_missing: bool = False) -> int:
+    """Embed and upsert every document of a Mongo collection; returns the number indexed."""
+    target = VECTOR_COLLECTIONS[source]
+    query = {"vector_status": {"$in": ["pending", "failed"]}} if only_missing else {}
+    cursor = db[source].find(query, {"_id": 0}).batch_size(batch_size)
+    done = 0
+    started = time.monotonic()
+    batch = []
+
+    def flush():
+        nonlocal done
+        vectors = embed_documents(batch)
+        upsert_points(target, [{"id": d["id"], "vector": v, "payload": slim_payload(d)} for d, v in zip(batch, vectors)])
+        db[source].update_many({"id": {"$in": [d["id"] for d in batch]}}, {"$unset": {"vector_status": ""}})
+        done += len(batch)
+        batch.clear()
+        print(f"[Reembed] {source} -> {target}: {done} documents ({done / (time.monotonic() - started):.1f}/s)", flush=True)
+
+    for doc in cursor:
+        if doc.get("id"):
+            batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return done
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Re-embed Mongo listings/events into the registry vector collections")
+    parser.add_argument("--source", choices=sorted(VECTOR_COLLECTIONS), action="append",
+                        help="Mongo collection to re-embed (repeatable; default: all)")
+    parser.add_argument("--batch-size", type=int, default=settings.REEMBED_BATCH_SIZE)
+    parser.add_argument("--only-missing", action="store_true", help="only documents with vector_status pending/failed")
+    parser.add_argument("--recreate", action="store_true", help="drop and recreate the target collections first")
+    parser.add_argument("--apply-profile", action="store_true", help="update existing collections to QDRANT_PROFILE")
+    args = parser.parse_args(argv)
+
+    verify_embedding_model()
+    print(f"[Reembed] Model {EMBED_MODEL} ({EMBED_DIM} dims)")
+    for source in args.source or sorted(VECTOR_COLLECTIONS):
+        ensure_collection(VECTOR_COLLECTIONS[source], recreate=args.recreate, apply_profile=args.apply_profile)
+        count = reembed(source, args.batch_size, args.only_missing)
+        print(f"[Reembed] {source}: {count} documents indexed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
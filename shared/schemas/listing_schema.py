@@ -8,6 +8,7 @@ class MediaItem(BaseModel):
     path: str
     kind: str  # 'audio'/'image'/'video'
     tags: Optional[List[str]] = []
+    thumbnails: Optional[List[str]] = []
 
 class ListingBase(BaseModel):
     id: Optional[str] = None
@@ -0,0 +1,73 @@
+import sys
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from shared.utils.embeddings import EmbeddingService, SentenceTransformerBackend
+
+
+class FakeBackend:
+    model = "fake"
+
+    def __init__(self, fail=None):
+        self.calls = []
+        self.fail = fail  # callable(texts) returning an exception to raise, or vectors to return instead
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        if self.fail:
+            outcome, self.fail = self.fail(texts), None
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return [[float(len(t))] for t in texts]
+
+
+def test_embedding_service_batches_concurrent_calls():
+    backend = FakeBackend()
+    service = EmbeddingService(backend, max_batch_size=8, max_wait_ms=50)
+    results = {}
+
+    def worker(text):
+        results[text] = service.embed(text, timeout=5)
+
+    threads = [threading.Thread(target=worker, args=("q" * n,)) for n in range(1, 7)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {"q" * n: [float(n)] for n in range(1, 7)}
+    assert len(backend.calls) < 6
+    assert sum(len(c) for c in backend.calls) == 6
+
+
+@pytest.mark.parametrize("fail", [
+    lambda texts: RuntimeError("model crashed"),
+    lambda texts: [],  # backend returned fewer vectors than texts
+])
+def test_failed_batch_fails_its_callers_and_worker_keeps_running(fail):
+    service = EmbeddingService(FakeBackend(fail=fail), max_wait_ms=1)
+    with pytest.raises(Exception):
+        service.embed("farm", timeout=5)
+    assert service.embed("farm", timeout=5) == [4.0]
+    assert service._worker.is_alive()
+
+
+def test_cancelled_requests_are_skipped():
+    backend = FakeBackend()
+    service = EmbeddingService(backend, max_wait_ms=20)
+    cancelled = Future()
+    cancelled.cancel()
+    service._queue.put(("gone", cancelled))
+    assert service.embed("farm", timeout=5) == [4.0]
+    assert backend.calls == [["farm"]]
+
+
+def test_onnx_runtime_reports_missing_optional_extra(monkeypatch):
+    # onnxruntime/optimum come from requirements-onnx.txt, not the base requirements
+    monkeypatch.setitem(sys.modules, "onnxruntime", None)
+    backend = SentenceTransformerBackend(runtime="onnx-int8")
+    with pytest.raises(ImportError, match="requirements-onnx.txt"):
+        backend.encode(["farm stay"])
@@ -0,0 +1,122 @@
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from shared.utils.http import HttpClient, parse_pool_sizes
+
+
+class FakeAdapter(BaseAdapter):
+    """Replays scripted outcomes: a status code, (status, headers), or an exception to raise."""
+
+    def __init__(self, outcomes):
+        super().__init__()
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def send(self, request, **kwargs):
+        self.calls.append((request.method, request.url))
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers.update(headers)
+        resp._content = b"{}"
+        resp._content_consumed = True
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def _client(outcomes, url="http://ollama:11434", **kwargs):
+    client = HttpClient(backoff=0.001, **kwargs)
+    adapter = FakeAdapter(outcomes)
+    client.session_for(url).mount("http://", adapter)
+    return client, adapter
+
+
+def test_one_session_per_host():
+    client = HttpClient(pool_sizes=parse_pool_sizes("qdrant:6333=20, bad, ollama=x"))
+    a = client.session_for("http://qdrant:6333/collections")
+    assert client.session_for("http://QDRANT:6333/points") is a
+    assert client.session_for("http://ollama:11434/api/generate") is not a
+    assert client.session_for("https://qdrant:6333/collections") is not a
+    assert client._pool_size_for("qdrant:6333", "qdrant") == 20
+    assert client._pool_size_for("ollama:11434", "ollama") == client.pool_size
+
+
+def test_retries_retryable_statuses_then_returns_last_response():
+    client, adapter = _client([503, 429, 200], retries=2)
+    assert client.get("http://ollama:11434/api/tags").status_code == 200
+    assert len(adapter.calls) == 3
+
+    client, adapter = _client([502], retries=2)
+    assert client.get("http://ollama:11434/api/tags").status_code == 502
+    assert len(adapter.calls) == 3
+
+    client, adapter = _client([404], retries=2)
+    assert client.get("http://ollama:11434/api/tags").status_code == 404
+    assert len(adapter.calls) == 1
+
+
+def test_post_is_not_resent_after_read_timeout():
+    client, adapter = _client([requests.ReadTimeout("slow"), 200], retries=2)
+    with pytest.raises(requests.ReadTimeout):
+        client.post("http://ollama:11434/api/generate", json={})
+    assert len(adapter.calls) == 1
+
+    # Never reached the server: safe to resend
+    client, adapter = _client([requests.ConnectTimeout("refused"), 200], retries=2)
+    assert client.post("http://ollama:11434/api/generate", json={}).status_code == 200
+    assert len(adapter.calls) == 2
+
+    client, adapter = _client([requests.ReadTimeout("slow"), 200], retries=2)
+    assert client.get("http://ollama:11434/api/tags").status_code == 200
+    assert len(adapter.calls) == 2
+
+
+def test_post_is_resent_only_when_the_server_did_not_process_it():
+    refused = requests.ConnectionError(MaxRetryError(None, "/api/generate", NewConnectionError(None, "refused")))
+    client, adapter = _client([refused, 200], retries=2)
+    assert client.post("http://ollama:11434/api/generate", json={}).status_code == 200
+    assert len(adapter.calls) == 2
+
+    # Dropped after sending: the server may already have the request
+    dropped = requests.ConnectionError(ProtocolError("Connection aborted."))
+    client, adapter = _client([dropped, 200], retries=2)
+    with pytest.raises(requests.ConnectionError):
+        client.post("http://ollama:11434/api/generate", json={})
+    assert len(adapter.calls) == 1
+
+    for status in (502, 504, 503):
+        client, adapter = _client([status, 200], retries=2)
+        assert client.post("http://ollama:11434/api/generate", json={}).status_code == status
+        assert len(adapter.calls) == 1
+
+    for status in (429, 503):
+        client, adapter = _client([(status, {"Retry-After": "0"}), 200], retries=2)
+        assert client.post("http://ollama:11434/api/generate", json={}).status_code == 200
+        assert len(adapter.calls) == 2
+
+    # Callers can declare a POST safe to resend (reads, overwrites)
+    client, adapter = _client([502, 200], retries=2)
+    assert client.post("http://ollama:11434/api/embed", json={}, idempotent=True).status_code == 200
+    assert len(adapter.calls) == 2
+
+
+def test_budget_bounds_retries():
+    client, adapter = _client([503], retries=5)
+    client.backoff = 10
+    started = time.monotonic()
+    resp = client.get("http://ollama:11434/api/tags", budget=0.5)
+    assert resp.status_code == 503
+    assert len(adapter.calls) == 1
+    assert time.monotonic() - started < 1
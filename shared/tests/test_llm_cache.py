@@ -0,0 +1,138 @@
+import datetime
+import sys
+import types
+
+from shared.utils.llm_cache import DiskTier, LLMCache, MongoTier, make_key
+from shared.utils.lru import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used_and_counts():
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (3, 1, 1, 2)
+
+
+def test_lru_ttl_expiry(monkeypatch):
+    from shared.utils import lru
+
+    clock = FakeClock()
+    monkeypatch.setattr(lru.time, "monotonic", clock)
+    cache = LRUCache(max_entries=4, ttl=10)
+    cache.set("k", "v")
+    clock.now += 9
+    assert cache.get("k") == "v"
+    clock.now += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_get_or_generate_hits_and_misses():
+    cache = LLMCache(max_entries=8)
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "answer"
+
+    key = make_key("llama3.2", "prompt")
+    assert cache.get_or_generate(key, generate) == "answer"
+    assert cache.get_or_generate(key, generate) == "answer"
+    assert len(calls) == 1
+    assert make_key("llama3.2", "prompt", "json") != key
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_disk_tier_roundtrip_expiry_and_prune(tmp_path, monkeypatch):
+    from shared.utils import llm_cache
+
+    tier = DiskTier(str(tmp_path), ttl=60, max_entries=2)
+    tier.set("ab01", "one")
+    assert tier.get("ab01") == "one"
+    assert tier.get("ab02") is None
+
+    # Persistent hits are promoted into memory
+    cache = LLMCache(max_entries=8, persistent=tier)
+    assert cache.get("ab01") == "one"
+    assert cache.memory.get("ab01") == "one"
+    assert cache.stats()["persistent_hits"] == 1
+
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+    assert tier.get("ab01") is None
+    assert not list(tmp_path.rglob("ab01.json"))
+    monkeypatch.undo()
+
+    for i in range(4):
+        tier.set(f"cd{i:02d}", str(i))
+    tier.prune()
+    assert len(list(tmp_path.rglob("*.json"))) == 2
+
+
+class FakeCursor(list):
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self, key=lambda d: d[field], reverse=direction < 0))
+
+    def limit(self, n):
+        return FakeCursor(self[:n])
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+        self.indexes = []
+
+    def create_index(self, field, **kwargs):
+        self.indexes.append(field)
+
+    def find_one(self, query, projection=None):
+        return self.docs.get(query["key"])
+
+    def replace_one(self, query, doc, upsert=False):
+        self.docs[query["key"]] = {"_id": query["key"], **doc}
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs.values())
+
+    def delete_many(self, query):
+        for _id in query["_id"]["$in"]:
+            self.docs.pop(_id, None)
+
+
+def test_mongo_tier_expiry_and_trim(monkeypatch):
+    col = FakeCollection()
+    monkeypatch.setitem(sys.modules, "shared.utils.mongo_client", types.SimpleNamespace(db={"llm_cache": col}))
+    tier = MongoTier("llm_cache", ttl=60, max_entries=2)
+    assert {"key", "expires_at", "created_at"} <= set(col.indexes)
+
+    tier.set("k1", "v1")
+    assert tier.get("k1") == "v1"
+    assert tier.get("missing") is None
+
+    # Expired entries are ignored on read even before Mongo's TTL monitor removes them
+    col.docs["k1"]["expires_at"] = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    assert tier.get("k1") is None
+
+    for i in range(4):
+        tier.set(f"t{i}", str(i))
+        col.docs[f"t{i}"]["created_at"] = datetime.datetime(2024, 1, 1 + i)
+    tier.trim()
+    # k1 was written "now", so it outlives the 2024 entries
+    assert set(col.docs) == {"k1", "t3"}
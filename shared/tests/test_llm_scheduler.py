@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from shared.utils.llm_scheduler import LLMOverloaded, LLMScheduler
+
+
+def _hold(scheduler, release: threading.Event, priority="ingestion"):
+    with scheduler.slot("m", priority):
+        release.wait(5)
+
+
+def test_interactive_served_before_queued_ingestion():
+    scheduler = LLMScheduler(default_limit=1)
+    release = threading.Event()
+    holder = threading.Thread(target=_hold, args=(scheduler, release))
+    holder.start()
+    while scheduler.gate("m").active == 0:
+        time.sleep(0.01)
+
+    order = []
+    def run(name, priority):
+        scheduler.run("m", lambda: order.append(name), priority=priority)
+    waiters = [threading.Thread(target=run, args=("ingestion", "ingestion"))]
+    waiters[0].start()
+    time.sleep(0.05)
+    waiters.append(threading.Thread(target=run, args=("interactive", "interactive")))
+    waiters[1].start()
+    time.sleep(0.05)
+
+    release.set()
+    for t in [holder] + waiters:
+        t.join(5)
+    assert order == ["interactive", "ingestion"]
+    stats = scheduler.stats()["m"]["classes"]
+    assert stats["interactive"]["completed"] == 1
+    assert stats["ingestion"]["completed"] == 2
+
+
+def test_sheds_when_queue_full_or_deadline_passes():
+    scheduler = LLMScheduler(default_limit=1, max_queue={"interactive": 0, "ingestion": 1})
+    release = threading.Event()
+    holder = threading.Thread(target=_hold, args=(scheduler, release))
+    holder.start()
+    while scheduler.gate("m").active == 0:
+        time.sleep(0.01)
+
+    with pytest.raises(LLMOverloaded):
+        scheduler.run("m", lambda: None, priority="interactive")
+
+    started = time.monotonic()
+    with pytest.raises(LLMOverloaded):
+        scheduler.run("m", lambda: None, priority="ingestion", timeout=0.1)
+    assert time.monotonic() - started < 1
+
+    release.set()
+    holder.join(5)
+    assert scheduler.run("m", lambda: "ok", priority="interactive") == "ok"
+    stats = scheduler.stats()["m"]["classes"]
+    assert stats["interactive"]["shed"] == 1
+    assert stats["ingestion"]["timed_out"] == 1
+    assert stats["ingestion"]["queued"] == 0
+
+
+def test_async_waiters_share_the_gate_with_threads():
+    import asyncio
+
+    scheduler = LLMScheduler(default_limit=1)
+    release = threading.Event()
+    holder = threading.Thread(target=_hold, args=(scheduler, release))
+    holder.start()
+    while scheduler.gate("m").active == 0:
+        time.sleep(0.01)
+
+    async def main():
+        async def call(n):
+            async with scheduler.aslot("m", "interactive"):
+                await asyncio.sleep(0.01)
+                return n
+        tasks = [asyncio.create_task(call(n)) for n in range(3)]
+        await asyncio.sleep(0.05)
+        assert not any(t.done() for t in tasks)
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [0, 1, 2]
+    holder.join(5)
+    gate = scheduler.stats()["m"]
+    assert gate["active"] == 0
+    assert gate["classes"]["interactive"]["completed"] == 3
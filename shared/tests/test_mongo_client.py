@@ -0,0 +1,17 @@
+import asyncio
+
+from pymongo import AsyncMongoClient
+
+from shared.utils.config import settings
+from shared.utils.mongo_client import connect_async
+
+
+def test_connect_async_uses_pymongo_async_client():
+    async def run():
+        handle = connect_async("mongodb://localhost:27017")
+        try:
+            return type(handle.client), handle.name
+        finally:
+            await handle.client.close()
+
+    assert asyncio.run(run()) == (AsyncMongoClient, settings.DB_NAME)
@@ -0,0 +1,57 @@
+from shared.jobs import reembed
+
+
+class FakeCursor(list):
+    def batch_size(self, n):
+        return self
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+        self.cleared = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        wanted = query.get("vector_status", {}).get("$in")
+        return FakeCursor(dict(d) for d in self.docs if wanted is None or d.get("vector_status") in wanted)
+
+    def update_many(self, query, update):
+        assert update == {"$unset": {"vector_status": ""}}
+        self.cleared.extend(query["id"]["$in"])
+
+
+def _run(monkeypatch, docs, **kwargs):
+    listings = FakeCollection(docs)
+    upserts = []
+    monkeypatch.setattr(reembed, "db", {"listings": listings})
+    monkeypatch.setattr(reembed, "embed_documents", lambda batch: [[0.1]] * len(batch))
+    monkeypatch.setattr(reembed, "upsert_points", lambda name, points: upserts.append([p["id"] for p in points]))
+    count = reembed.reembed("listings", batch_size=2, **kwargs)
+    return count, listings, upserts
+
+
+DOCS = [
+    {"id": "a", "title": "Indexed"},
+    {"id": "b", "vector_status": "pending"},
+    {"id": "c", "vector_status": "failed"},
+    {"vector_status": "failed"},
+    {"id": "d", "vector_status": "failed"},
+]
+
+
+def test_only_missing_selects_pending_and_failed(monkeypatch):
+    count, listings, upserts = _run(monkeypatch, DOCS, only_missing=True)
+    assert listings.queries == [{"vector_status": {"$in": ["pending", "failed"]}}]
+    # Documents without an id are skipped; the rest go out in batch_size batches
+    assert upserts == [["b", "c"], ["d"]]
+    assert count == 3
+    assert listings.cleared == ["b", "c", "d"]
+
+
+def test_full_run_reindexes_everything(monkeypatch):
+    count, listings, upserts = _run(monkeypatch, DOCS)
+    assert listings.queries == [{}]
+    assert upserts == [["a", "b"], ["c", "d"]]
+    assert count == 4
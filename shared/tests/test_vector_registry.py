@@ -0,0 +1,65 @@
+import pytest
+
+from shared.utils.vector_registry import build_payload_filter, matches_payload_filter
+
+
+def test_empty_values_are_ignored():
+    assert build_payload_filter(None) is None
+    assert build_payload_filter({"location": "", "tags": [], "vendor_id": None}) is None
+    assert build_payload_filter({"location": "", "vendor_id": ["v1", "v2"]}) == {"must": [
+        {"key": "vendor_id", "match": {"any": ["v1", "v2"]}},
+    ]}
+
+
+def test_price_bounds_merge_into_one_range():
+    f = build_payload_filter({"price_min": "500", "price": {"max": 2000, "gt": 100}})
+    assert f == {"must": [{"key": "price", "range": {"gte": 500.0, "lte": 2000.0, "gt": 100.0}}]}
+
+
+@pytest.mark.parametrize("filters", [
+    {"price": 500},
+    {"price": {"between": [1, 2]}},
+    {"price": {"gte": "cheap"}},
+    {"price_max": "a lot"},
+    {"colour": "red"},
+])
+def test_malformed_filters_raise(filters):
+    with pytest.raises(ValueError):
+        build_payload_filter(filters)
+
+
+def test_match_conditions():
+    f = build_payload_filter({"tags": ["farm", "trek"], "location": "Pune"})
+    assert matches_payload_filter({"tags": ["lake", "trek"], "location": "Pune"}, f)
+    assert not matches_payload_filter({"tags": ["lake"], "location": "Pune"}, f)
+    # A missing field never matches, and scalar payloads match like one-element lists
+    assert not matches_payload_filter({"tags": ["farm"]}, f)
+    assert matches_payload_filter({"tags": "farm", "location": "Pune"}, f)
+    assert matches_payload_filter({"anything": 1}, None)
+
+
+def test_range_conditions():
+    inclusive = build_payload_filter({"price": {"gte": 500, "lte": 1000}})
+    exclusive = build_payload_filter({"price": {"gt": 500, "lt": 1000}})
+    for price, inside in ((500, True), (1000, True), (499.99, False)):
+        assert matches_payload_filter({"price": price}, inclusive) is inside
+    assert not matches_payload_filter({"price": 500}, exclusive)
+    assert not matches_payload_filter({"price": 1000}, exclusive)
+    assert matches_payload_filter({"price": "750"}, exclusive)
+    # Missing or non-numeric prices are filtered out rather than raising
+    assert not matches_payload_filter({}, inclusive)
+    assert not matches_payload_filter({"price": "on request"}, inclusive)
+
+
+def test_payload_filter_translation():
+    f = build_payload_filter({"location": "Pune", "tags": ["farm", "trek"], "price": {"min": 500, "lte": 2000}})
+    assert f == {"must": [
+        {"key": "location", "match": {"value": "Pune"}},
+        {"key": "tags", "match": {"any": ["farm", "trek"]}},
+        {"key": "price", "range": {"gte": 500.0, "lte": 2000.0}},
+    ]}
+    assert build_payload_filter({}) is None
+    assert matches_payload_filter({"location": "Pune", "tags": ["farm"], "price": 900}, f)
+    assert not matches_payload_filter({"location": "Pune", "tags": ["farm"], "price": 2500}, f)
+    with pytest.raises(ValueError):
+        build_payload_filter({"colour": "red"})
@@ -9,6 +9,121 @@ class Settings(BaseSettings):
     OLLAMA_URL: str = "http://host.docker.internal:11434"
     WHISPER_BIN: str = "/usr/local/bin/whisper"
     DB_NAME: str = "hyperlocal"
+    # Embedding model and vector collections shared by both agents (shared/utils/vector_registry.py)
+    EMBED_BACKEND: str = "sentence-transformers"  # or "ollama"
+    EMBED_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBED_DIM: int = 384
+    # Inference runtime for sentence-transformers models: "torch", "int8" (dynamic quantization),
+    # "onnx" or "onnx-int8" (ONNX Runtime, needs agents/traveler-agent/requirements-onnx.txt);
+    # check with agents/traveler-agent/scripts/embedding_accuracy.py
+    EMBED_RUNTIME: str = "torch"
+    EMBED_ONNX_FILE: str = ""  # ONNX file inside the model repo, e.g. "onnx/model_qint8_avx512.onnx"
+    LISTINGS_VECTOR_COLLECTION: str = "travel_listings"
+    EVENTS_VECTOR_COLLECTION: str = "events"
+    # Qdrant collection profile applied when a collection is created: "default" (all in RAM),
+    # "disk" (vectors + payload on disk), "scalar" (int8 quantized, originals on disk) or "product" (PQ x16)
+    QDRANT_PROFILE: str = "default"
+    QDRANT_HNSW_M: int = 0  # 0 = profile/Qdrant default
+    QDRANT_HNSW_EF_CONSTRUCT: int = 0  # 0 = profile/Qdrant default
+    QDRANT_RESCORE_OVERSAMPLING: float = 2.0  # quantized profiles: candidates re-scored with full vectors
+    REEMBED_BATCH_SIZE: int = 64
+    # Initialize models/clients in the background when the agent starts (they otherwise load on first use)
+    WARMUP_ON_START: bool = True
+    # Upper bound on media files processed concurrently for one listing request
+    MEDIA_MAX_CONCURRENCY: int = 4
+    # Background workers running async (job-based) listing/event ingestion
+    INGEST_WORKERS: int = 2
+    # Vendor image pipeline (services/image_service.py)
+    IMAGE_WORKERS: int = -1  # enhancement processes; -1 = one per CPU, 0 = inline on the calling thread
+    IMAGE_MAX_SIDE: int = 2048  # long side of the decoded/enhanced image
+    IMAGE_THUMB_SIZES: str = "640,320"  # thumbnail widths
+    IMAGE_JPEG_QUALITY: int = 85
+    IMAGE_STATS_SIZE: int = 64  # long side of the copy colour stats are computed on
+    # Media fingerprint store (services/media_cache.py): reuse results for re-uploaded files
+    MEDIA_CACHE_ENABLED: bool = True
+    MEDIA_CACHE_MAX_ENTRIES: int = 50000
+    MEDIA_CACHE_TTL_DAYS: int = 90  # since last reuse
+    MEDIA_DEDUP_MAX_DISTANCE: int = 6  # max pHash Hamming distance for a near-duplicate image
+    # Send pydantic JSON schemas as Ollama's `format` (structured outputs, Ollama >= 0.5); off = plain JSON mode
+    LLM_JSON_SCHEMA: bool = True
+    # LLM scheduler (shared/utils/llm_scheduler.py): per-model concurrency, interactive before ingestion
+    LLM_MAX_CONCURRENCY: int = 2  # generations in flight per model, per agent process
+    LLM_MODEL_CONCURRENCY: str = ""  # per-model overrides, e.g. "llama3.2=2,llama3.1:70b=1"
+    LLM_QUEUE_MAX_INTERACTIVE: int = 32  # waiting requests per class before new ones are shed
+    LLM_QUEUE_MAX_INGESTION: int = 256
+    LLM_INTERACTIVE_DEADLINE: float = 30.0  # seconds a request may wait for a slot
+    LLM_INGESTION_DEADLINE: float = 600.0
+    # LLM response cache (shared/utils/llm_cache.py)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_TTL: int = 86400  # seconds, 0 disables expiry
+    LLM_CACHE_BACKEND: str = ""  # "", "disk" or "mongo"
+    LLM_CACHE_DIR: str = "/tmp/llm_cache"
+    LLM_CACHE_PERSISTENT_MAX_ENTRIES: int = 100000
+    # Embedding micro-batching (shared/utils/embeddings.py)
+    EMBED_MAX_BATCH_SIZE: int = 32
+    EMBED_MAX_WAIT_MS: float = 5.0
+    # Traveler query-embedding cache entries (384 float32 = 1.5 KB each)
+    QUERY_EMBED_CACHE_SIZE: int = 10000
+    # Pooled outbound HTTP (shared/utils/http.py)
+    HTTP_POOL_SIZE: int = 10
+    HTTP_POOL_SIZES: str = ""  # per-host overrides, e.g. "api.assemblyai.com=4,qdrant:6333=20"
+    HTTP_RETRIES: int = 2
+    HTTP_BACKOFF: float = 0.3  # seconds, doubled per retry
+    HTTP_BUDGET: float = 0  # seconds across all attempts of one request, 0 = no budget
+    # AssemblyAI STT completion: adaptive polling and optional webhook
+    ASSEMBLYAI_BASE_URL: str = "https://api.assemblyai.com/v2"
+    STT_TIMEOUT: float = 600
+    STT_POLL_FIRST_FRACTION: float = 0.25  # first poll after this fraction of the audio duration
+    STT_POLL_MIN_INTERVAL: float = 1.0
+    STT_POLL_MAX_INTERVAL: float = 15.0
+    STT_POLL_BACKOFF: float = 1.5
+    STT_WEBHOOK_URL: str = ""  # e.g. "http://vendor-agent:8001/agent/vendor/stt-callback"
+    STT_WEBHOOK_SECRET: str = ""
+    STT_WEBHOOK_FALLBACK_INTERVAL: float = 30.0
+    # STT backend: "assemblyai" (remote) or "whisper" (local WHISPER_BIN)
+    STT_BACKEND: str = "assemblyai"
+    WHISPER_MODEL: str = "small"
+    WHISPER_WORKERS: int = 0  # parallel whisper processes, 0 = one per CPU core
+    WHISPER_CHUNK_SECONDS: float = 30.0
+    WHISPER_SILENCE_DB: float = -30.0
+    WHISPER_SILENCE_MIN: float = 0.4  # shortest pause (seconds) treated as a cut point
+    # Write-behind Qdrant upserts (vendor services/vector_client.py)
+    QDRANT_UPSERT_BATCH_SIZE: int = 64
+    QDRANT_FLUSH_INTERVAL: float = 1.0  # seconds
+    QDRANT_UPSERT_WAIT: bool = False  # wait=true makes each batch block until indexed
+    QDRANT_UPSERT_MAX_ATTEMPTS: int = 8  # with the backoff below, ~2 minutes of outage before points are dropped
+    QDRANT_RETRY_BACKOFF: float = 1.0  # seconds before the first retry of a failed batch, doubled per attempt
+    QDRANT_RETRY_MAX_BACKOFF: float = 60.0
+    # Bulk listing import (vendor /agent/vendor/bulk-import and bulk_import.py)
+    BULK_IMPORT_CONCURRENCY: int = 4
+    BULK_IMPORT_BATCH_SIZE: int = 50
+    # Media references in imported rows: local paths must resolve inside BULK_IMPORT_MEDIA_ROOT and URLs
+    # must point at a BULK_IMPORT_ALLOWED_HOSTS host ("" disables that kind of reference)
+    BULK_IMPORT_MEDIA_ROOT: str = ""
+    BULK_IMPORT_ALLOWED_HOSTS: str = ""  # e.g. "cdn.example.com,media.example.org"
+    BULK_IMPORT_MAX_DOWNLOAD_MB: float = 50
+    # Vendor MQ producer outbox (services/mq.py)
+    MQ_CONFIRM_MODE: str = "each"  # "each" (publisher confirms) or "none" (fire-and-forget)
+    MQ_BATCH_SIZE: int = 100
+    MQ_OUTBOX_MAX: int = 10000
+    MQ_MAX_BACKOFF: float = 30.0  # seconds between reconnect attempts
+    MQ_CONNECT_TIMEOUT: float = 5.0  # readiness: seconds to wait for the first broker connection
+    # Traveler MQ consumer and search-side cache
+    MQ_PREFETCH: int = 16
+    MQ_CONSUMER_WORKERS: int = 4
+    MQ_RECONNECT_DELAY: float = 5.0
+    SEARCH_CACHE_MAX_ITEMS: int = 5000  # per kind (listings / events)
+    # Traveler tiered reranker (services/reranker.py)
+    RERANK_ALPHA: float = 0.5  # weight of BM25 vs vector score in the fast stage
+    RERANK_AMBIGUITY_MARGIN: float = 0.05  # fused-score gap below which "auto" asks the LLM
+    RERANK_LLM_AUTO: bool = True
+    RERANK_CACHE_SIZE: int = 5000
+    RERANK_CACHE_TTL: int = 3600  # seconds
+    # Traveler hybrid retrieval (services/lexical_index.py)
+    HYBRID_CANDIDATES: int = 20  # candidates taken from each retriever before fusion
+    RRF_K: int = 60  # reciprocal-rank fusion constant
+    LEXICAL_BOOTSTRAP: bool = True  # load existing listings/events from Mongo at startup
 
     class Config:
         env_file = ".env"
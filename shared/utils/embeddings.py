@@ -1,23 +1,199 @@
-import pytest
-from app import app
-
-@pytest.fixture
-def client():
-    app.testing = True
-    return app.test_client()
-
-def test_create_listing_basic(client, monkeypatch):
-    # monkeypatch services to avoid calling real whisper/ollama
-    monkeypatch.setattr("services.stt.WhisperCppWrapper.transcribe", lambda self, p: "sample audio transcript")
-    monkeypatch.setattr("services.llm.OllamaWrapper.generate", lambda self, p, model=None: "expanded text")
-    monkeypatch.setattr("services.llm.OllamaWrapper.embed", lambda self, texts: [[0.1]*384])
-    response = client.post("/agent/vendor/create-listing", json={
-        "vendor_id": "v1",
-        "price": 1000,
-        "location": "Pune",
-        "media_files": ["tests/sample.wav"],
-        "raw_tags": ["rice fields"]
-    })
-    assert response.status_code == 201
-    data = response.json
-    assert data["status"] == "ok"
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from shared.utils.config import settings
+from shared.utils.http import get_http
+
+
+class OllamaEmbeddingBackend:
+    """Batched embeddings through Ollama's /api/embed (accepts a list of inputs)."""
+
+    def __init__(self, model: str = "nomic-embed-text", url: str = None, timeout: int = 30):
+        self.model = model
+        self.url = (url or settings.OLLAMA_URL).rstrip('/')
+        self.timeout = timeout
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        resp = get_http().post(
+            f"{self.url}/api/embed",
+            json={"model": self.model, "input": texts},
+            timeout=self.timeout,
+            idempotent=True,  # pure computation, safe to resend
+        )
+        resp.raise_for_status()
+        embeddings = resp.json().get("embeddings", [])
+        if len(embeddings) != len(texts):
+            raise ValueError(f"Ollama returned {len(embeddings)} embeddings for {len(texts)} inputs")
+        return embeddings
+
+
+class SentenceTransformerBackend:
+    """
+    Local sentence-transformers model, loaded on first encode.
+
+    runtime selects the CPU inference path:
+      "torch"     - full-precision PyTorch (reference)
+      "int8"      - PyTorch with dynamic int8 quantization of the Linear layers
+      "onnx"      - ONNX Runtime export of the model
+      "onnx-int8" - ONNX Runtime with the repo's int8-quantized ONNX file
+    """
+
+    RUNTIMES = ("torch", "int8", "onnx", "onnx-int8")
+    # Quantized file shipped in the sentence-transformers model repos; AVX2 runs on any recent x86 CPU
+    DEFAULT_ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+    def __init__(self, model: str = "sentence-transformers/all-MiniLM-L6-v2", runtime: str = "torch",
+                 onnx_file: str = None):
+        if runtime not in self.RUNTIMES:
+            raise ValueError(f"Unknown embedding runtime '{runtime}', expected one of {self.RUNTIMES}")
+        self.model = model
+        self.runtime = runtime
+        self.onnx_file = onnx_file or (self.DEFAULT_ONNX_INT8_FILE if runtime == "onnx-int8" else None)
+        self._encoder = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.runtime.startswith("onnx"):
+            # Optional extra, not in requirements.txt: pip install -r requirements-onnx.txt
+            try:
+                import onnxruntime  # noqa: F401
+                import optimum  # noqa: F401
+            except ImportError as e:
+                raise ImportError(f"Embedding runtime '{self.runtime}' needs sentence-transformers[onnx] "
+                                  f"(pip install -r requirements-onnx.txt): {e}") from e
+        from sentence_transformers import SentenceTransformer
+        if self.runtime == "torch":
+            return SentenceTransformer(self.model)
+        if self.runtime == "int8":
+            import torch
+            encoder = SentenceTransformer(self.model, device="cpu")
+            return torch.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+        model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else None
+        return SentenceTransformer(self.model, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    self._encoder = self._load()
+        return self._encoder
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.encoder.encode(texts, batch_size=len(texts)).tolist()
+
+
+class EmbeddingService:
+    """
+    Micro-batches concurrent embed calls into one backend encode.
+    A single worker thread takes the first queued text, then keeps collecting
+    until max_batch_size texts are waiting or max_wait_ms has passed, encodes
+    them together and resolves each caller's future with its own vector.
+    """
+
+    def __init__(self, backend, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        return self.submit(text).result(timeout=timeout)
+
+    def embed_many(self, texts: List[str], timeout: Optional[float] = None) -> List[List[float]]:
+        futures = [self.submit(t) for t in texts]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Callers that gave up and cancelled are dropped; the rest can no longer be cancelled
+            batch = [(text, future) for text, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                # Encode each distinct text once; popular queries often arrive together
+                unique = list(dict.fromkeys(text for text, _ in batch))
+                vectors = dict(zip(unique, self.backend.encode(unique)))
+                self.batches += 1
+                self.items += len(batch)
+                for text, future in batch:
+                    future.set_result(vectors[text])
+            except Exception as e:
+                # Any failure (backend error, short result) fails this batch only; the worker keeps serving
+                print(f"[Embeddings] Batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "model": self.backend.model,
+            "runtime": getattr(self.backend, "runtime", None),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+BACKENDS = {
+    "ollama": OllamaEmbeddingBackend,
+    "sentence-transformers": SentenceTransformerBackend,
+}
+
+_services: Dict[Tuple[str, str, Optional[str]], EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(backend: str, model: str, runtime: str = None) -> EmbeddingService:
+    """
+    Process-wide EmbeddingService per (backend, model, runtime) so all callers share one batcher.
+    runtime only applies to sentence-transformers and defaults to settings.EMBED_RUNTIME.
+    """
+    if backend == "sentence-transformers":
+        runtime = runtime or settings.EMBED_RUNTIME
+        kwargs = {"runtime": runtime, "onnx_file": settings.EMBED_ONNX_FILE or None}
+    else:
+        runtime, kwargs = None, {}
+    key = (backend, model, runtime)
+    if key not in _services:
+        with _services_lock:
+            if key not in _services:
+                _services[key] = EmbeddingService(
+                    BACKENDS[backend](model=model, **kwargs),
+                    max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+                    max_wait_ms=settings.EMBED_MAX_WAIT_MS,
+                )
+    return _services[key]
@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from shared.utils.config import settings
+
+RETRY_STATUSES = (429, 502, 503, 504)
+# Safe to resend once the request may have reached the server; anything else (e.g. an LLM POST
+# or an AssemblyAI job) may already be running or done server-side
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+# Statuses where a server explicitly rejected the request unprocessed (when it sends Retry-After)
+REJECTED_STATUSES = (429, 503)
+
+
+def never_sent(error: Exception) -> bool:
+    """True if the request failed before reaching the server (connect timeout or refused/unresolvable host)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    cause = error
+    for _ in range(5):
+        if isinstance(cause, NewConnectionError):
+            return True
+        # requests wraps urllib3's MaxRetryError, whose .reason is the underlying error
+        nested = getattr(cause, "reason", None)
+        if nested is None and cause.args and isinstance(cause.args[0], BaseException):
+            nested = cause.args[0]
+        if nested is None:
+            return False
+        cause = nested
+    return False
+
+
+def parse_pool_sizes(spec: str) -> Dict[str, int]:
+    """Parse "host[:port]=size,..." into a dict, ignoring malformed entries."""
+    sizes = {}
+    for entry in (spec or "").split(","):
+        host, _, size = entry.strip().partition("=")
+        if host and size.strip().isdigit():
+            sizes[host.strip().lower()] = int(size)
+    return sizes
+
+
+class HttpClient:
+    """
+    Pooled keep-alive HTTP for outbound service calls.
+    One requests.Session per scheme+host, each with its own connection pool
+    (sized per host), plus retry with exponential backoff on connection
+    errors and 429/5xx responses, bounded by a per-request time budget.
+    """
+
+    def __init__(self, pool_size: int = 10, pool_sizes: Optional[Dict[str, int]] = None,
+                 retries: int = 2, backoff: float = 0.3, budget: Optional[float] = None):
+        self.pool_size = pool_size
+        self.pool_sizes = pool_sizes or {}
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _pool_size_for(self, netloc: str, hostname: str) -> int:
+        return self.pool_sizes.get(netloc, self.pool_sizes.get(hostname, self.pool_size))
+
+    def session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}".lower()
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    size = self._pool_size_for(parts.netloc.lower(), (parts.hostname or "").lower())
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=0)
+                    session = requests.Session()
+                    session.mount(f"{parts.scheme}://", adapter)
+                    self._sessions[key] = session
+        return session
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, backoff: Optional[float] = None,
+                budget: Optional[float] = None, timeout: Optional[float] = None, idempotent: Optional[bool] = None,
+                **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pooled session.
+        retries: extra attempts after the first (pass 0 for non-replayable bodies
+        such as open file objects or calls that must not be duplicated).
+        idempotent: whether resending is safe once the server may have seen the
+        request; defaults to True for IDEMPOTENT_METHODS. Other requests are only
+        retried when they never reached the server (connect timeout/refused) or
+        on a 429/503 carrying Retry-After, never after read timeouts, dropped
+        connections or 502/504.
+        budget: total seconds for all attempts and backoff sleeps.
+        """
+        retries = self.retries if retries is None else retries
+        backoff = self.backoff if backoff is None else backoff
+        budget = self.budget if budget is None else budget
+        deadline = time.monotonic() + budget if budget else None
+        session = self.session_for(url)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.Timeout(f"{method} {url}: request budget of {budget}s exhausted")
+                attempt_timeout = min(timeout, remaining) if timeout else remaining
+            error = None
+            try:
+                resp = session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries or not (idempotent or never_sent(e)):
+                    raise
+                resp, error = None, e
+            else:
+                if idempotent:
+                    retryable = resp.status_code in RETRY_STATUSES
+                else:
+                    retryable = resp.status_code in REJECTED_STATUSES and "Retry-After" in resp.headers
+                if not retryable or attempt >= retries:
+                    return resp
+
+            delay = backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                # No budget left for another attempt: surface what we have
+                if error is not None:
+                    raise error
+                return resp
+            if resp is not None:
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http() -> HttpClient:
+    """Process-wide HttpClient configured from HTTP_* settings."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(
+                    pool_size=settings.HTTP_POOL_SIZE,
+                    pool_sizes=parse_pool_sizes(settings.HTTP_POOL_SIZES),
+                    retries=settings.HTTP_RETRIES,
+                    backoff=settings.HTTP_BACKOFF,
+                    budget=settings.HTTP_BUDGET or None,
+                )
+    return _client
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+_MISSING = object()
+
+
+class Lazy:
+    """
+    Thread-safe, lazily built dependency (model, client, connection).
+    The factory runs on the first call, under a lock so concurrent first
+    callers share one initialization; later calls return the cached value.
+    A failed factory is not cached, so the next call retries it. Init time
+    and the last error are kept for readiness reporting.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._value = _MISSING
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        _registry[name] = self
+
+    def __call__(self) -> Any:
+        if self._value is _MISSING:
+            with self._lock:
+                if self._value is _MISSING:
+                    started = time.monotonic()
+                    try:
+                        value = self._factory()
+                    except Exception as e:
+                        self.error = f"{type(e).__name__}: {e}"
+                        raise
+                    self.init_seconds = round(time.monotonic() - started, 3)
+                    self.error = None
+                    self._value = value
+                    print(f"[Init] {self.name} ready in {self.init_seconds}s")
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self._value is not _MISSING
+
+    def status(self) -> dict:
+        return {"ready": self.ready, "init_seconds": self.init_seconds, "error": self.error}
+
+
+_registry: Dict[str, Lazy] = {}
+
+
+def warmup(names: Iterable[str] = None) -> Dict[str, dict]:
+    """Initialize the named (default: all) dependencies in parallel; returns their status."""
+    targets = [_registry[n] for n in names] if names else list(_registry.values())
+
+    def init(dep: Lazy):
+        try:
+            dep()
+        except Exception as e:
+            print(f"[Init] {dep.name} failed: {e}")
+
+    if targets:
+        with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="warmup") as pool:
+            list(pool.map(init, targets))
+    return readiness(n.name for n in targets)
+
+
+def start_warmup(names: Iterable[str] = None, retry_interval: float = 5.0) -> threading.Thread:
+    """Warm up in a daemon thread, retrying failed dependencies until all of them are ready."""
+    def run():
+        pending = list(names) if names else None
+        while True:
+            pending = [n for n, s in warmup(pending).items() if not s["ready"]]
+            if not pending:
+                return
+            time.sleep(retry_interval)
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness(names: Iterable[str] = None) -> Dict[str, dict]:
+    """Status of the named (default: all) dependencies without initializing anything."""
+    names = list(names) if names else list(_registry)
+    return {n: _registry[n].status() for n in names}
@@ -0,0 +1,218 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from shared.utils.config import settings
+from shared.utils.lru import LRUCache
+
+
+def make_key(model: str, prompt: str, fmt: Any = None, options: Optional[dict] = None) -> str:
+    """Content address for a generation request: sha256 over (model, prompt, format, options)."""
+    raw = json.dumps(
+        {"model": model, "prompt": prompt, "format": fmt, "options": options or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskTier:
+    """One JSON file per entry under `directory`, pruned oldest-first past max_entries."""
+
+    PRUNE_EVERY = 100
+
+    def __init__(self, directory: str, ttl: Optional[float], max_entries: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at") and entry["expires_at"] < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get("value")
+
+    def set(self, key: str, value: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"value": value, "expires_at": time.time() + self.ttl if self.ttl else None}
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.PRUNE_EVERY == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+        excess = len(files) - self.max_entries
+        if excess <= 0:
+            return
+        for _, path in sorted(files)[:excess]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class MongoTier:
+    """Entries in a Mongo collection; a TTL index expires them and writes trim it to max_entries."""
+
+    TRIM_EVERY = 100
+
+    def __init__(self, collection_name: str, ttl: Optional[float], max_entries: int):
+        from shared.utils.mongo_client import db
+
+        self.col = db[collection_name]
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.col.create_index("key", unique=True)
+        self.col.create_index("expires_at", expireAfterSeconds=0)
+        self.col.create_index("created_at")
+
+    def get(self, key: str) -> Optional[str]:
+        doc = self.col.find_one({"key": key}, {"value": 1, "expires_at": 1})
+        if not doc:
+            return None
+        # The TTL monitor only runs once a minute, so check expiry on read too
+        if doc.get("expires_at") and doc["expires_at"] < datetime.datetime.utcnow():
+            return None
+        return doc.get("value")
+
+    def set(self, key: str, value: str):
+        now = datetime.datetime.utcnow()
+        doc = {"key": key, "value": value, "created_at": now}
+        if self.ttl:
+            doc["expires_at"] = now + datetime.timedelta(seconds=self.ttl)
+        self.col.replace_one({"key": key}, doc, upsert=True)
+        with self._lock:
+            self._writes += 1
+            should_trim = self._writes % self.TRIM_EVERY == 0
+        if should_trim:
+            self.trim()
+
+    def trim(self):
+        excess = self.col.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = self.col.find({}, {"_id": 1}).sort("created_at", 1).limit(excess)
+        self.col.delete_many({"_id": {"$in": [d["_id"] for d in oldest]}})
+
+
+class LLMCache:
+    """
+    Two-tier cache for LLM generations keyed by make_key().
+    Lookups hit the in-process LRU first, then the optional persistent tier
+    (disk or Mongo), promoting persistent hits into memory.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: Optional[float] = None, persistent=None):
+        self.memory = LRUCache(max_entries=max_entries, ttl=ttl)
+        self.persistent = persistent
+        self.persistent_hits = 0
+        self.persistent_errors = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        try:
+            value = self.persistent.get(key)
+        except Exception as e:
+            self.persistent_errors += 1
+            print(f"[LLMCache] Persistent lookup failed: {e}")
+            return None
+        if value is not None:
+            self.persistent_hits += 1
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.persistent is None:
+            return
+        try:
+            self.persistent.set(key, value)
+        except Exception as e:
+            self.persistent_errors += 1
+            print(f"[LLMCache] Persistent write failed: {e}")
+
+    def get_or_generate(self, key: str, generate: Callable[[], str]) -> str:
+        value = self.get(key)
+        if value is None:
+            value = generate()
+            self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        # memory misses include lookups later served by the persistent tier
+        misses = memory["misses"] - self.persistent_hits
+        lookups = memory["hits"] + memory["misses"]
+        return {
+            "memory": memory,
+            "persistent": type(self.persistent).__name__ if self.persistent else None,
+            "persistent_hits": self.persistent_hits,
+            "persistent_errors": self.persistent_errors,
+            "hits": memory["hits"] + self.persistent_hits,
+            "misses": misses,
+            "hit_rate": round((lookups - misses) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Process-wide LLMCache built from settings, or None when LLM_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                ttl = settings.LLM_CACHE_TTL or None
+                persistent = None
+                backend = settings.LLM_CACHE_BACKEND.lower()
+                try:
+                    if backend == "disk":
+                        persistent = DiskTier(settings.LLM_CACHE_DIR, ttl, settings.LLM_CACHE_PERSISTENT_MAX_ENTRIES)
+                    elif backend == "mongo":
+                        persistent = MongoTier("llm_cache", ttl, settings.LLM_CACHE_PERSISTENT_MAX_ENTRIES)
+                except Exception as e:
+                    print(f"[LLMCache] Persistent tier '{backend}' unavailable, using memory only: {e}")
+                _cache = LLMCache(max_entries=settings.LLM_CACHE_MAX_ENTRIES, ttl=ttl, persistent=persistent)
+    return _cache
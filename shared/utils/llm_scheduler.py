@@ -0,0 +1,277 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional, TypeVar
+
+from shared.utils.config import settings
+
+T = TypeVar("T")
+
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "ingestion": 1}
+
+
+class LLMOverloaded(RuntimeError):
+    """Request shed by the scheduler: queue full, or its deadline can't be met."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_model_limits(spec: str) -> Dict[str, int]:
+    """Parse "model=limit,..." into a dict, ignoring malformed entries."""
+    limits = {}
+    for entry in (spec or "").split(","):
+        model, _, limit = entry.strip().rpartition("=")
+        if model and limit.strip().isdigit():
+            limits[model.strip()] = int(limit)
+    return limits
+
+
+class _ClassStats:
+    def __init__(self, window: int = 500):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.waits = deque(maxlen=window)
+
+    def snapshot(self, queued: int) -> dict:
+        waits = sorted(self.waits)
+        return {
+            "queued": queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+        }
+
+
+class ModelGate:
+    """
+    Concurrency gate for one model: at most `limit` generations in flight,
+    waiters served by priority class, then arrival order. A freed slot is
+    handed straight to the next waiter, so a later caller can't jump the queue.
+
+    A request is shed immediately when its class queue is full or when the
+    expected wait (queue position x mean service time / limit) already
+    exceeds its deadline; otherwise it waits until granted or the deadline
+    passes, whichever comes first.
+    """
+
+    def __init__(self, model: str, limit: int, max_queue: Dict[str, int]):
+        self.model = model
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.active = 0
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._service_avg: Optional[float] = None  # EWMA of generation seconds
+        self._stats = {p: _ClassStats() for p in PRIORITIES}
+
+    def _queued(self, priority: str) -> int:
+        return sum(1 for w in self._heap if w[2]["priority"] == priority and not w[2]["cancelled"])
+
+    def _ahead_of(self, rank: int) -> int:
+        return sum(1 for w in self._heap if w[0] <= rank and not w[2]["cancelled"])
+
+    def _estimated_wait(self, ahead: int) -> float:
+        if self.active < self.limit and not ahead:
+            return 0.0
+        return (ahead + 1) * (self._service_avg or 0.0) / self.limit
+
+    def _enter(self, priority: str, timeout: Optional[float], notify: Callable[[], None]) -> Optional[dict]:
+        """Take a free slot (returns None) or queue a waiter woken by `notify`; raises LLMOverloaded if shed."""
+        rank = PRIORITIES[priority]
+        stats = self._stats[priority]
+        with self._lock:
+            stats.submitted += 1
+            ahead = self._ahead_of(rank)
+            if self.active < self.limit and not ahead:
+                self.active += 1
+                stats.waits.append(0.0)
+                return None
+            if self._queued(priority) >= self.max_queue[priority]:
+                stats.shed += 1
+                raise LLMOverloaded(f"{self.model}: {priority} queue full ({self.max_queue[priority]})",
+                                    retry_after=self._estimated_wait(ahead) or 1.0)
+            expected = self._estimated_wait(ahead)
+            if timeout is not None and expected > timeout:
+                stats.shed += 1
+                raise LLMOverloaded(f"{self.model}: expected wait {expected:.1f}s exceeds {timeout:.1f}s deadline",
+                                    retry_after=expected)
+            waiter = {"priority": priority, "notify": notify, "granted": False, "cancelled": False,
+                      "queued_at": time.monotonic()}
+            heapq.heappush(self._heap, (rank, next(self._seq), waiter))
+            return waiter
+
+    def _leave(self, waiter: dict, timeout: Optional[float]):
+        """After the wait: keep the granted slot, or withdraw from the queue and raise."""
+        with self._lock:
+            stats = self._stats[waiter["priority"]]
+            if not waiter["granted"]:
+                # Lazily removed from the heap by _grant_next
+                waiter["cancelled"] = True
+                stats.timed_out += 1
+                ahead = self._ahead_of(PRIORITIES[waiter["priority"]])
+                raise LLMOverloaded(f"{self.model}: no slot within {timeout:.1f}s deadline",
+                                    retry_after=self._estimated_wait(ahead) or 1.0)
+            stats.waits.append(time.monotonic() - waiter["queued_at"])
+
+    def acquire(self, priority: str, timeout: Optional[float]):
+        event = threading.Event()
+        waiter = self._enter(priority, timeout, event.set)
+        if waiter is not None:
+            event.wait(timeout)
+            self._leave(waiter, timeout)
+
+    async def acquire_async(self, priority: str, timeout: Optional[float]):
+        """acquire() for coroutines: waits on a future, so the event loop keeps serving other requests."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            if not granted.done():
+                granted.set_result(None)
+
+        waiter = self._enter(priority, timeout, lambda: loop.call_soon_threadsafe(wake))
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(granted), timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away: hand back a slot granted meanwhile, or leave the queue
+            with self._lock:
+                waiter["cancelled"] = True
+                if waiter["granted"]:
+                    self.active -= 1
+                    self._grant_next()
+            raise
+        self._leave(waiter, timeout)
+
+    def release(self, priority: str, seconds: float, ok: bool):
+        with self._lock:
+            stats = self._stats[priority]
+            if ok:
+                stats.completed += 1
+                self._service_avg = seconds if self._service_avg is None else 0.8 * self._service_avg + 0.2 * seconds
+            else:
+                stats.failed += 1
+            self.active -= 1
+            self._grant_next()
+
+    def _grant_next(self):
+        while self._heap and self.active < self.limit:
+            _, _, waiter = heapq.heappop(self._heap)
+            if waiter["cancelled"]:
+                continue
+            waiter["granted"] = True
+            self.active += 1
+            waiter["notify"]()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "active": self.active,
+                "service_avg_ms": round(1000 * self._service_avg, 1) if self._service_avg else None,
+                "classes": {p: s.snapshot(self._queued(p)) for p, s in self._stats.items()},
+            }
+
+
+class LLMScheduler:
+    """
+    Process-wide scheduler for LLM calls: one ModelGate per model.
+    Only coordinates callers in this process; agents sharing an Ollama server
+    each get their own limits, so size them against the server's
+    OLLAMA_NUM_PARALLEL.
+    """
+
+    def __init__(self, default_limit: int = 2, limits: Optional[Dict[str, int]] = None,
+                 max_queue: Optional[Dict[str, int]] = None, timeouts: Optional[Dict[str, float]] = None):
+        self.default_limit = default_limit
+        self.limits = limits or {}
+        self.max_queue = max_queue or {"interactive": 32, "ingestion": 256}
+        self.timeouts = timeouts or {"interactive": 30.0, "ingestion": 600.0}
+        self._gates: Dict[str, ModelGate] = {}
+        self._lock = threading.Lock()
+
+    def gate(self, model: str) -> ModelGate:
+        gate = self._gates.get(model)
+        if gate is None:
+            with self._lock:
+                gate = self._gates.get(model)
+                if gate is None:
+                    gate = ModelGate(model, self.limits.get(model, self.default_limit), self.max_queue)
+                    self._gates[model] = gate
+        return gate
+
+    @contextmanager
+    def slot(self, model: str, priority: str = "interactive", timeout: Optional[float] = None):
+        """Hold one of `model`'s slots for the body; raises LLMOverloaded if it can't be had in time."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority '{priority}', expected one of {list(PRIORITIES)}")
+        gate = self.gate(model)
+        gate.acquire(priority, self.timeouts.get(priority) if timeout is None else timeout)
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            gate.release(priority, time.monotonic() - started, ok)
+
+    @asynccontextmanager
+    async def aslot(self, model: str, priority: str = "interactive", timeout: Optional[float] = None):
+        """slot() for coroutines; shares the same gates, so sync and async callers queue together."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM priority '{priority}', expected one of {list(PRIORITIES)}")
+        gate = self.gate(model)
+        await gate.acquire_async(priority, self.timeouts.get(priority) if timeout is None else timeout)
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            gate.release(priority, time.monotonic() - started, ok)
+
+    def run(self, model: str, fn: Callable[[], T], priority: str = "interactive", timeout: Optional[float] = None) -> T:
+        with self.slot(model, priority, timeout):
+            return fn()
+
+    def stats(self) -> dict:
+        return {model: gate.stats() for model, gate in list(self._gates.items())}
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    """Process-wide LLMScheduler configured from LLM_* settings."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler(
+                    default_limit=settings.LLM_MAX_CONCURRENCY,
+                    limits=parse_model_limits(settings.LLM_MODEL_CONCURRENCY),
+                    max_queue={"interactive": settings.LLM_QUEUE_MAX_INTERACTIVE,
+                               "ingestion": settings.LLM_QUEUE_MAX_INGESTION},
+                    timeouts={"interactive": settings.LLM_INTERACTIVE_DEADLINE,
+                              "ingestion": settings.LLM_INGESTION_DEADLINE},
+                )
+    return _scheduler
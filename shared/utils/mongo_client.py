@@ -3,3 +3,12 @@ from shared.utils.config import settings
 
 client = MongoClient(settings.MONGO_URI)
 db = client[settings.DB_NAME]
+
+
+def connect_async(uri: str = None):
+    """
+    PyMongo asyncio handle on the same database, for the async traveler app.
+    Create it inside the serving event loop and `await handle.client.close()` on shutdown.
+    """
+    from pymongo import AsyncMongoClient
+    return AsyncMongoClient(uri or settings.MONGO_URI)[settings.DB_NAME]
@@ -0,0 +1,191 @@
+"""
+Single source of truth for how listings/events are embedded and where their
+vectors live, shared by the vendor (writer) and traveler (reader) agents.
+"""
+from typing import Any, Dict, List, Optional
+
+from shared.utils.config import settings
+from shared.utils.embeddings import get_embedding_service
+
+EMBED_BACKEND = settings.EMBED_BACKEND
+EMBED_MODEL = settings.EMBED_MODEL
+EMBED_DIM = settings.EMBED_DIM
+
+# Mongo collection -> Qdrant collection holding its vectors
+VECTOR_COLLECTIONS = {
+    "listings": settings.LISTINGS_VECTOR_COLLECTION,
+    "events": settings.EVENTS_VECTOR_COLLECTION,
+}
+# Qdrant collection -> Mongo collection (source of truth for re-indexing)
+VECTOR_SOURCES = {vector: source for source, vector in VECTOR_COLLECTIONS.items()}
+
+# Collection creation profiles. Quantized profiles keep the compressed vectors in RAM
+# for the HNSW walk and the full-precision ones on disk for rescoring.
+COLLECTION_PROFILES = {
+    "default": {},
+    "disk": {"vectors_on_disk": True, "on_disk_payload": True},
+    "scalar": {
+        "vectors_on_disk": True,
+        "on_disk_payload": True,
+        "hnsw_config": {"m": 16, "ef_construct": 100},
+        "quantization_config": {"scalar": {"type": "int8", "quantile": 0.99, "always_ram": True}},
+    },
+    "product": {
+        "vectors_on_disk": True,
+        "on_disk_payload": True,
+        "hnsw_config": {"m": 16, "ef_construct": 128},
+        "quantization_config": {"product": {"compression": "x16", "always_ram": True}},
+    },
+}
+
+# Payload stored next to each vector: what filters and result lists need.
+# Everything else (description, media, transcripts) is hydrated from Mongo.
+SEARCH_PAYLOAD_FIELDS = ("id", "title", "location", "price", "tags", "vendor_id", "agency_id", "datetime")
+
+# Payload fields indexed in every listing/event collection, with their Qdrant schema
+PAYLOAD_INDEXES = {
+    "location": "keyword",
+    "price": "float",
+    "tags": "keyword",
+    "vendor_id": "keyword",
+}
+
+# Filter keys accepted on search requests and the payload field they apply to
+_MATCH_FILTERS = {"location": "location", "vendor_id": "vendor_id", "tags": "tags"}
+_RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+
+def build_payload_filter(filters: Optional[Dict[str, Any]]) -> Optional[dict]:
+    """
+    Translate SearchRequest.filters into a Qdrant filter (REST JSON form).
+
+    Supported keys:
+      location, vendor_id: a value or a list of values (matches any)
+      tags:                a tag or a list of tags (matches items with any of them)
+      price:               {"gte": .., "lte": .., "gt": .., "lt": ..} or {"min": .., "max": ..}
+      price_min/price_max: shorthand for price gte/lte
+    Raises ValueError for unknown keys or malformed values.
+    """
+    if not filters:
+        return None
+    must = []
+    price_range = {}
+    for key, value in filters.items():
+        if value is None or value == [] or value == "":
+            continue
+        if key in _MATCH_FILTERS:
+            field = _MATCH_FILTERS[key]
+            if isinstance(value, (list, tuple)):
+                must.append({"key": field, "match": {"any": list(value)}})
+            else:
+                must.append({"key": field, "match": {"value": value}})
+        elif key == "price":
+            if not isinstance(value, dict):
+                raise ValueError("price filter must be an object like {\"gte\": 500, \"lte\": 2000}")
+            aliases = {"min": "gte", "max": "lte"}
+            for op, bound in value.items():
+                op = aliases.get(op, op)
+                if op not in _RANGE_OPS:
+                    raise ValueError(f"Unsupported price operator '{op}'")
+                price_range[op] = float(bound)
+        elif key in ("price_min", "price_max"):
+            price_range["gte" if key == "price_min" else "lte"] = float(value)
+        else:
+            raise ValueError(f"Unsupported filter '{key}'")
+    if price_range:
+        must.append({"key": "price", "range": price_range})
+    return {"must": must} if must else None
+
+
+def matches_payload_filter(payload: dict, payload_filter: Optional[dict]) -> bool:
+    """Evaluate a filter from build_payload_filter against a payload locally (for cached docs)."""
+    for cond in (payload_filter or {}).get("must", []):
+        value = payload.get(cond["key"])
+        if "match" in cond:
+            wanted = cond["match"].get("any", [cond["match"].get("value")])
+            have = value if isinstance(value, list) else [value]
+            if not any(v in wanted for v in have):
+                return False
+        elif "range" in cond:
+            try:
+                num = float(value)
+            except (TypeError, ValueError):
+                return False
+            r = cond["range"]
+            if ("gt" in r and not num > r["gt"]) or ("gte" in r and not num >= r["gte"]) \
+                    or ("lt" in r and not num < r["lt"]) or ("lte" in r and not num <= r["lte"]):
+                return False
+    return True
+
+
+def document_text(doc: dict) -> str:
+    """Text embedded for a listing/event."""
+    return f"{doc.get('title', '')} {doc.get('description', '')} {' '.join(doc.get('tags') or [])}"
+
+
+def get_document_embedder():
+    """The shared EmbeddingService for the registry model (micro-batched, process-wide)."""
+    return get_embedding_service(EMBED_BACKEND, EMBED_MODEL)
+
+
+def check_dimension(vector, what: str = "embedding") -> List[float]:
+    if len(vector) != EMBED_DIM:
+        raise ValueError(f"{what} has {len(vector)} dims, registry expects {EMBED_DIM} ({EMBED_MODEL})")
+    return vector
+
+
+def embed_documents(docs: List[dict]) -> List[List[float]]:
+    """Embed listings/events with the registry model; raises instead of returning placeholder vectors."""
+    vectors = get_document_embedder().embed_many([document_text(d) for d in docs])
+    return [check_dimension(list(v)) for v in vectors]
+
+
+def verify_embedding_model():
+    """Load the registry model and check it produces EMBED_DIM-sized vectors; returns the embedder."""
+    embedder = get_document_embedder()
+    check_dimension(embedder.embed("dimension check"), f"{EMBED_BACKEND}:{EMBED_MODEL} output")
+    return embedder
+
+
+def check_collection_size(collection: str, size: int):
+    """Raise if an existing Qdrant collection was created for a different dimension."""
+    if size != EMBED_DIM:
+        raise RuntimeError(
+            f"Qdrant collection '{collection}' has {size}-dim vectors but {EMBED_MODEL} produces {EMBED_DIM}; "
+            f"run `python -m shared.jobs.reembed --recreate` to rebuild it"
+        )
+
+
+def collection_config(profile: str = None) -> dict:
+    """Qdrant create-collection body (REST JSON) for the registry dimension and a profile."""
+    name = profile or settings.QDRANT_PROFILE
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown Qdrant profile '{name}', expected one of {sorted(COLLECTION_PROFILES)}")
+    spec = COLLECTION_PROFILES[name]
+    config = {"vectors": {"size": EMBED_DIM, "distance": "Cosine"}}
+    if spec.get("vectors_on_disk"):
+        config["vectors"]["on_disk"] = True
+    if spec.get("on_disk_payload"):
+        config["on_disk_payload"] = True
+    hnsw = dict(spec.get("hnsw_config") or {})
+    if settings.QDRANT_HNSW_M:
+        hnsw["m"] = settings.QDRANT_HNSW_M
+    if settings.QDRANT_HNSW_EF_CONSTRUCT:
+        hnsw["ef_construct"] = settings.QDRANT_HNSW_EF_CONSTRUCT
+    if hnsw:
+        config["hnsw_config"] = hnsw
+    if spec.get("quantization_config"):
+        config["quantization_config"] = spec["quantization_config"]
+    return config
+
+
+def search_params(profile: str = None) -> Optional[dict]:
+    """Search-time params: rescore quantized candidates with the original vectors."""
+    if not COLLECTION_PROFILES.get(profile or settings.QDRANT_PROFILE, {}).get("quantization_config"):
+        return None
+    return {"quantization": {"rescore": True, "oversampling": settings.QDRANT_RESCORE_OVERSAMPLING}}
+
+
+def slim_payload(doc: dict) -> dict:
+    """The subset of a listing/event stored as Qdrant payload."""
+    return {k: doc[k] for k in SEARCH_PAYLOAD_FIELDS if k in doc}